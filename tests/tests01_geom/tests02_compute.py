@@ -142,3 +142,72 @@ def test04_Ves_get_MeshCrossSection(Poly=Poly):
 
 
 
+
+
+
+
+
+
+
+
+
+#######################################################
+#
+#      Detect functions
+#
+#######################################################
+
+
+def test05_Detect_SigPrecomp_Compress():
+    LOSD, LOSu = np.array([3.,0.,0.5]), np.array([-1.,0.1,-0.2])
+    LOSu = LOSu/np.linalg.norm(LOSu)
+    Pts = LOSD.reshape((3,1)) + np.random.random((3,1000))
+    SAng = np.random.random((1000,))*1.e-6
+    Vect = np.random.random((3,1000))-0.5
+    Vect = Vect/np.sqrt(np.sum(Vect**2,axis=0))
+    Comp = _tfg_c._Detect_SigPrecomp_Compress(Pts, SAng, Vect, LOSD, LOSu)
+    Pts2, SAng2, Vect2 = _tfg_c._Detect_SigPrecomp_Decompress(Comp)
+    assert Comp['Ind'].dtype.name=='uint16' and Comp['SAng'].dtype.name=='float32' and Comp['Vect'].shape==(2,1000)
+    assert Pts2.shape==(3,1000) and SAng2.shape==(1000,) and Vect2.shape==(3,1000)
+    assert np.all(np.abs(Pts2-Pts)<1.e-4)
+    assert np.all(np.abs(SAng2-SAng)<1.e-6*SAng.max())
+    assert np.all(np.abs(Vect2-Vect)<1.e-3)
+
+
+def test06_FuncSAquad_LowLevel():
+    import scipy.integrate as scpinteg
+    GG = _tfg_c.GG
+    def Val(FuncSA, x2, x1, h=1.e-9):
+        return scpinteg.quad(FuncSA, x2, x2+h, args=(x1,))[0]/h
+    Ps, e1, e2 = np.array([0.,0.,1.]), np.array([1.,0.,0.]), np.array([0.,1.,0.])
+    X = np.random.uniform(-0.2,0.2,(2,100))
+    # Detect + Apert (square detector and tilted square aperture)
+    thet = np.linspace(0.,2.*np.pi,5)+np.pi/4.
+    DPoly = np.array([0.01*np.sqrt(2.)*np.cos(thet), 0.01*np.sqrt(2.)*np.sin(thet), np.zeros((5,))])
+    APoly = np.array([0.008*np.cos(thet+0.3), 0.008*np.sin(thet+0.3)+0.002, 0.1*np.ones((5,))])
+    LBaryS, LnIn = np.ascontiguousarray(np.array([[0.,0.,0.],[0.,0.002,0.1]]).T), np.ascontiguousarray(np.array([[0.,0.,1.],[0.,0.,1.]]).T)
+    args = ([DPoly,APoly], np.array([0.,0.,1.]), e1, e2, Ps, e1, e2, LBaryS, LnIn, 2, np.array([0.,0.,0.05]), None, None)
+    FuncC, FuncPy = GG.FuncSAquad_Apert(*args, Colis=False), GG.FuncSAquad_Apert(*args, Colis=False, LowLevel=False)
+    assert isinstance(FuncC, GG.LowLevelCallable)
+    SAC = np.array([Val(FuncC,X[0,ii],X[1,ii]) for ii in range(0,X.shape[1])])
+    SAPy = np.array([FuncPy(X[0,ii],X[1,ii]) for ii in range(0,X.shape[1])])
+    assert np.any(SAPy>0.) and np.allclose(SAC, SAPy, rtol=1.e-6, atol=1.e-6*SAPy.max())
+    # An exception raised by the collision test (here VPoly of wrong shape) is re-raised after the integration
+    FuncC, Raised = GG.FuncSAquad_Apert(*(args[:-2]+(np.ones((3,)),np.ones((3,)))), Colis=True), False
+    try:
+        GG.dblquad_custom(FuncC, -0.01, 0.01, lambda x: -0.01, lambda x: 0.01)
+    except Exception:
+        Raised = True
+    assert Raised
+    # Detect + Lens (image of the Lens included in the Detector, and partial or total covering of the Detector)
+    RadL, F1 = 0.005, 0.01
+    thet = np.linspace(0.,2.*np.pi,100)
+    PolyL = np.array([RadL*np.cos(thet), RadL*np.sin(thet), np.zeros((100,))])
+    LBaryS, LnIn = np.ascontiguousarray(np.array([[0.,0.,-F1],[0.,0.,0.]]).T), np.ascontiguousarray(np.array([[0.,0.,1.],[0.,0.,1.]]).T)
+    X = np.random.uniform(-0.01,0.01,(2,200))
+    for RadD in [0.001,0.00003]:
+        args = (np.zeros((3,)), np.array([0.,0.,-F1*RadL/(RadL+RadD)]), Ps, e1, e2, LBaryS, LnIn, 2, RadL, RadD, F1, (RadL+RadD)/F1, PolyL, None, None)
+        FuncC, FuncPy = GG.FuncSAquad_Lens(*args, thet=thet, Colis=False), GG.FuncSAquad_Lens(*args, thet=thet, Colis=False, LowLevel=False)
+        SAC = np.array([Val(FuncC,X[0,ii],X[1,ii]) for ii in range(0,X.shape[1])])
+        SAPy = np.array([FuncPy(X[0,ii],X[1,ii]) for ii in range(0,X.shape[1])])
+        assert np.any(SAPy>0.) and np.allclose(SAC, SAPy, rtol=1.e-6, atol=1.e-6*SAPy.max())
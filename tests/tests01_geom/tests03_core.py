@@ -489,8 +489,15 @@ class Test07_GLOSTor:
     def test04_saveload(self):
         self.Obj.save()
         Los = tfpf.Open(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
+        assert [ll.Id.Name for ll in Los.LLOS]==[ll.Id.Name for ll in self.Obj.LLOS]
+        assert all([ll.Id.Cls=='LOS' and (ll.Id.Exp,ll.Id.Diag,ll.Id.shot,ll.Id.dtime)==(Los.Id.Exp,Los.Id.Diag,Los.Id.shot,Los.Id.dtime) for ll in Los.LLOS])
         os.remove(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
 
+    def test05_LOSfromDu(self):
+        GL = tfg.GLOS('TestDu', [ll.Du for ll in self.Obj.LLOS], Ves=self.Obj.Ves, shot=0, Diag='Test', Exp='AUG', SavePath=Root+Addpath)
+        assert [ll.Id.Name for ll in GL.LLOS]==['TestDu0','TestDu1','TestDu2'] and all([np.allclose(GL.LLOS[ii].u,self.Obj.LLOS[ii].u) for ii in range(0,3)])
+        assert all([ll.Id.Cls=='LOS' and (ll.Id.Exp,ll.Id.Diag,ll.Id.shot,ll.Id.SavePath,ll.Id.dtime)==(GL.Id.Exp,GL.Id.Diag,GL.Id.shot,GL.Id.SavePath,GL.Id.dtime) for ll in GL.LLOS])
+
 
 
 class Test08_GLOSLin:
@@ -712,6 +719,32 @@ class Test12_ApertLin:
         obj = tfpf.Open(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
         os.remove(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
 
+    def test03_OpenBulk(self):
+        Obj2 = tfg.Apert('Test2', self.Obj.Poly, Ves=self.Obj.Ves, Exp='AUG', Diag='Test', shot=0, SavePath=Root+Addpath)
+        LF = [oo.Id.SavePath + oo.Id.SaveName + '.npz' for oo in [self.Obj,Obj2]]
+        self.Obj.save()
+        Obj2.save()
+        LObj, Report = tfpf.Open_Bulk(LF, NThreads=2)
+        assert [oo.Id.Name for oo in LObj]==['Test','Test2'] and LObj[0].Ves is LObj[1].Ves
+        assert len(Report['t'])==2 and Report['Hits'][self.Obj.Ves.Id.SaveName]==1
+        for ff in LF:
+            os.remove(ff)
+
+    def test04_saveload_compressed(self):
+        self.Obj.save(compressed=True)
+        obj = tfpf.Open(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
+        assert np.all(obj.Poly==self.Obj.Poly)
+        os.remove(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
+
+    def test05_Index(self):
+        LF = tfpf.Find_Index(self.Obj.Id.SavePath, Cls='Apert', shot=0, Diag='Test')
+        self.Obj.save()
+        LF2 = tfpf.Find_Index(self.Obj.Id.SavePath, Cls='Apert', shot=0, Diag='Test')
+        assert LF2==sorted(LF+[self.Obj.Id.SaveName + '.npz'])
+        os.remove(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
+        assert tfpf.Find_Index(self.Obj.Id.SavePath, Cls='Apert', shot=0, Diag='Test')==LF
+        os.remove(self.Obj.Id.SavePath + tfpf._IndexFile)
+
 
 
 ###########################################################
@@ -992,8 +1025,65 @@ class Test14_DetectApertLin:
     def test15_saveload(self):
         self.Obj.save()
         obj = tfpf.Open(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
+        assert isinstance(obj._SynthDiag_Points.base, np.memmap) and np.all(obj._SynthDiag_Points==self.Obj._SynthDiag_Points)
         os.remove(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
 
+    def test16_Lazy(self):
+        D = self.Obj
+        DL = tfg.Detect('TestLazy', D.Poly, Optics=D.Optics, Ves=D.Ves, Exp='AUG', Diag='Test', shot=0, SavePath=Root+Addpath,
+                        Etend_Method='quad', Etend_RelErr=1.e-2, Cone_DRY=0.005, Cone_DXTheta=0.005, Cone_DZ=0.005, Lazy=True)
+        assert sorted(DL._Lazy.keys())==['Cone','ConeWidth','Etend','LOS','Span','SynthDiag']
+        assert np.allclose(DL.LOS['Cart']['LOS'].u, D.LOS['Cart']['LOS'].u)
+        assert sorted(DL._Lazy.keys())==['Cone','ConeWidth','Etend','Span','SynthDiag']
+        assert np.abs(DL.LOS['Cart']['Etend']-D.LOS['Cart']['Etend'])<1.e-6*D.LOS['Cart']['Etend']
+        assert sorted(DL._Lazy.keys())==['Cone','ConeWidth','Span','SynthDiag']
+        assert np.allclose(DL._ConeWidth, D._ConeWidth) and sorted(DL._Lazy.keys())==['Cone','SynthDiag']
+        LD = [tfg.Detect('TestLazy', D.Poly, Optics=D.Optics, Ves=D.Ves, Exp='AUG', Diag='Test', shot=0, SavePath=Root+Addpath,
+                         Etend_Method='quad', Etend_RelErr=1.e-2, CalcSpanImp=False, CalcCone=False, CalcPreComp=False, Lazy=Lazy) for Lazy in [False,True]]
+        assert sorted(LD[1]._Lazy.keys())==['ConeWidth','Etend','LOS']
+        assert all([np.all(getattr(LD[1],aa)==getattr(LD[0],aa)) for aa in ['_ConeWidth','_ConeWidth_k','_ConeWidth_X1','_ConeWidth_X2']])
+
+    def test17_update(self):
+        D = self.Obj
+        E0, RefPt0 = D.LOS['Cart']['Etend'], np.copy(D.Sino_RefPt)
+        Rep = D.update(Sino_RefPt=RefPt0+0.1)
+        assert Rep['Changed']==['Sino_RefPt'] and Rep['Computed']==['Sino'] and all([ss in Rep['Skipped'] for ss in ['LOS','Etend','Cone','SynthDiag']])
+        assert np.allclose(D.Sino_RefPt,RefPt0+0.1) and D.LOS['Cart']['Etend']==E0
+        Rep = D.update(Sino_RefPt=RefPt0+0.1)
+        assert Rep['Changed']==[] and Rep['Computed']==[]
+        D.update(Sino_RefPt=RefPt0)
+        # The new reference point is stored even if the Sino was not computed
+        D2 = tfg.Detect('TestUpdate', D.Poly, Optics=D.Optics, Ves=D.Ves, Exp='AUG', Diag='Test', shot=0, SavePath=Root+Addpath,
+                        CalcEtend=False, CalcSpanImp=False, CalcCone=False, CalcPreComp=False)
+        Rep = D2.update(Sino_RefPt=RefPt0+0.1)
+        assert Rep['Changed']==['Sino_RefPt'] and Rep['Computed']==[] and np.allclose(D2.Sino_RefPt,RefPt0+0.1)
+
+    def test18_Cache(self):
+        D, Cache = self.Obj, Root+Addpath+'TFG_Cache_Test/'
+        LD = [tfg.Detect('TestCache', D.Poly, Optics=D.Optics, Ves=D.Ves, Exp='AUG', Diag='Test', shot=0, SavePath=Root+Addpath, Etend_Method='quad', Etend_RelErr=1.e-2,
+                         CalcCone=False, CalcPreComp=False, Cache=Cache) for ii in range(0,2)]
+        LF = os.listdir(Cache)
+        assert len(LF)==3 and all([ff[-4:]=='.npz' for ff in LF])
+        assert LD[1].LOS['Cart']['Etend']==LD[0].LOS['Cart']['Etend'] and np.allclose(LD[1]._Sino_CrossProj, LD[0]._Sino_CrossProj)
+        tfpf._Cache_clean(Cache, 0.)
+        assert len(os.listdir(Cache))==1
+        for ff in os.listdir(Cache):
+            os.remove(Cache+ff)
+        os.rmdir(Cache)
+
+    def test19_saveload_Compact(self):
+        D = self.Obj
+        func = lambda Pts, A=1.: A*np.exp(-(((Pts[0,:]-0.)/0.3)**2 + ((Pts[2,:]-0.)/0.5)**2))
+        D.set_SigPrecomp(Compact=True)
+        Comp, Sig0 = dict(D._SynthDiag_Comp), D.calc_Sig(func, PreComp=True)
+        D.save()
+        assert all([D._SynthDiag_Comp[kk] is Comp[kk] for kk in Comp.keys()])
+        assert D.calc_Sig(func, PreComp=True)==Sig0
+        obj = tfpf.Open(D.Id.SavePath + D.Id.SaveName + '.npz')
+        assert np.abs(obj.calc_Sig(func, PreComp=True)-Sig0)<1.e-6*Sig0
+        os.remove(D.Id.SavePath + D.Id.SaveName + '.npz')
+        D.set_SigPrecomp(Compact=False)
+
 
 
 
@@ -1525,6 +1615,17 @@ class Test18_GDetectApertLin:
         assert np.all(np.abs(Sig1-Sig2)<0.001*Sig1), str(Sig1)+" vs "+str(Sig2)
         assert np.all(np.abs(Sig3-Sig4)<0.001*Sig3), str(Sig3)+" vs "+str(Sig4)
 
+    def test06_calc_Sig_Shared(self):
+        func = lambda Pts, A=1.: A*np.exp(-(((np.hypot(Pts[0,:],Pts[1,:])-1.7)/0.3)**2 + ((Pts[2,:]-0.)/0.5)**2))
+        Sig1, GD1 = self.Obj.calc_Sig(func, extargs={'A':1.}, Method='Vol', Mode='sum', PreComp=False, Colis=True, dX12=[0.005, 0.005], dX12Mode='abs', ds=0.005, dsMode='abs', MarginS=0.001, Val=['L_009','G_015'])
+        self.Obj.set_SigPrecomp_Shared(dXYZ=[0.005,0.005,0.005], Colis=True)
+        Sig2, GD2 = self.Obj.calc_Sig(func, extargs={'A':1.}, Method='Vol', PreComp=True, Val=['L_009','G_015'])
+        assert Sig2.shape==Sig1.shape and [dd.Id.Name for dd in GD2]==[dd.Id.Name for dd in GD1]
+        assert np.all(np.abs(Sig1-Sig2)<0.01*Sig1), str(Sig1)+" vs "+str(Sig2)
+        funct = lambda Pts, A=1.: np.array([1.,2.,3.])[:,np.newaxis]*func(Pts, A=A)
+        Sig3, GD3 = self.Obj.calc_Sig(funct, extargs={'A':1.}, Method='Vol', PreComp=True, Val=['L_009','G_015'])
+        assert Sig3.shape==(3,len(GD2)) and np.allclose(Sig3, np.array([1.,2.,3.])[:,np.newaxis]*Sig2)
+
 
     #def test06_calc_SAngNb(self):
     #    SA, ind, Pts = self.Obj.calc_SAngNb(Pts=None, Proj='Cross', Slice='Int', DRY=None, DXTheta=None, DZ=None, Colis=True)
@@ -1577,8 +1678,33 @@ class Test18_GDetectApertLin:
     def test15_saveload(self):
         self.Obj.save()
         obj = tfpf.Open(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
+        assert obj._SynthDiag_Shared is not None and obj._SynthDiag_Shared['W'].shape==self.Obj._SynthDiag_Shared['W'].shape
+        obj = tfpf.Open(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz', ind=[self.Obj.LDetect[-1].Id.Name])
+        assert obj.nDetect==1 and np.all(obj.LDetect[0]._SynthDiag_Points==self.Obj.LDetect[-1]._SynthDiag_Points)
+        # The shared grid of a partial load only keeps the weights of the loaded detectors
+        func = lambda Pts, A=1.: A*np.exp(-(((np.hypot(Pts[0,:],Pts[1,:])-1.7)/0.3)**2 + ((Pts[2,:]-0.)/0.5)**2))
+        obj = tfpf.Open(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz', ind=np.int64(self.Obj.nDetect-1))
+        Sig0, GD0 = self.Obj.calc_Sig(func, Method='Vol', PreComp=True, Val=self.Obj.LDetect[-1].Id.Name)
+        Sig1, GD1 = obj.calc_Sig(func, Method='Vol', PreComp=True)
+        assert obj._SynthDiag_Shared['W'].shape[0]==1 and obj._SynthDiag_Shared['W'].shape[1]==obj._SynthDiag_Shared['Points'].shape[1]
+        assert [dd.Id.Name for dd in GD1]==[dd.Id.Name for dd in GD0] and np.allclose(Sig1, Sig0)
         os.remove(self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz')
 
+    def test16_saveload_compressed(self):
+        pfe, Ref = self.Obj.Id.SavePath + self.Obj.Id.SaveName + '.npz', self.Obj.Id.SavePath + 'TFG_Test_savez_compressed.npz'
+        self.Obj.save()
+        Out = np.load(pfe)
+        np.savez_compressed(Ref, **dict([(kk,Out[kk]) for kk in Out.keys()]))
+        Out.close()
+        self.Obj.save(compressed=True)
+        # Not larger than with np.savez_compressed(), despite the chunks of the large arrays being compressed independently
+        assert os.path.getsize(pfe)<=os.path.getsize(Ref)
+        obj = tfpf.Open(pfe)
+        assert obj.nDetect==self.Obj.nDetect and all([np.all(obj.LDetect[ii]._SynthDiag_Points==self.Obj.LDetect[ii]._SynthDiag_Points) for ii in range(0,obj.nDetect)])
+        assert np.all(obj._SynthDiag_Shared['Points']==self.Obj._SynthDiag_Shared['Points'])
+        os.remove(pfe)
+        os.remove(Ref)
+
 
 
 
@@ -16,6 +16,7 @@ from nose import with_setup # optional
 import tofu.defaults as tfd
 import tofu.pathfile as tfpf
 import tofu.treat as tft
+from tofu.treat import _compute as _tft_c
 
 
 Root = tfpf.Find_Rootpath()
@@ -110,6 +111,18 @@ class test01_PreData:
         assert self.Obj.t.size==100 and self.Obj.data.shape==(100,100)
         self.Obj.set_Resamp(t=None, f=50., Method='movavrg', interpkind='linear')
         assert self.Obj.t.size==500 and self.Obj.data.shape==(500,100)
+        self.Obj.set_Resamp(t=t, f=None, Method='interp', interpkind='linear', Calc=False)
+        self.Obj.set_Dt(Dt=[2.,5.], Calc=False)
+        assert self.Obj.t.size==500
+        self.Obj.calc()
+        assert np.all(self.Obj.t==t[(t>=2.) & (t<=5.)])
+        self.Obj.set_Resamp(t=None, f=50., Method='movavrg', interpkind='linear', Calc=False)
+        self.Obj.set_Dt(Dt=[0.,10.], Calc=False)
+        self.Obj.calc()
+        assert self.Obj.t.size==500
+        self.Obj.set_Resamp(t=None, f=50., Method='polyphase')
+        assert np.all(self.Obj.t==self.Obj._tRef[::2]) and self.Obj.data.shape==(500,100)
+        self.Obj.set_Resamp(t=None, f=50., Method='movavrg', interpkind='linear')
 
     def test03_OutIn(self):
         self.Obj.Out_add(['D05','D30','D55','D70'], LCrit=['Name'])
@@ -155,14 +168,35 @@ class test01_PreData:
     def test08_set_fft(self):
         self.Obj.set_fft(DF=[10.,12.], Harm=False, DFEx=None, HarmEx=True)
         self.Obj.set_fft(DF=[10.,12.], Harm=True, DFEx=[14.,15.], HarmEx=True)
+        assert 'Spect' in self.Obj._Stages.keys()
+        d0 = np.copy(self.Obj.data)
+        self.Obj.set_ModeSmoothing(Freq=11., N=5)
+        assert self.Obj.data.shape==d0.shape and not np.allclose(self.Obj.data, d0)
+        self.Obj.set_ModeSmoothing(Freq=(np.array([0.,10.]),np.array([10.,12.])), N=3)
+        self.Obj.set_ModeSmoothing(Freq=None)
+        assert np.all(self.Obj.data==d0)
 
     def test09_set_PhysNoise(self):
         self.Obj.set_PhysNoise(Method='svd', Modes=range(0,8), DF=None, DFEx=None, Harm=True, HarmEx=True, Deg=0, Nbin=3, LimRatio=0.05, Plot=False)
+        self.Obj.set_PhysNoise(Method='svd', Modes=range(0,8), Rank=12, DF=None, DFEx=None, Harm=True, HarmEx=True, Deg=0, Nbin=3, LimRatio=0.05, Plot=False)
+        self.Obj.set_PhysNoise(Method='svd', Modes=range(0,8), DF=None, DFEx=None, Harm=True, HarmEx=True, Deg=1, Nbin=5, LimRatio=0.05, Plot=False)
+        assert self.Obj._NoiseModel['Noise'].shape==self.Obj.data.shape and self.Obj._NoiseModel['Coefs'].shape==(2,self.Obj.data.shape[1])
+        self.Obj._set_NoiseModel(Deg=2, Nbin=5, LimRatio=None)
+        assert self.Obj._PhysNoise['Bins'].keys()==[5] and self.Obj._NoiseModel['Coefs'].shape==(3,self.Obj.data.shape[1])
         self.Obj.set_PhysNoise(Method='fft', Modes=None, DF=[10.,12.], DFEx=None, Harm=True, HarmEx=True, Deg=0, Nbin=3, LimRatio=0.05, Plot=False)
+        # A degenerate (all-zero) channel does not prevent the fit of the others
+        d0 = np.copy(data)
+        d0[:,3] = 0.
+        obj = tft.PreData(d0, t=t, Chans=Names, Exp='Misc', Diag='Misc', shot=0, SavePath=SavePath)
+        obj.set_PhysNoise(Method='fft', Modes=None, DF=[10.,12.], Deg=1, Nbin=5, LimRatio=0.05, Plot=False)
+        assert np.all(np.isfinite(obj._NoiseModel['Coefs'])) and np.all(obj._NoiseModel['Coefs'][:,3]==0.)
 
 
     def test10_plot(self):
         Lax = self.Obj.plot()
+        LOD = self.Obj._Stages['LOD'][1]
+        assert np.all(LOD[-1]['Min'][0,:]==np.min(self.Obj.data,axis=0)) and np.all(LOD[-1]['Max'][0,:]==np.max(self.Obj.data,axis=0))
+        Lax[1].set_xlim(self.Obj.t[10],self.Obj.t[20])
         plt.close('all')
 
     def test11_plot_svd(self):
@@ -171,6 +205,7 @@ class test01_PreData:
 
     def test12_plot_fft(self):
         Lax = self.Obj.plot_fft(Val=['D19','D48'], Crit='Name', V='simple', SpectNorm=True)
+        Lax = self.Obj.plot_fft(Val=['D19','D48'], Crit='Name', V='simple', SpectNorm=True, Hop=5, Window='hann')
         plt.close('all')
 
     def test13_saveload(self):
@@ -199,3 +234,133 @@ class test01_PreData:
 
 
 
+
+    def test14_memmap(self):
+        pfe = SavePath+'PreData_test_memmap.npy'
+        np.save(pfe, data)
+        obj = tft.PreData(pfe, t=t, Chans=Names, Exp='Misc', Diag='Misc', shot=0, SavePath=SavePath)
+        assert isinstance(obj._dataRef,np.memmap)
+        obj.set_Memmap(Chunk=10000)
+        objRef = tft.PreData(data, t=t, Chans=Names, Exp='Misc', Diag='Misc', shot=0, SavePath=SavePath)
+        for oo in [obj,objRef]:
+            oo.Out_add(['D05','D30'], LCrit=['Name'], Calc=False)
+            oo.set_Resamp(t=None, f=50., Method='movavrg', interpkind='linear', Calc=False)
+            oo.substract_Dt(tsub=[2.,3.], Calc=False)
+            oo.set_fft(DF=[10.,12.], Harm=True, DFEx=None, HarmEx=True, Calc=False)
+            oo.set_ModeSmoothing(Freq=11., N=3, Calc=False)
+            oo.set_Dt(Dt=[2.,8.], Calc=False)
+            oo.calc()
+        assert np.allclose(obj.data, objRef.data) and np.allclose(obj.t, objRef.t)
+        for oo in [obj,objRef]:
+            oo.set_Resamp(f=50., Method='polyphase')
+        assert np.allclose(obj.data, objRef.data) and np.allclose(obj.t, objRef.t)
+        obj.set_Memmap(Chunk=10000, NFIR=31)
+        assert obj.data.shape==objRef.data.shape and np.allclose(obj.t, objRef.t)
+        del obj
+        os.remove(pfe)
+
+    def test15_stream(self):
+        objRef = tft.PreData(data, t=t, Chans=Names, Exp='Misc', Diag='Misc', shot=0, SavePath=SavePath)
+        objRef.Out_add(['D05','D30'], LCrit=['Name'], Calc=False)
+        objRef.set_Resamp(t=None, f=50., Method='movavrg', interpkind='linear', Calc=False)
+        objRef.substract_Dt(tsub=[2.,3.], Calc=True)
+        obj = tft.PreDataStream(Names, NBuffer=300, Exp='Misc', Diag='Misc', shot=0, SavePath=SavePath)
+        obj.Out_add(['D05','D30'], LCrit=['Name'])
+        obj.set_Resamp(t=objRef.t, f=50., Method='movavrg')
+        obj.substract_Dt(tsub=[2.,3.])
+        lind = [0,7,8,150,151,420,999,1000]
+        for ii in range(0,len(lind)-1):
+            obj.append(data[lind[ii]:lind[ii+1],:], t[lind[ii]:lind[ii+1]], Last=ii==len(lind)-2)
+        assert obj.NTot==objRef.t.size and obj.data.shape==(300,98)
+        assert np.allclose(obj.t, objRef.t[-300:]) and np.allclose(obj.data, objRef.data[-300:,:])
+        obj.set_fft(DF=[10.,12.], Harm=True, NFIR=51)
+        dd, tt = obj.append(data, t, Last=True)
+        assert dd.shape==(objRef.t.size,98) and np.allclose(tt, objRef.t)
+        # Blocks too short to set the sampling of the re-sampling and filtering are held back
+        obj.set_Resamp(f=50., Method='movavrg')
+        dd, tt = obj.append(data, t, Last=True)
+        obj.set_Resamp(f=50., Method='movavrg')
+        lind = [0,1,2,3,8,9,1000]
+        Out = [obj.append(data[lind[ii]:lind[ii+1],:], t[lind[ii]:lind[ii+1]], Last=ii==len(lind)-2) for ii in range(0,len(lind)-1)]
+        assert np.allclose(np.concatenate([oo[1] for oo in Out]), tt) and np.allclose(np.concatenate([oo[0] for oo in Out],axis=0), dd)
+
+    def test16_batch(self):
+        objRef = tft.PreData(data, t=t, Chans=Names, Exp='Misc', Diag='Misc', shot=0, SavePath=SavePath)
+        objRef.Out_add(['D05','D30'], LCrit=['Name'], Calc=False)
+        objRef.set_Resamp(t=None, f=50., Method='movavrg', interpkind='linear', Calc=False)
+        objRef.set_fft(DF=[10.,12.], Harm=True, Calc=True)
+        objRef.set_PhysNoise(Method='svd', Modes=range(0,4))
+        LIn = [{'data':2.*data, 't':t, 'Chans':Names, 'Exp':'Misc', 'Diag':'Misc', 'shot':1}, SavePath+'PreData_test_nonexistent.npz']
+        for NProc in [1,2]:
+            Rep = tft.PreData_Batch(objRef, LIn, Path=SavePath, NProc=NProc, Verb=False)
+            assert Rep['Error'][0] is None and Rep['Out'][1] is None and not Rep['Error'][1] is None
+            obj = tfpf.Open(Rep['Out'][0])
+            assert obj.Out_list()==['D05','D30'] and np.allclose(obj.t, objRef.t) and np.allclose(obj.data, 2.*objRef.data)
+            assert obj._PhysNoise['Method']=='svd'
+            os.remove(Rep['Out'][0])
+
+    def test17_doAll_Key(self):
+        # The long arrays nested in the parameters of a stage are part of its key, although repr() abbreviates them
+        pfe = SavePath+'PreData_test_Key.npy'
+        np.save(pfe, data)
+        obj = tft.PreData(pfe, t=t, Chans=Names, Exp='Misc', Diag='Misc', shot=0, SavePath=SavePath)
+        obj.set_Memmap(Chunk=10000)
+        tr = np.linspace(1.,9.,2000)
+        obj.set_Resamp(t=tr, Method='interp', interpkind='linear')
+        d0 = np.copy(obj.data)
+        tr = np.copy(tr)
+        tr[1000] += 1.e-3
+        obj.set_Resamp(t=tr, Method='interp', interpkind='linear')
+        assert obj.t[1000]==tr[1000] and not np.allclose(obj.data[1000,:], d0[1000,:])
+        del obj
+        os.remove(pfe)
+        obj = tft.PreData(data, t=t, Chans=Names, Exp='Misc', Diag='Misc', shot=0, SavePath=SavePath)
+        obj.set_fft(DF=[10.,12.], Harm=True)
+        Freq = (np.linspace(0.,10.,2000), np.linspace(9.,13.,2000))
+        obj.set_ModeSmoothing(Freq=Freq, N=3)
+        d0 = np.copy(obj.data)
+        Freq[1][1000] = 20.
+        obj.set_ModeSmoothing(Freq=(np.copy(Freq[0]),np.copy(Freq[1])), N=3)
+        assert not np.allclose(obj.data, d0)
+
+
+
+
+
+
+
+
+
+#######################################################
+#
+#     Streamed moving average
+#
+#######################################################
+
+
+def test02_MovAverage_Stream():
+    sig = np.random.rand(1000,3)
+    lind = [0,1,3,50,51,500,1000]
+    for NP in [1,4,7,10]:
+        Ref = np.array([np.convolve(sig[:,ii], np.ones((NP,))/NP, mode='same') for ii in range(0,sig.shape[1])]).T
+        Out, State = _tft_c.MovAverage_Stream(sig, NP, Last=True)
+        assert Out.shape==sig.shape and np.allclose(Out, Ref)
+        Out, State = _tft_c.MovAverage_Stream(sig[:,0], NP, Last=True)
+        assert Out.shape==(sig.shape[0],) and np.allclose(Out, Ref[:,0])
+        for Kahan in [False,True]:
+            # Processing the signal in chunks of any size gives exactly the same result as a single pass
+            Out = _tft_c.MovAverage_Stream(sig, NP, Kahan=Kahan, Last=True)[0]
+            State, LOut = None, []
+            for ii in range(0,len(lind)-1):
+                dd, State = _tft_c.MovAverage_Stream(sig[lind[ii]:lind[ii+1],:], NP, State=State, Kahan=Kahan, Last=ii==len(lind)-2)
+                LOut.append(dd)
+            assert np.all(np.concatenate(LOut,axis=0)==Out) and np.allclose(Out, Ref)
+
+def test03_MovAverage_Stream_Kahan():
+    # On a long signal with a large offset, the compensated running sum keeps the accuracy of np.convolve
+    N, NP = 100000, 11
+    sig = 1.e6 + np.random.rand(N)
+    Ref = np.convolve(sig.astype(np.longdouble)-1.e6, np.ones((NP,),dtype=np.longdouble), mode='same')/NP + 1.e6
+    Err = [np.max(np.abs(_tft_c.MovAverage_Stream(sig, NP, Kahan=Kahan, Last=True)[0]-Ref)[NP:-NP]) for Kahan in [False,True]]
+    ErrConv = np.max(np.abs(np.convolve(sig, np.ones((NP,))/NP, mode='same')-Ref)[NP:-NP])
+    assert Err[1]<Err[0] and Err[1]<=10.*ErrConv
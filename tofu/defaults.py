@@ -33,6 +33,12 @@ SaveAddObj = '/Objects_AUG/'
 SaveAddOut = '/Outputs_AUG/'
 MeshSaveAdd = '/Objects/'
 dtmFormat = "D%Y%m%d_T%H%M%S"
+SaveNpyMinSize = 100000         # Minimum size (bytes) of the np.ndarrays saved as separate (memory-mappable) members of npz files
+Openmmap = True
+OpenNThreads = 4                # Number of threads used by tofu.pathfile.Open_Bulk() for loading several files concurrently
+CompressLevel = 6               # zlib compression level used when saving with compressed=True
+CompressChunkSize = 1048576     # Size (bytes) of the chunks of arrays compressed independently when saving with compressed=True
+CompressNThreads = 4            # Number of threads used for (de)compressing the chunks
 
 
 
@@ -315,6 +321,12 @@ DetSynthdX12Mode = 'abs'
 DetSynthds = 0.005
 DetSynthdsMode = 'abs'
 DetSynthMarginS = 0.001
+DetSynthCompact = False
+DetLazy = False
+DetCache = None
+DetCacheMaxSize = 2.e9
+GDetSynthdXYZ = [0.005, 0.005, 0.005]
+GDetSynthNPChunk = 1000000
 
 # --- Plotting dictionaries and parameters ------
 
@@ -906,6 +918,17 @@ def Plot_SynDiag_DefAxes(a4=False):
 """
 
 
+# ------------ Computing settings ---------------
+
+FFTChunkSize = 4194304          # Max number of elements of the stack of time windows fed at once to np.fft.rfft() by the running fft (limits memory usage)
+PreDataChunk = 16777216         # Max number of elements of the data processed at once by PreData when the reference data is a np.memmap (out-of-core)
+PreDataStreamNBuffer = 100000   # Number of treated time samples kept in the ring buffer of PreDataStream
+PreDataStreamNFIR = 255         # Number of coefficients (odd) of the FIR filter used by PreDataStream for online fft filtering
+PreDataPolyphaseNTaps = 10      # Half-length (in re-sampled time steps) of the anti-aliasing FIR filter of the 'polyphase' re-sampling of PreData
+PreDataBatchNProc = 4           # Number of processes used by tofu.treat.PreData_Batch() for treating several shots concurrently
+LODBase = 4                     # Decimation factor between two consecutive levels of the min/max pyramids used for plotting long signals (level of detail)
+
+
 
 def Plot_TreatSig_Def(a4=False, nMax=4):
     (fW,fH,fdpi,axCol) = (11.69,8.27,80,'w') if a4 else (22,10,80,'w')
@@ -11,8 +11,18 @@ import math
 import Polygon as plg
 import scipy.integrate as scpinteg
 import warnings
+import sys
 cimport cython
 import datetime as dtm
+from libc.stdlib cimport malloc, free
+from libc.string cimport memset
+from libc.math cimport sqrt as Csqrt, atan2 as Catan2, cos as Ccos, sin as Csin, fabs as Cfabs, M_PI as CPI
+from cpython.ref cimport PyObject, Py_INCREF, Py_XDECREF
+from cpython.pycapsule cimport PyCapsule_New, PyCapsule_GetPointer, PyCapsule_IsValid
+try:
+    from scipy import LowLevelCallable
+except ImportError:
+    LowLevelCallable = None
 
 
 
@@ -827,7 +837,9 @@ def dblquad_custom(func, a, b, gfun, hfun, args=(), epsabs=0., epsrel=1e-4, limi
         a = gfun(x)
         b = hfun(x)
         myargs = (x,) + more_args
-        return scpinteg.quad(func,a,b,args=myargs, epsabs=0., epsrel=epsrel, limit=limit, points=pointsx2)[0]
+        Out = scpinteg.quad(func,a,b,args=myargs, epsabs=0., epsrel=epsrel, limit=limit, points=pointsx2)[0]
+        _FuncSAquad_Check(func)
+        return Out
 
     return scpinteg.quad(_infunc,a,b,(func,gfun,hfun,args),epsabs=epsabs,epsrel=epsrel, limit=limit, points=pointsx1)
 
@@ -2392,7 +2404,10 @@ def Calc_IsVis_LPolysPoints_Flex(list LPolys, np.ndarray[DTYPE_t, ndim=2] Points
 
 
 
-def FuncSAquad_Apert(list LPolys, nPtemp, e1bis, e2bis, Ps, e1, e2, LBaryS, LnIn, nPolys, PBary, VPoly, VVin, list DLong=[], str VType='Tor', Colis=True):
+def FuncSAquad_Apert(list LPolys, nPtemp, e1bis, e2bis, Ps, e1, e2, LBaryS, LnIn, nPolys, PBary, VPoly, VVin, list DLong=[], str VType='Tor', Colis=True, LowLevel=True):
+    """ Return the adequate function for computing the solid angle of a Detect+Apert system, with or without colisions, as a scipy.LowLevelCallable if LowLevel and possible (see _FuncSAquad_LowLevel()) """
+    if LowLevel and not LowLevelCallable is None and all([_Poly_isConvex(pp) for pp in LPolys]):
+        return _FuncSAquad_LowLevel(Ps, e1, e2, LBaryS, LnIn, nPolys, PBary, VPoly, VVin, DLong=DLong, VType=VType, Colis=Colis, LPolys=LPolys, SAPlane=(PBary,nPtemp,e1bis,e2bis))
     Ps0, Ps1, Ps2 = Ps
     e10, e11, e12 = e1
     e20, e21, e22 = e2
@@ -2560,7 +2575,7 @@ cdef Calc_SAngVect_LPolys1Point_Lens(DTYPE_t O0, DTYPE_t O1, DTYPE_t O2, DTYPE_t
                 if PolyInt.area() > AreaLim:
                     BaryS0, BaryS1 = PolyInt.center()
                     Ref0, Ref1, Ref2 = O0+BaryS0*nperp0+BaryS1*e20, O1+BaryS0*nperp1+BaryS1*e21, O2+BaryS0*nperp2+BaryS1*e22
-                    PolyInt0, PolyInt1 = np.array(PolyInt[0]).T
+                    PolyInt0, PolyInt1 = np.array(PolyInt[0]+[PolyInt[0][0]]).T
                     PolyLL0 = O0 + PolyInt0*nperp0+PolyInt1*e20
                     PolyLL1 = O1 + PolyInt0*nperp1+PolyInt1*e21
                     PolyLL2 = O2 + PolyInt0*nperp2+PolyInt1*e22
@@ -2637,7 +2652,7 @@ cdef Calc_SAngVect_LPolysPoints_Lens(DTYPE_t O0, DTYPE_t O1, DTYPE_t O2, DTYPE_t
                     if PolyInt.area() > AreaLim:
                         BaryS0, BaryS1 = PolyInt.center()
                         Ref0, Ref1, Ref2 = O0+BaryS0*nperp0[IndrIm3[ii]]+BaryS1*e20, O1+BaryS0*nperp1[IndrIm3[ii]]+BaryS1*e21, O2+BaryS0*nperp2[IndrIm3[ii]]+BaryS1*e22
-                        PolyInt0, PolyInt1 = np.array(PolyInt[0]).T
+                        PolyInt0, PolyInt1 = np.array(PolyInt[0]+[PolyInt[0][0]]).T
                         PolyLL0 = O0 + PolyInt0*nperp0[IndrIm3[ii]]+PolyInt1*e20
                         PolyLL1 = O1 + PolyInt0*nperp1[IndrIm3[ii]]+PolyInt1*e21
                         PolyLL2 = O2 + PolyInt0*nperp2[IndrIm3[ii]]+PolyInt1*e22
@@ -2675,8 +2690,10 @@ def Calc_SAngVect_LPolys1Point_Flex_Lens(DTYPE_t O0, DTYPE_t O1, DTYPE_t O2, DTY
 
 
 
-def FuncSAquad_Lens(O, Tip, Ps, e1, e2, LBaryS, LnIn, int nPolys, DTYPE_t RadL, DTYPE_t RadD, DTYPE_t F1, DTYPE_t tanthetmax, PolyL, VPoly, VVin, list DLong=[], str VType='Tor', thet=np.linspace(0.,2.*np.pi,100), VectReturn=False, Colis=True):
-    """ Return the adequate function for computing the solid angle of a Detect+Lens system, with or without colisions """
+def FuncSAquad_Lens(O, Tip, Ps, e1, e2, LBaryS, LnIn, int nPolys, DTYPE_t RadL, DTYPE_t RadD, DTYPE_t F1, DTYPE_t tanthetmax, PolyL, VPoly, VVin, list DLong=[], str VType='Tor', thet=np.linspace(0.,2.*np.pi,100), VectReturn=False, Colis=True, LowLevel=True):
+    """ Return the adequate function for computing the solid angle of a Detect+Lens system, with or without colisions, as a scipy.LowLevelCallable if LowLevel and possible (see _FuncSAquad_LowLevel()) """
+    if LowLevel and not VectReturn and not LowLevelCallable is None:
+        return _FuncSAquad_LowLevel(Ps, e1, e2, LBaryS, LnIn, nPolys, O, VPoly, VVin, DLong=DLong, VType=VType, Colis=Colis, Lens=(O, Tip, LnIn[:,1], RadL, RadD, F1, tanthetmax, PolyL, thet))
     O0, O1, O2 = O
     Tip0, Tip1, Tip2 = Tip
     Ps0, Ps1, Ps2 = Ps
@@ -2704,3 +2721,366 @@ def FuncSAquad_Lens(O, Tip, Ps, e1, e2, LBaryS, LnIn, int nPolys, DTYPE_t RadL,
 
 
 
+
+
+
+"""
+###############################################################################
+###############################################################################
+                    Native integrands for quad
+###############################################################################
+"""
+
+# The solid angle integrands of Calc_Etendue_PlaneLOS() in 'quad' mode are evaluated millions of times by dblquad_custom()
+# They are thus provided as scipy.LowLevelCallable: quadpack calls _FuncSAquad_C() directly, with the geometry packed in a _SAquad_t struct (user data)
+# The polygons intersections are computed by Sutherland-Hodgman clipping (instead of Polygon), which requires convex polygons
+# Only the collision test (optional), for points with non-zero solid angle, calls back into Python
+# Exceptions cannot propagate through quadpack: the first one is stored in the struct (the integrand then returns 0) and re-raised by _FuncSAquad_Check() after quad
+
+ctypedef struct _SAquad_t:
+    int Lens                    # 0 for a Detect+Apert system, 1 for a Detect+Lens system
+    double Ps[3]                # Integration plane (point and unit vectors)
+    double e1[3]
+    double e2[3]
+    int nPolys                  # Planes (barycenters and normal vectors) on the good side of which points must lie
+    double* Barys
+    double* nIns
+    int NList                   # Apert: polygons (concatenated) and their number of points
+    int* NPts
+    double* Polys
+    double P[3]                 # Apert: plane on which the polygons are projected
+    double nP[3]
+    double e1P[3]
+    double e2P[3]
+    double O[3]                 # Lens: center, cone tip, axis, geometry and polygon
+    double Tip[3]
+    double nIn[3]
+    double RadL
+    double RadD
+    double F1
+    double tanthetmax
+    int NL
+    double* PolyL
+    int NThet
+    double* thet
+    int NBuf                    # Work buffers for the polygons
+    double* Buf
+    double Ref[3]               # Starting point of the LOS used for the collision test
+    PyObject* ColisArgs         # (VPoly, VVin, DLong, VType) or NULL if no collision test
+    PyObject* Exc               # sys.exc_info() of the exception raised by the collision test, or NULL
+
+
+cdef void _SAquad_Free(object Capsule):
+    cdef _SAquad_t* dd = <_SAquad_t*>PyCapsule_GetPointer(Capsule, "_SAquad_t")
+    free(dd.Barys)
+    free(dd.nIns)
+    free(dd.NPts)
+    free(dd.Polys)
+    free(dd.PolyL)
+    free(dd.thet)
+    free(dd.Buf)
+    Py_XDECREF(dd.ColisArgs)
+    Py_XDECREF(dd.Exc)
+    free(dd)
+
+
+cdef double* _SAquad_Copy(Arr):
+    cdef np.ndarray[DTYPE_t, ndim=1, mode='c'] aa = np.ascontiguousarray(Arr, dtype=float).ravel()
+    cdef double* Out = <double*>malloc(max(1,aa.size)*sizeof(double))
+    cdef Py_ssize_t ii
+    for ii in range(0,aa.size):
+        Out[ii] = aa[ii]
+    return Out
+
+
+def _Poly_isConvex(Poly, DTYPE_t Eps=1.e-12):
+    """ Return True if the (3,N) planar polygon Poly (closed or not) is convex """
+    Poly = np.asarray(Poly, dtype=float)
+    E = np.roll(Poly,-1,axis=1) - Poly
+    E = E[:,np.sum(E**2,axis=0)>1.e-16*np.max(np.sum(E**2,axis=0))]
+    if E.shape[1]<3:
+        return True
+    n = np.sum(np.cross(E.T, np.roll(E,-1,axis=1).T),axis=0)
+    Cross = np.cross(E.T, np.roll(E,-1,axis=1).T).dot(n)
+    Lim = Eps*np.max(np.abs(Cross))
+    return bool(np.all(Cross>=-Lim) or np.all(Cross<=Lim))
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double _SAquad_SAng(double Pt0, double Pt1, double Pt2, double* V, int N, int NEdge, double G0, double G1, double G2):
+    """ Solid angle subtended from Pt by the 3D polygon V ((x,y,z) per point, NEdge edges, NEdge=N if not closed), see Calc_SAngVect_1Point1Poly_NoVect() """
+    cdef int ii, jj
+    cdef double PG0 = G0-Pt0, PG1 = G1-Pt1, PG2 = G2-Pt2
+    cdef double PGn = Csqrt(PG0*PG0+PG1*PG1+PG2*PG2)
+    cdef double PP10, PP11, PP12, PP20, PP21, PP22, PP1n, PP2n, ATan1, ATan2, sa
+    cdef double SAngs = 0.
+    for ii in range(0,NEdge):
+        jj = (ii+1) % N
+        PP10, PP11, PP12 = V[3*ii]-Pt0, V[3*ii+1]-Pt1, V[3*ii+2]-Pt2
+        PP20, PP21, PP22 = V[3*jj]-Pt0, V[3*jj+1]-Pt1, V[3*jj+2]-Pt2
+        PP1n = Csqrt(PP10*PP10+PP11*PP11+PP12*PP12)
+        PP2n = Csqrt(PP20*PP20+PP21*PP21+PP22*PP22)
+        ATan1 = Cfabs(PG0*(PP11*PP22-PP12*PP21) + PG1*(PP12*PP20-PP10*PP22) + PG2*(PP10*PP21-PP11*PP20))
+        ATan2 = PGn*PP1n*PP2n + (PG0*PP10+PG1*PP11+PG2*PP12)*PP2n + (PG0*PP20+PG1*PP21+PG2*PP22)*PP1n + (PP10*PP20+PP11*PP21+PP12*PP22)*PGn
+        sa = Catan2(ATan1, ATan2)
+        SAngs = SAngs + sa if sa>=0 else SAngs + sa + CPI
+    return 2.*SAngs
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef int _SAquad_Clip(double* X, double* Y, int N, double* CX, double* CY, int NC, double* TX, double* TY):
+    """ Clip in place the polygon (X,Y) (N points) by the convex polygon (CX,CY) (Sutherland-Hodgman, using (TX,TY) as work buffer), return the number of points of the intersection """
+    cdef int ii, jj, kk, NOut
+    cdef double Sign = 0., ux, uy, cp, cq, L2 = 0.
+    cdef int Swap = 0
+    for ii in range(0,NC):
+        jj = (ii+1) % NC
+        Sign += CX[ii]*CY[jj] - CX[jj]*CY[ii]
+        L2 = max(L2, (CX[jj]-CX[ii])**2 + (CY[jj]-CY[ii])**2)
+    Sign = 1. if Sign>=0. else -1.
+    for ii in range(0,NC):
+        if N==0:
+            break
+        jj = (ii+1) % NC
+        ux, uy = CX[jj]-CX[ii], CY[jj]-CY[ii]
+        # Degenerate edges (e.g.: closing point equal to the first one up to rounding errors) have no meaningful direction
+        if ux*ux+uy*uy <= 1.e-16*L2:
+            continue
+        NOut = 0
+        for kk in range(0,N):
+            cp = Sign*(ux*(Y[kk]-CY[ii]) - uy*(X[kk]-CX[ii]))
+            cq = Sign*(ux*(Y[(kk+1)%N]-CY[ii]) - uy*(X[(kk+1)%N]-CX[ii]))
+            if cp>=0.:
+                TX[NOut], TY[NOut] = X[kk], Y[kk]
+                NOut += 1
+            if (cp>=0.)!=(cq>=0.):
+                TX[NOut], TY[NOut] = X[kk] + cp/(cp-cq)*(X[(kk+1)%N]-X[kk]), Y[kk] + cp/(cp-cq)*(Y[(kk+1)%N]-Y[kk])
+                NOut += 1
+        X, TX = TX, X
+        Y, TY = TY, Y
+        Swap = 1-Swap
+        N = NOut
+    if Swap:
+        for kk in range(0,N):
+            TX[kk], TY[kk] = X[kk], Y[kk]
+    return N
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double _SAquad_Area(double* X, double* Y, int N, double* Bary):
+    """ Return the (absolute) area of the polygon (X,Y) and store its center of mass in Bary """
+    cdef int ii, jj
+    cdef double A = 0., Cx = 0., Cy = 0., cc
+    Bary[0], Bary[1] = 0., 0.
+    for ii in range(0,N):
+        jj = (ii+1) % N
+        cc = X[ii]*Y[jj] - X[jj]*Y[ii]
+        A += cc
+        Cx += (X[ii]+X[jj])*cc
+        Cy += (Y[ii]+Y[jj])*cc
+    if A!=0.:
+        Bary[0], Bary[1] = Cx/(3.*A), Cy/(3.*A)
+    return Cfabs(A)/2.
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef int _SAquad_Apert_Plane(_SAquad_t* dd, double Pt0, double Pt1, double Pt2, double* nP, double* e1P, double* e2P, double* SAng):
+    """ Solid angle of a Detect+Apert system from Pt, projecting the polygons on plane (dd.P,nP), see Calc_SAngVect_LPolys1Point_NoVect(), return 1 if a polygon cannot be projected """
+    cdef int ii, jj, N = 0, NC, Ind = 0
+    cdef double ScaAPn = (dd.P[0]-Pt0)*nP[0] + (dd.P[1]-Pt1)*nP[1] + (dd.P[2]-Pt2)*nP[2]
+    cdef double AM0, AM1, AM2, ScaAMn, k, D0, D1, D2
+    cdef double Bary[2]
+    cdef double *X = dd.Buf, *Y = dd.Buf+dd.NBuf, *TX = dd.Buf+2*dd.NBuf, *TY = dd.Buf+3*dd.NBuf, *CX = dd.Buf+4*dd.NBuf, *CY = dd.Buf+5*dd.NBuf, *V = dd.Buf+6*dd.NBuf
+    SAng[0] = 0.
+    for ii in range(0,dd.NList):
+        for jj in range(0,dd.NPts[ii]):
+            AM0, AM1, AM2 = dd.Polys[3*(Ind+jj)]-Pt0, dd.Polys[3*(Ind+jj)+1]-Pt1, dd.Polys[3*(Ind+jj)+2]-Pt2
+            ScaAMn = AM0*nP[0] + AM1*nP[1] + AM2*nP[2]
+            if ScaAMn*ScaAPn<0:
+                return 1
+            k = ScaAPn/ScaAMn if Cfabs(ScaAMn)-1.e-14 > 0 else 0.
+            D0, D1, D2 = Pt0+k*AM0-dd.P[0], Pt1+k*AM1-dd.P[1], Pt2+k*AM2-dd.P[2]
+            CX[jj], CY[jj] = D0*e1P[0]+D1*e1P[1]+D2*e1P[2], D0*e2P[0]+D1*e2P[1]+D2*e2P[2]
+        if ii==0:
+            for jj in range(0,dd.NPts[ii]):
+                X[jj], Y[jj] = CX[jj], CY[jj]
+            N = dd.NPts[ii]
+        else:
+            N = _SAquad_Clip(X, Y, N, CX, CY, dd.NPts[ii], TX, TY)
+        Ind += dd.NPts[ii]
+    if N>=3 and _SAquad_Area(X, Y, N, Bary)>1e-12:
+        for jj in range(0,N):
+            V[3*jj], V[3*jj+1], V[3*jj+2] = dd.P[0]+e1P[0]*X[jj]+e2P[0]*Y[jj], dd.P[1]+e1P[1]*X[jj]+e2P[1]*Y[jj], dd.P[2]+e1P[2]*X[jj]+e2P[2]*Y[jj]
+        SAng[0] = _SAquad_SAng(Pt0,Pt1,Pt2, V, N, N, dd.P[0]+e1P[0]*Bary[0]+e2P[0]*Bary[1], dd.P[1]+e1P[1]*Bary[0]+e2P[1]*Bary[1], dd.P[2]+e1P[2]*Bary[0]+e2P[2]*Bary[1])
+    return 0
+
+
+@cython.cdivision(True)
+cdef double _SAquad_Apert(_SAquad_t* dd, double Pt0, double Pt1, double Pt2):
+    """ Solid angle of a Detect+Apert system from Pt, using a plane perpendicular to (P,Pt) if the polygons cannot be projected on the default plane, see Calc_SAngVect_LPolys1Point_Flex() """
+    cdef double SAng = 0., norm
+    cdef double nP[3]
+    cdef double e1P[3]
+    cdef double e2P[3]
+    if _SAquad_Apert_Plane(dd, Pt0, Pt1, Pt2, dd.nP, dd.e1P, dd.e2P, &SAng)==1:
+        norm = Csqrt((Pt0-dd.P[0])**2 + (Pt1-dd.P[1])**2 + (Pt2-dd.P[2])**2)
+        nP[0], nP[1], nP[2] = (Pt0-dd.P[0])/norm, (Pt1-dd.P[1])/norm, (Pt2-dd.P[2])/norm
+        if Cfabs(nP[2])<0.9:
+            norm = Csqrt(nP[0]**2+nP[1]**2)
+            e1P[0], e1P[1], e1P[2] = -nP[1]/norm, nP[0]/norm, 0.
+        else:
+            norm = Csqrt(nP[1]**2+nP[2]**2)
+            e1P[0], e1P[1], e1P[2] = 0., -nP[2]/norm, nP[1]/norm
+        e2P[0], e2P[1], e2P[2] = nP[1]*e1P[2]-nP[2]*e1P[1], nP[2]*e1P[0]-nP[0]*e1P[2], nP[0]*e1P[1]-nP[1]*e1P[0]
+        if _SAquad_Apert_Plane(dd, Pt0, Pt1, Pt2, nP, e1P, e2P, &SAng)==1:
+            SAng = 0.
+    return SAng
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef double _SAquad_Lens(_SAquad_t* dd, double Pt0, double Pt1, double Pt2):
+    """ Solid angle of a Detect+Lens system from Pt, see Calc_SAngVect_LPolys1Point_Lens() """
+    cdef int jj, N
+    cdef double O0 = dd.O[0], O1 = dd.O[1], O2 = dd.O[2], nIn0 = dd.nIn[0], nIn1 = dd.nIn[1], nIn2 = dd.nIn[2]
+    cdef double din = (Pt0-O0)*nIn0 + (Pt1-O1)*nIn1 + (Pt2-O2)*nIn2
+    cdef double dinTip = (Pt0-dd.Tip[0])*nIn0 + (Pt1-dd.Tip[1])*nIn1 + (Pt2-dd.Tip[2])*nIn2
+    cdef double nperp0, nperp1, nperp2, r, rIm, Cs0, Cs1, Cs2, RadIm, Rbis, e20, e21, e22, Ref0, Ref1, Ref2
+    cdef double AreaLim = CPI*(min(dd.RadL,dd.RadD)/10000.)**2
+    cdef double Bary[2]
+    cdef double *X = dd.Buf, *Y = dd.Buf+dd.NBuf, *TX = dd.Buf+2*dd.NBuf, *TY = dd.Buf+3*dd.NBuf, *CX = dd.Buf+4*dd.NBuf, *CY = dd.Buf+5*dd.NBuf, *V = dd.Buf+6*dd.NBuf
+
+    # Check point is inside the viewing cone
+    r = Csqrt((Pt0-dd.Tip[0]-dinTip*nIn0)**2 + (Pt1-dd.Tip[1]-dinTip*nIn1)**2 + (Pt2-dd.Tip[2]-dinTip*nIn2)**2)
+    if not (r/dinTip <= dd.tanthetmax and din>0.):
+        return 0.
+
+    # Image of the Lens in its focal plane
+    nperp0, nperp1, nperp2 = Pt0-O0-din*nIn0, Pt1-O1-din*nIn1, Pt2-O2-din*nIn2
+    r = Csqrt(nperp0**2+nperp1**2+nperp2**2)
+    rIm = r * dd.F1 / din
+    if not r==0.:
+        nperp0, nperp1, nperp2 = nperp0/r, nperp1/r, nperp2/r
+    Cs0, Cs1, Cs2 = O0-dd.F1*nIn0-nperp0*rIm, O1-dd.F1*nIn1-nperp1*rIm, O2-dd.F1*nIn2-nperp2*rIm
+    RadIm = dd.RadL * Csqrt((O0-Cs0)**2+(O1-Cs1)**2+(O2-Cs2)**2) / Csqrt((O0-Pt0)**2+(O1-Pt1)**2+(O2-Pt2)**2)
+    if not rIm < RadIm+dd.RadD:
+        return 0.
+
+    # Image of the Lens included in Detector
+    if rIm+RadIm <= dd.RadD:
+        return _SAquad_SAng(Pt0,Pt1,Pt2, dd.PolyL, dd.NL, dd.NL-1, O0,O1,O2)
+
+    Rbis = dd.RadD * din / dd.F1
+    e20, e21, e22 = nIn1*nperp2-nIn2*nperp1, nIn2*nperp0-nIn0*nperp2, nIn0*nperp1-nIn1*nperp0
+    # Detector included in image of Lens
+    if RadIm > rIm+dd.RadD:
+        Ref0, Ref1, Ref2 = O0+nperp0*r, O1+nperp1*r, O2+nperp2*r
+        for jj in range(0,dd.NThet):
+            V[3*jj] = Ref0 + Rbis*Ccos(dd.thet[jj])*nperp0 + Rbis*Csin(dd.thet[jj])*e20
+            V[3*jj+1] = Ref1 + Rbis*Ccos(dd.thet[jj])*nperp1 + Rbis*Csin(dd.thet[jj])*e21
+            V[3*jj+2] = Ref2 + Rbis*Ccos(dd.thet[jj])*nperp2 + Rbis*Csin(dd.thet[jj])*e22
+        return _SAquad_SAng(Pt0,Pt1,Pt2, V, dd.NThet, dd.NThet-1, Ref0,Ref1,Ref2)
+
+    # Partial intersection
+    for jj in range(0,dd.NL):
+        X[jj] = (dd.PolyL[3*jj]-O0)*nperp0 + (dd.PolyL[3*jj+1]-O1)*nperp1 + (dd.PolyL[3*jj+2]-O2)*nperp2
+        Y[jj] = (dd.PolyL[3*jj]-O0)*e20 + (dd.PolyL[3*jj+1]-O1)*e21 + (dd.PolyL[3*jj+2]-O2)*e22
+    for jj in range(0,dd.NThet):
+        CX[jj], CY[jj] = r + Rbis*Ccos(dd.thet[jj]), Rbis*Csin(dd.thet[jj])
+    N = _SAquad_Clip(X, Y, dd.NL, CX, CY, dd.NThet, TX, TY)
+    if N<3 or not _SAquad_Area(X, Y, N, Bary) > AreaLim:
+        return 0.
+    for jj in range(0,N):
+        V[3*jj], V[3*jj+1], V[3*jj+2] = O0+X[jj]*nperp0+Y[jj]*e20, O1+X[jj]*nperp1+Y[jj]*e21, O2+X[jj]*nperp2+Y[jj]*e22
+    return _SAquad_SAng(Pt0,Pt1,Pt2, V, N, N, O0+Bary[0]*nperp0+Bary[1]*e20, O1+Bary[0]*nperp1+Bary[1]*e21, O2+Bary[0]*nperp2+Bary[1]*e22)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef double _FuncSAquad_C(int n, double* xx, void* user_data):
+    """ Integrand of dblquad_custom() (signature of scipy.LowLevelCallable), xx = (x2, x1) """
+    cdef _SAquad_t* dd = <_SAquad_t*>user_data
+    cdef double x2 = xx[0], x1 = xx[1]
+    cdef double Pt0 = dd.Ps[0]+x1*dd.e1[0]+x2*dd.e2[0], Pt1 = dd.Ps[1]+x1*dd.e1[1]+x2*dd.e2[1], Pt2 = dd.Ps[2]+x1*dd.e1[2]+x2*dd.e2[2]
+    cdef double SAng
+    cdef int ii
+    if dd.Exc!=NULL:
+        return 0.
+    for ii in range(0,dd.nPolys):
+        if (Pt0-dd.Barys[ii])*dd.nIns[ii] + (Pt1-dd.Barys[dd.nPolys+ii])*dd.nIns[dd.nPolys+ii] + (Pt2-dd.Barys[2*dd.nPolys+ii])*dd.nIns[2*dd.nPolys+ii] <= 0.:
+            return 0.
+    SAng = _SAquad_Lens(dd, Pt0, Pt1, Pt2) if dd.Lens else _SAquad_Apert(dd, Pt0, Pt1, Pt2)
+    if SAng>0. and dd.ColisArgs!=NULL:
+        Args = <tuple>dd.ColisArgs
+        try:
+            if not Calc_InOut_LOS_Colis_1D(dd.Ref[0],dd.Ref[1],dd.Ref[2], Pt0,Pt1,Pt2, Args[0], Args[1], DLong=Args[2], VType=Args[3]):
+                return 0.
+        except BaseException:
+            Exc = sys.exc_info()
+            Py_INCREF(Exc)
+            dd.Exc = <PyObject*>Exc
+            return 0.
+    return SAng
+
+
+def _FuncSAquad_Check(Func):
+    """ Re-raise the exception stored by the integrand Func during the last quad, if Func was returned by _FuncSAquad_LowLevel() (no-op otherwise) """
+    if LowLevelCallable is None or not isinstance(Func, LowLevelCallable) or not PyCapsule_IsValid(Func.user_data, "_SAquad_t"):
+        return
+    cdef _SAquad_t* dd = <_SAquad_t*>PyCapsule_GetPointer(Func.user_data, "_SAquad_t")
+    if dd.Exc!=NULL:
+        Exc = <tuple>dd.Exc
+        Py_XDECREF(dd.Exc)
+        dd.Exc = NULL
+        raise Exc[0], Exc[1], Exc[2]
+
+
+def _FuncSAquad_LowLevel(Ps, e1, e2, LBaryS, LnIn, int nPolys, Ref, VPoly, VVin, list DLong=[], str VType='Tor', Colis=True, LPolys=None, SAPlane=None, Lens=None):
+    """ Return the solid angle integrand of FuncSAquad_Apert() (if LPolys and SAPlane are provided) or FuncSAquad_Lens() (if Lens is provided) as a scipy.LowLevelCallable
+
+    The integrand is to be fed to dblquad_custom() and integrated over (x2,x1) in the plane (Ps,e1,e2), the polygons must be convex.
+    Ref is the starting point of the LOS used for the collision test (the barycenter of the polygons or the center of the Lens).
+    Lens is a tuple (O, Tip, nIn, RadL, RadD, F1, tanthetmax, PolyL, thet).
+    """
+    assert (LPolys is None)!=(Lens is None), "Exactly one of Args LPolys and Lens must be provided !"
+    cdef _SAquad_t* dd = <_SAquad_t*>malloc(sizeof(_SAquad_t))
+    cdef int ii, NTot
+    memset(dd, 0, sizeof(_SAquad_t))
+    Capsule = PyCapsule_New(<void*>dd, "_SAquad_t", _SAquad_Free)
+    for ii in range(0,3):
+        dd.Ps[ii], dd.e1[ii], dd.e2[ii], dd.Ref[ii] = Ps[ii], e1[ii], e2[ii], Ref[ii]
+    dd.nPolys = nPolys
+    dd.Barys, dd.nIns = _SAquad_Copy(np.asarray(LBaryS)[:,:nPolys]), _SAquad_Copy(np.asarray(LnIn)[:,:nPolys])
+    if Lens is None:
+        dd.Lens, dd.NList = 0, len(LPolys)
+        dd.NPts = <int*>malloc(dd.NList*sizeof(int))
+        for ii in range(0,dd.NList):
+            dd.NPts[ii] = LPolys[ii].shape[1]
+        NTot = int(np.sum([pp.shape[1] for pp in LPolys]))
+        dd.Polys = _SAquad_Copy(np.concatenate(tuple(LPolys),axis=1).T)
+        for ii in range(0,3):
+            dd.P[ii], dd.nP[ii], dd.e1P[ii], dd.e2P[ii] = SAPlane[0][ii], SAPlane[1][ii], SAPlane[2][ii], SAPlane[3][ii]
+    else:
+        O, Tip, nIn, dd.RadL, dd.RadD, dd.F1, dd.tanthetmax, PolyL, thet = Lens
+        dd.Lens, dd.NL, dd.NThet = 1, PolyL.shape[1], len(thet)
+        for ii in range(0,3):
+            dd.O[ii], dd.Tip[ii], dd.nIn[ii] = O[ii], Tip[ii], nIn[ii]
+        dd.PolyL, dd.thet = _SAquad_Copy(np.asarray(PolyL).T), _SAquad_Copy(thet)
+        NTot = dd.NL + dd.NThet
+    # Clipping a polygon of N points by a convex one of NC points gives at most N+NC points
+    dd.NBuf = 2*NTot+4
+    dd.Buf = <double*>malloc(9*dd.NBuf*sizeof(double))
+    if Colis:
+        Args = (VPoly, VVin, DLong, VType)
+        Py_INCREF(Args)
+        dd.ColisArgs = <PyObject*>Args
+    return LowLevelCallable(PyCapsule_New(<void*>_FuncSAquad_C, "double (int, double *, void *)", NULL), Capsule)
@@ -1596,6 +1596,62 @@ def _Detect_set_SigPrecomp(DPoly, DBaryS, DnIn, LOPolys, LOBaryS, LOnIns, SAngPl
     return _SynthDiag_Points, _SynthDiag_SAng, _SynthDiag_Vect, _SynthDiag_dV, _SynthDiag_ds, _SynthDiag_dsMode, _SynthDiag_MarginS, _SynthDiag_dX12, _SynthDiag_dX12Mode, _SynthDiag_Colis
 
 
+def _Detect_SigPrecomp_Compress(Points, SAng, Vect, LOSD, LOSu):        # Used
+    """ Return a compact (quantised) version of the pre-computed VOS mesh of a Detect
+
+    The points are expressed in the local frame (e1,e2,u) of the LOS and stored as uint16 indices on a regular lattice (origin + steps), which is finer than the sampling grid
+    The solid angles are stored as float32 and the (unit) vectors are octahedron-encoded on 2 int16 per point
+    The memory footprint goes from 56 to 14 bytes per point
+    """
+    e1, e2 = GG.Calc_DefaultCheck_e1e2_PLane_1D(LOSD, LOSu)
+    Frame = np.array([e1,e2,LOSu]).T
+    Loc = Frame.T.dot(Points-LOSD.reshape((3,1)))
+    Origin = np.min(Loc,axis=1)
+    Step = (np.max(Loc,axis=1)-Origin)/float(np.iinfo(np.uint16).max)
+    Step[Step==0.] = 1.
+    Ind = np.round((Loc-Origin.reshape((3,1)))/Step.reshape((3,1))).astype(np.uint16)
+
+    V = Vect/np.sum(np.abs(Vect),axis=0)
+    sgn0, sgn1 = np.where(V[0,:]>=0.,1.,-1.), np.where(V[1,:]>=0.,1.,-1.)
+    indneg = V[2,:]<0.
+    V0 = np.where(indneg, (1.-np.abs(V[1,:]))*sgn0, V[0,:])
+    V1 = np.where(indneg, (1.-np.abs(V[0,:]))*sgn1, V[1,:])
+    VOct = np.round(np.array([V0,V1])*np.iinfo(np.int16).max).astype(np.int16)
+
+    return {'LOSD':np.copy(LOSD), 'Frame':Frame, 'Origin':Origin, 'Step':Step, 'Ind':Ind, 'SAng':SAng.astype(np.float32), 'Vect':VOct}
+
+
+def Calc_SynthDiag_SharedGrid(LCone_PolyCrossbis, LCone_PolyHorbis, dXYZ=TFD.GDetSynthdXYZ, VType='Tor'):        # Used
+    """ Return the 1D (X,Y,Z) coordinates of a regular cartesian grid covering the union of the cones of several Detect, and the associated elementary volume
+
+    The bounding box is derived from the horizontal (X,Y) and cross-section (R,Z) or (Y,Z) projections of the cones
+    """
+    PolyHor = np.concatenate([pp for LP in LCone_PolyHorbis for pp in LP],axis=1)
+    PolyCross = np.concatenate([pp for LP in LCone_PolyCrossbis for pp in LP],axis=1)
+    XLim, YLim, ZLim = [PolyHor[0,:].min(),PolyHor[0,:].max()], [PolyHor[1,:].min(),PolyHor[1,:].max()], [PolyCross[1,:].min(),PolyCross[1,:].max()]
+    if VType=='Lin':
+        YLim = [max(YLim[0],PolyCross[0,:].min()), min(YLim[1],PolyCross[0,:].max())]
+    X = np.arange(XLim[0]+dXYZ[0]/2., XLim[1], dXYZ[0])
+    Y = np.arange(YLim[0]+dXYZ[1]/2., YLim[1], dXYZ[1])
+    Z = np.arange(ZLim[0]+dXYZ[2]/2., ZLim[1], dXYZ[2])
+    dV = dXYZ[0]*dXYZ[1]*dXYZ[2]
+    return X, Y, Z, dV
+
+
+def _Detect_SigPrecomp_Decompress(Comp):        # Used
+    """ Return the (Points, SAng, Vect) arrays from the compact storage produced by _Detect_SigPrecomp_Compress() """
+    Loc = Comp['Origin'].reshape((3,1)) + Comp['Step'].reshape((3,1))*Comp['Ind']
+    Points = Comp['LOSD'].reshape((3,1)) + Comp['Frame'].dot(Loc)
+    V0, V1 = Comp['Vect'].astype(float)/np.iinfo(np.int16).max
+    V2 = 1.-np.abs(V0)-np.abs(V1)
+    indneg = V2<0.
+    sgn0, sgn1 = np.where(V0>=0.,1.,-1.), np.where(V1>=0.,1.,-1.)
+    V0, V1 = np.where(indneg, (1.-np.abs(V1))*sgn0, V0), np.where(indneg, (1.-np.abs(V0))*sgn1, V1)
+    Vect = np.array([V0,V1,V2])
+    Vect = Vect/np.sqrt(np.sum(Vect**2,axis=0))
+    return Points, Comp['SAng'].astype(float), Vect
+
+
 
 def Calc_SynthDiag_SampleVolume(LOSD=None, LOSu=None, Span_k=None, ConeWidth_k=None, ConeWidth_X1=None, ConeWidth_X2=None,
         dX12=TFD.DetSynthdX12, dX12Mode=TFD.DetSynthdX12Mode, ds=TFD.DetSynthds, dsMode=TFD.DetSynthdsMode, MarginS=TFD.DetSynthMarginS,
@@ -1662,6 +1718,13 @@ def Calc_SynthDiag_SampleVolume(LOSD=None, LOSu=None, Span_k=None, ConeWidth_k=N
 
 
 
+def _Detect_SigSynthDiag_isAni(ff):
+    """ Return True if ff is an anisotropic emissivity, i.e.: ff(Pts, Vect, **extargs), and False if it is isotropic, i.e.: ff(Pts, **extargs) """
+    insargs = inspect.getargspec(ff)
+    nDef = 0 if insargs[3] is None else len(insargs[3])
+    return len(insargs[0])-nDef==2
+
+
 def _Detect_SigSynthDiag(ff, extargs={}, Method='Vol', Mode='simps', PreComp=True,
         DPoly=None, DBaryS=None, DnIn=None, LOPolys=None, LOBaryS=None, LOnIns=None, Lens_ConeTip=None, Lens_ConeHalfAng=None, RadL=None, RadD=None, F1=None, thet=np.linspace(0.,2.*np.pi,100), OpType='Apert',
         LOSD=None, LOSu=None, LOSkPIn=None, LOSkPOut=None, LOSEtend=None, Span_k=None, ConeWidth_k=None, ConeWidth_X1=None, ConeWidth_X2=None, SAngPlane=None, CrossRef=None,
@@ -1674,11 +1737,7 @@ def _Detect_SigSynthDiag(ff, extargs={}, Method='Vol', Mode='simps', PreComp=Tru
         assert hasattr(ff, '__call__'), "Arg ff must be a callable (function of one or two arguments) !"
         assert type(extargs) is dict, "Arg extargs must be a dict of keyword args for ff !"
 
-    insargs = inspect.getargspec(ff)
-    if len(insargs[0])-len(insargs[3])==1:
-        Ani = False
-    elif len(insargs[0])-len(insargs[3])==2:
-        Ani = True
+    Ani = _Detect_SigSynthDiag_isAni(ff)
 
     Sig = 0.
     if Method=='Vol':
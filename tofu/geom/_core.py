@@ -5,6 +5,7 @@ It includes all functions and object classes necessary for tomography on Tokamak
 
 import warnings
 import numpy as np
+import scipy.sparse as scpsp
 import datetime as dtm
 
 # ToFu-specific
@@ -383,8 +384,8 @@ class Ves(object):
             Path specifying where to save the file, if None (recommended) uses self.Id.SavePath
         Mode :      str
             Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, heavier and may cause retro-compatibility issues)
-        compressed :    bool
-            Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+        compressed :    bool / int
+            Flag, used when Mode='npz', indicating whether to compress the arrays in parallel chunks (slower saving and loading but smaller files), an int specifying the compression level (see :meth:`~tofu.pathfile.Save_Generic()`)
 
         """
         tfpf.Save_Generic(self, SaveName=SaveName, Path=Path, Mode=Mode, compressed=compressed)
@@ -663,8 +664,8 @@ class Struct(object):
             Path specifying where to save the file, if None (recommended) uses self.Id.SavePath
         Mode :      str
             Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, heavier and may cause retro-compatibility issues)
-        compressed :    bool
-            Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+        compressed :    bool / int
+            Flag, used when Mode='npz', indicating whether to compress the arrays in parallel chunks (slower saving and loading but smaller files), an int specifying the compression level (see :meth:`~tofu.pathfile.Save_Generic()`)
 
         """
         tfpf.Save_Generic(self, SaveName=SaveName, Path=Path, Mode=Mode, compressed=compressed)
@@ -1015,8 +1016,8 @@ class LOS(object):
             Path specifying where to save the file, if None (recommended) uses self.Id.SavePath
         Mode :      str
             Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, heavier and may cause retro-compatibility issues)
-        compressed :    bool
-            Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+        compressed :    bool / int
+            Flag, used when Mode='npz', indicating whether to compress the arrays in parallel chunks (slower saving and loading but smaller files), an int specifying the compression level (see :meth:`~tofu.pathfile.Save_Generic()`)
 
         """
         tfpf.Save_Generic(self, SaveName=SaveName, Path=Path, Mode=Mode, compressed=compressed)
@@ -1072,7 +1073,7 @@ class GLOS(object):
     Id :            str / tfpf.ID
         A name string or a pre-built tfpf.ID class to be used to identify this particular instance, if a string is provided, it is fed to tfpf.ID()
     LLOS :          list / :class:'LOS'
-        List of LOS instances with the same :class:`~tofu.geom.Ves` instance
+        List of LOS instances with the same :class:`~tofu.geom.Ves` instance, or of (D,u) tuples (see :class:`LOS`) from which LOS instances are created with an ID derived from the GLOS ID (see :meth:`~tofu.pathfile.ID.derive`), named after the GLOS followed by their index
     Type :          None
         (not used in the current version)
     Exp :           None / str
@@ -1100,6 +1101,12 @@ class GLOS(object):
         self._arrayorder = arrayorder
         self._Clock = Clock
 
+        if not isinstance(LLOS,LOS) and any([type(ll) is tuple for ll in LLOS]):
+            Exp = Exp if (Exp is not None or Ves is None) else Ves.Id.Exp
+            self._set_Id(Id, Exp=Exp, Diag=Diag, shot=shot, Type=Type, SavePath=SavePath, dtime=dtime, dtimeIn=dtimeIn)
+            Id, Fmt = self.Id, '{0}{1:0'+str(len(str(len(LLOS)-1)))+'d}'
+            LLOS = [LOS(Id.derive(Fmt.format(Id.Name,ii), Cls='LOS'), LLOS[ii], Ves=Ves, Sino_RefPt=Sino_RefPt, arrayorder=arrayorder, Clock=Clock) if type(LLOS[ii]) is tuple else LLOS[ii]
+                    for ii in range(0,len(LLOS))]
         self._check_inputs(Exp=Exp, Diag=Diag, shot=shot, Ves=Ves, LLOS=LLOS)
         Exp = Exp if not Exp is None else LLOS[0].Id.Exp
         assert Exp==LLOS[0].Id.Exp, "Arg Exp must be identical to the LLOS !"
@@ -1155,6 +1162,7 @@ class GLOS(object):
             LLOS = [LLOS]
         self._nLOS = len(LLOS)
         self._LLOS = LLOS
+        self._IdIndex = tfpf.IdIndex(LId=[ll.Id for ll in LLOS])
         LObj = [ll.Id for ll in LLOS]
         if not LLOS[0].Ves is None:
             LObj.append(LLOS[0].Ves.Id)
@@ -1228,9 +1236,9 @@ class GLOS(object):
 
         """
         if not Out=='LOS':
-            ind = tfpf.SelectFromListId([ll.Id for ll in self.LLOS], Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=Out)
+            ind = tfpf.SelectFromListId(self._IdIndex, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=Out)
         else:
-            ind = tfpf.SelectFromListId([ll.Id for ll in self.LLOS], Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=int)
+            ind = tfpf.SelectFromListId(self._IdIndex, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=int)
             ind = [self.LLOS[ii] for ii in ind]
         return ind
 
@@ -1365,8 +1373,8 @@ class GLOS(object):
             Path specifying where to save the file, if None (recommended) uses self.Id.SavePath
         Mode :      str
             Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, heavier and may cause retro-compatibility issues)
-        compressed :    bool
-            Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+        compressed :    bool / int
+            Flag, used when Mode='npz', indicating whether to compress the arrays in parallel chunks (slower saving and loading but smaller files), an int specifying the compression level (see :meth:`~tofu.pathfile.Save_Generic()`)
 
         """
         tfpf.Save_Generic(self, SaveName=SaveName, Path=Path, Mode=Mode, compressed=compressed)
@@ -1722,8 +1730,8 @@ class Lens(object):
             Path specifying where to save the file, if None (recommended) uses self.Id.SavePath
         Mode :      str
             Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, heavier and may cause retro-compatibility issues)
-        compressed :    bool
-            Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+        compressed :    bool / int
+            Flag, used when Mode='npz', indicating whether to compress the arrays in parallel chunks (slower saving and loading but smaller files), an int specifying the compression level (see :meth:`~tofu.pathfile.Save_Generic()`)
 
         """
         tfpf.Save_Generic(self, SaveName=SaveName, Path=Path, Mode=Mode, compressed=compressed)
@@ -1960,8 +1968,8 @@ class Apert(object):
             Path specifying where to save the file, if None (recommended) uses self.Id.SavePath
         Mode :      str
             Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, heavier and may cause retro-compatibility issues)
-        compressed :    bool
-            Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+        compressed :    bool / int
+            Flag, used when Mode='npz', indicating whether to compress the arrays in parallel chunks (slower saving and loading but smaller files), an int specifying the compression level (see :meth:`~tofu.pathfile.Save_Generic()`)
 
         """
         tfpf.Save_Generic(self, SaveName=SaveName, Path=Path, Mode=Mode, compressed=compressed)
@@ -2049,6 +2057,10 @@ class Detect(object):
         Flag indicating whether to compute all the above
     Verb :              bool
         Flag indicating whether the creation of the object should be verbose (comments for each step)
+    Lazy :              bool
+        Flag indicating whether the computations requested by the above flags should be deferred, each stage (LOS, Etend, Span, ConeWidth, Cone, SynthDiag) being then computed, with its dependencies, on first access to one of its attributes
+    Cache :             None / str
+        If provided, path of a directory used as a persistent cache: before each stage (Etend, Span, ConeWidth, Cone, SynthDiag), the results are looked for under a hash of the geometry (Detect, Optics, Ves and VesCalc polygons) and of the stage parameters, and stored there once computed (the least recently used files are removed beyond tofu.defaults.DetCacheMaxSize bytes)
 
     Etend_Method :      str
         Flag indicating which numerical integration to use for the computation of the etendue (picked from scipy.integrate : 'quad', 'simps', 'trapz')
@@ -2100,13 +2112,18 @@ class Detect(object):
                  Etend_Method=tfd.DetEtendMethod, Etend_RelErr=tfd.DetEtendepsrel, Etend_dX12=tfd.DetEtenddX12, Etend_dX12Mode=tfd.DetEtenddX12Mode, Etend_Ratio=tfd.DetEtendRatio, Colis=True, LOSRef='Cart',
                  Cone_DRY=tfd.DetConeDRY, Cone_DXTheta=None, Cone_DZ=tfd.DetConeDZ, Cone_NPsi=20, Cone_Nk=60,
                  SynthDiag_dX12=tfd.DetSynthdX12, SynthDiag_dX12Mode=tfd.DetSynthdX12Mode, SynthDiag_ds=tfd.DetSynthds, SynthDiag_dsMode=tfd.DetSynthdsMode, SynthDiag_MarginS=tfd.DetSynthMarginS,
-                 arrayorder='C', Clock=False, Type=None, Exp=None, Diag=None, shot=None, dtime=None, dtimeIn=False, SavePath=None):
+                 arrayorder='C', Clock=False, Type=None, Exp=None, Diag=None, shot=None, dtime=None, dtimeIn=False, SavePath=None, Lazy=tfd.DetLazy, Cache=tfd.DetCache):
 
         self._Done = False
-        tfpf._check_NotNone({'Clock':Clock,'arrayorder':arrayorder})
+        tfpf._check_NotNone({'Clock':Clock,'arrayorder':arrayorder,'Lazy':Lazy})
         self._check_inputs(Clock=Clock, arrayorder=arrayorder)
+        assert type(Lazy) is bool, "Arg Lazy must be a bool !"
         self._arrayorder = arrayorder
         self._Clock = Clock
+        self._LazyMode = Lazy
+        self._Lazy = {}
+        assert Cache is None or type(Cache) is str, "Arg Cache must be None or a str (path of the cache directory) !"
+        self._Cache, self._Cache_Keys = Cache, {}
 
         # Check consistency of Type, Exp, Diag, shot
         self._check_inputs(Poly=Poly, Type=Type, Exp=Exp, Diag=Diag, shot=shot, Ves=Ves, Optics=Optics)
@@ -2259,13 +2276,15 @@ class Detect(object):
 
     def _initAll(self):
         self._Ves, self._VesCalc = None, None
-        self._Optics, self._nOptics = None, 0
+        self._Optics, self._nOptics, self._Optics_Polys = None, 0, None
         self._SAngPlane = None
         self._LOS_ApertPolyInt, self._LOS_ApertPolyInt_S, self._LOS_ApertPolyInt_BaryS, self._LOS, self._TorAngRef, self._LOS_NP = None, None, None, None, None, None
         self._Sino_RefPt, self._Sino_CrossProj, self._LOSRef =  None, None, None
         self._Span_R, self._Span_Theta, self._Span_X, self._Span_Y, self._Span_Z, self._Span_k, self._Span_NEdge, self._Span_NRad = None, None, None, None, None, None, None, None
+        self._ConeWidth, self._ConeWidth_k, self._ConeWidth_X1, self._ConeWidth_X2 = None, None, None, None
         self._Cone_PolyCross, self._Cone_PolyHor, self._Cone_PolyCrossbis, self._Cone_PolyHorbis = None, None, None, None
         self._Cone_Poly_DR, self._Cone_Poly_DZ, self._Cone_Poly_DTheta, self._Cone_Poly_NEdge, self._Cone_Poly_NRad = None, None, None, None, None
+        self._Cone_Poly_NPsi, self._Cone_Poly_Nk = 20, 60
         self._Cone_PolyCross_RefLCorners, self._Cone_PolyCross_RefLBary, self._Cone_PolyCross_RefdMax = None, None, None
         self._Cone_PolyHor_RefLCorners, self._Cone_PolyHor_RefLBary, self._Cone_PolyHor_RefdMax = None, None, None
         self._SAngCross_Points, self._SAngHor_Points, self._SAngCross_Max, self._SAngHor_Max, self._SAngCross_Int, self._SAngHor_Int = None, None, None, None, None, None
@@ -2284,6 +2303,7 @@ class Detect(object):
             Optics = Optics if type(Optics) is list else [Optics]
             self._Optics = Optics
             self._OpticsNb = len(Optics)
+            self._Optics_Polys = [np.copy(oo.Poly) for oo in Optics]
             self._OpticsType = "Lens" if type(Optics[0]) is Lens else "Apert"
             self.Id.set_LObj([aa.Id for aa in Optics])
             self._set_Optics_Lens_Cone()
@@ -2330,20 +2350,212 @@ class Detect(object):
                 SynthDiag_dX12=SynthDiag_dX12, SynthDiag_dX12Mode=SynthDiag_dX12Mode, SynthDiag_ds=SynthDiag_ds, SynthDiag_dsMode=SynthDiag_dsMode, SynthDiag_MarginS=SynthDiag_MarginS, Colis=Colis)
 
         assert self.OpticsNb>0 and not self.Ves is None, "Calculation of [LOS, Etendue, Span and Cone] not possible without Optics and Ves !"
-        # Check that the perpendicular vectors nIn are all pointing in the right direction, correct them if necessary
-        Ldir = [(oo.BaryS-self.BaryS)/np.linalg.norm(oo.BaryS-self.BaryS) for oo in self.Optics]
-        for ii in range(0,len(self.Optics)):
-            if np.sum(Ldir[ii]*self.Optics[ii].nIn)<0.:
-                self.Optics[ii]._nIn = -self.Optics[ii].nIn
-        self._nIn = -self.nIn if np.sum(self.nIn*Ldir[0])<0. else self.nIn
+        self._set_nInOrient()
         # Start all subsequent calculations
 	self._set_SAngPnPe1e2()
+        if self._LazyMode:
+            Stages = {'LOS':dict(CalcEtend=False, LOSRef=LOSRef, Verb=Verb)}
+            if CalcEtend:
+                Stages['Etend'] = dict(Method=Etend_Method, RelErr=Etend_RelErr, dX12=Etend_dX12, dX12Mode=Etend_dX12Mode, Ratio=Etend_Ratio, Colis=Colis)
+            if CalcSpanImp:
+                Stages['Span'] = dict(CalcSpanImp=True, Sino_RefPt=Sino_RefPt, new=new)
+            Stages['ConeWidth'] = dict()
+            if CalcCone:
+                Stages['Cone'] = dict(CalcCone=True, DRY=Cone_DRY, DXTheta=Cone_DXTheta, DZ=Cone_DZ, NPsi=Cone_NPsi, Nk=Cone_Nk)
+            if CalcPreComp:
+                Stages['SynthDiag'] = dict(CalcPreComp=True, dX12=SynthDiag_dX12, dX12Mode=SynthDiag_dX12Mode, ds=SynthDiag_ds, dsMode=SynthDiag_dsMode, MarginS=SynthDiag_MarginS, Colis=Colis)
+            self._set_Lazy(Stages, LOSRef=LOSRef)
+            return
         self._set_LOS(CalcEtend=CalcEtend, Method=Etend_Method, RelErr=Etend_RelErr, dX12=Etend_dX12, dX12Mode=Etend_dX12Mode, Ratio=Etend_Ratio, Colis=Colis, LOSRef=LOSRef, Verb=Verb)
         self._set_SinoSpan(CalcSpanImp=CalcSpanImp, Sino_RefPt=Sino_RefPt, new=new)
         self._set_ConeWidthAlongLOS()
         self._set_ConePoly(CalcCone=CalcCone, DRY=Cone_DRY, DXTheta=Cone_DXTheta, DZ=Cone_DZ, NPsi=Cone_NPsi, Nk=Cone_Nk)
         self.set_SigPrecomp(CalcPreComp=CalcPreComp, dX12=SynthDiag_dX12, dX12Mode=SynthDiag_dX12Mode, ds=SynthDiag_ds, dsMode=SynthDiag_dsMode, MarginS=SynthDiag_MarginS, Colis=Colis)
 
+    def _set_Lazy(self, Stages, LOSRef='Cart'):
+        """ Register the stages to be computed on demand and remove their attributes, so that they are computed on first access (see __getattr__) """
+        for ss in self._Lazy.keys():
+            self._drop_Lazy(ss)
+        self._LOSRef = LOSRef
+        LAttr = [kk for kk in self.__dict__.keys() if _Detect_get_LazyStage(kk) in Stages.keys()]
+        for ss in Stages.keys():
+            Attr = dict([(kk,self.__dict__.pop(kk)) for kk in LAttr if _Detect_get_LazyStage(kk)==ss])
+            self._Lazy[ss] = {'kwdargs':Stages[ss], 'Attr':Attr}
+
+    def _calc_Lazy(self, Stages=None):
+        """ Compute the pending stages (all if Stages is None), with their dependencies """
+        Stages = self._Lazy.keys() if Stages is None else Stages
+        Stages = [Stages] if type(Stages) is str else Stages
+        for ss in Stages:
+            if not ss in self._Lazy.keys():
+                continue
+            self._calc_Lazy([dd for dd in _Detect_LazyDeps[ss] if dd in self._Lazy.keys()])
+            Stage = self._Lazy.pop(ss)
+            self.__dict__.update(Stage['Attr'])
+            if ss=='LOS':
+                self._set_LOS(**Stage['kwdargs'])
+            elif ss=='Etend':
+                self._set_Etendue(**Stage['kwdargs'])
+            elif ss=='Span':
+                self._set_SinoSpan(**Stage['kwdargs'])
+            elif ss=='ConeWidth':
+                self._set_ConeWidthAlongLOS(**Stage['kwdargs'])
+            elif ss=='Cone':
+                self._set_ConePoly(**Stage['kwdargs'])
+            elif ss=='SynthDiag':
+                self.set_SigPrecomp(**Stage['kwdargs'])
+
+    def _drop_Lazy(self, Stage):
+        """ Forget a pending stage, restoring its default (not computed) attributes """
+        if Stage in self._Lazy.keys():
+            self.__dict__.update(self._Lazy.pop(Stage)['Attr'])
+
+    def __getattr__(self, Name):
+        # Only called when the attribute is missing, i.e. when it belongs to a pending lazy stage
+        Lazy = self.__dict__.get('_Lazy',{})
+        Stage = _Detect_get_LazyStage(Name)
+        if Stage in Lazy.keys():
+            self._calc_Lazy(Stage)
+            return object.__getattribute__(self, Name)
+        raise AttributeError("'Detect' object has no attribute '"+Name+"'")
+
+    def update(self, Sino_RefPt=None, VesCalc=None, Optics=None, Verb=True):
+        """ Update some inputs of the Detect and only re-compute the stages depending on them
+
+        The geometry of a Detect is computed in successive stages (LOS, Etend, Sino, ConeWidth, Cone and SynthDiag), each depending on a subset of the inputs (see tofu.geom._core._Detect_UpdateInputs).
+        This method identifies which inputs actually changed (new Sino_RefPt, new VesCalc used for collisions, new Optics or Optics modified in place since they were set) and only re-computes the stages that were already computed and depend on them, with the same parameters as before.
+        This makes parametric scans (e.g.: of aperture positions or of reference points for the sinogram) much cheaper than re-creating the object, since the etendue (the most expensive stage) is not re-computed when only the sinogram or the collisions change.
+        Stages still pending in Lazy mode are left pending, they will be computed with the new inputs on first access.
+
+        Parameters
+        ----------
+        Sino_RefPt :    None / iterable
+            New reference point for the sinogram (not changed if None)
+        VesCalc :       None / :class:`Ves`
+            New :class:`Ves` instance to be used for collision detection (not changed if None)
+        Optics :        None / list
+            New list of :class:`Apert` instances or :class:`Lens` instance, if None, the current Optics are checked for in-place modifications
+        Verb :          bool
+            Flag indicating whether the change report should be printed
+
+        Returns
+        -------
+        Report :        dict
+            Dictionary listing the inputs that changed ('Changed') and the stages that were re-computed ('Computed'), left unchanged ('Skipped') or left pending ('Pending')
+
+        """
+        Changed = []
+        if not Sino_RefPt is None:
+            Sino_RefPt = np.asarray(Sino_RefPt).flatten()
+            RefPt0 = self._Lazy['Span']['kwdargs']['Sino_RefPt'] if 'Span' in self._Lazy.keys() else self.__dict__.get('_Sino_RefPt')
+            if RefPt0 is None or not np.allclose(Sino_RefPt, RefPt0):
+                Changed.append('Sino_RefPt')
+        if not VesCalc is None and not VesCalc is self._VesCalc:
+            Changed.append('VesCalc')
+        LPolys = [np.copy(oo.Poly) for oo in (self.Optics if Optics is None else Optics if type(Optics) is list else [Optics])]
+        if self._Optics_Polys is None or len(LPolys)!=len(self._Optics_Polys) or not all([pp.shape==p0.shape and np.allclose(pp,p0) for (pp,p0) in zip(LPolys,self._Optics_Polys)]):
+            Changed.append('Optics')
+
+        # Identify the stages to be re-computed
+        LOSd = self.__dict__.get('_LOS')
+        Done = {'LOS':type(LOSd) is dict, 'Etend':type(LOSd) is dict and 'Etend' in LOSd[self._LOSRef], 'Sino':not self.__dict__.get('_Span_k') is None,
+                'ConeWidth':not self.__dict__.get('_ConeWidth') is None, 'Cone':not self.__dict__.get('_Cone_PolyCross') is None,
+                'SynthDiag':not (self.__dict__.get('_SynthDiag_Points') is None and self.__dict__.get('_SynthDiag_Comp') is None)}
+        Pending = [ss for ss in _Detect_UpdateStages if _Detect_UpdateLazy[ss] in self._Lazy.keys()]
+        Computed = []
+        for ss in _Detect_UpdateStages:
+            Inputs = list(_Detect_UpdateInputs[ss])
+            if ss=='Etend' and Done['Etend'] and not LOSd[self._LOSRef]['Etend_Colis']:
+                Inputs.remove('VesCalc')
+            if Done[ss] and any([ii in Changed for ii in Inputs]):
+                Computed.append(ss)
+        Skipped = [ss for ss in _Detect_UpdateStages if Done[ss] and not ss in Computed]
+
+        # Set the new inputs
+        if 'Sino_RefPt' in Changed and 'Span' in self._Lazy.keys():
+            self._Lazy['Span']['kwdargs']['Sino_RefPt'] = Sino_RefPt
+            self._Lazy['Span']['Attr']['_Sino_RefPt'] = Sino_RefPt
+        elif 'Sino_RefPt' in Changed:
+            self._Sino_RefPt = Sino_RefPt
+        if 'VesCalc' in Changed:
+            self._check_inputs(VesCalc=VesCalc)
+            self._VesCalc = VesCalc
+        if 'Optics' in Changed:
+            self._set_Optics(self.Optics if Optics is None else Optics, Calc=False)
+            self._set_nInOrient()
+            self._set_SAngPnPe1e2()
+
+        # Re-compute the relevant stages with the same parameters as before
+        if 'LOS' in Computed:
+            self._set_LOS(CalcEtend=False, LOSRef=self._LOSRef, Verb=Verb)
+        if 'Etend' in Computed:
+            dd = LOSd[self._LOSRef]
+            self._set_Etendue(Method=dd['Etend_Method'], RelErr=tfd.DetEtendepsrel if dd['Etend_RelErr'] is None else dd['Etend_RelErr'], dX12=tfd.DetEtenddX12 if dd['Etend_dX12'] is None else dd['Etend_dX12'],
+                              dX12Mode=tfd.DetEtenddX12Mode if dd['Etend_dX12Mode'] is None else dd['Etend_dX12Mode'], Ratio=dd['Etend_Ratio'], Colis=dd['Etend_Colis'], NEdge=dd['Etend_NEdge'], NRad=dd['Etend_NRad'])
+        if 'Sino' in Computed:
+            self._set_SinoSpan(Sino_RefPt=Sino_RefPt if 'Sino_RefPt' in Changed else self._Sino_RefPt, CalcSpanImp=True)
+        if 'ConeWidth' in Computed:
+            self._set_ConeWidthAlongLOS()
+        if 'Cone' in Computed:
+            (DRY, DXTheta) = (self._Cone_Poly_DR, self._Cone_Poly_DTheta) if self.Ves.Type=='Tor' else (self._Cone_Poly_DY, self._Cone_Poly_DX)
+            self._set_ConePoly(CalcCone=True, DRY=DRY, DXTheta=DXTheta, DZ=self._Cone_Poly_DZ, NPsi=self._Cone_Poly_NPsi, Nk=self._Cone_Poly_Nk)
+        if 'SynthDiag' in Computed:
+            self.set_SigPrecomp(CalcPreComp=True, dX12=self._SynthDiag_dX12, dX12Mode=self._SynthDiag_dX12Mode, ds=self._SynthDiag_ds, dsMode=self._SynthDiag_dsMode, MarginS=self._SynthDiag_MarginS,
+                                Colis=self._SynthDiag_Colis, Compact=not self._SynthDiag_Comp is None)
+
+        Report = {'Changed':Changed, 'Computed':Computed, 'Skipped':Skipped, 'Pending':Pending}
+        if Verb:
+            print "    "+self.Id.Name+" : changed "+str(Changed)+", re-computed "+str(Computed)+", skipped "+str(Skipped)+", pending "+str(Pending)
+        return Report
+
+    def _get_CacheKey(self, Stage, Params):
+        """ Return the hash key of a stage, from the geometry, the stage parameters and the keys of the stages it depends on """
+        if self.OpticsType=='Apert':
+            LOpt = [oo.Poly for oo in self.Optics]
+        else:
+            LOpt = [[oo.O, oo.nIn, oo.Rad, oo.F1, oo.F2, oo.R1, oo.R2, oo.dd, oo.Type] for oo in self.Optics]
+        Geom = [self.Poly, self.OpticsType, LOpt, self.Ves.Type, self.Ves.Poly, self.Ves.DLong, None if self._VesCalc is None else self._VesCalc.Poly]
+        return tfpf._get_HashKey(Stage, Geom, Params, [self._Cache_Keys.get(dd) for dd in _Detect_LazyDeps[Stage]])
+
+    def _load_Cache(self, Stage, Params):
+        """ If a cache is used, register the key of the stage and set its attributes from the cache, return True if they were found """
+        if self._Cache is None:
+            return False
+        self._Cache_Keys[Stage] = self._get_CacheKey(Stage, Params)
+        if Stage=='LOS':
+            return False
+        Attr = tfpf._Cache_load(self._Cache_Keys[Stage], self._Cache)
+        if Attr is None:
+            return False
+        print "    "+self.Id.Name+" : "+Stage+" loaded from cache "+self._Cache_Keys[Stage]
+        if Stage=='Etend':
+            for kk in self.LOS.keys():
+                self.LOS[kk].update(Attr)
+        else:
+            self.__dict__.update(Attr)
+        if Stage=='Span':
+            for kk in self.LOS.keys():
+                self.LOS[kk]['LOS']._set_Sino(RefPt=self._Sino_RefPt)
+        return True
+
+    def _save_Cache(self, Stage):
+        """ If a cache is used, store the attributes of a freshly computed stage """
+        if self._Cache is None or not Stage in self._Cache_Keys.keys():
+            return
+        if Stage=='Etend':
+            Attr = dict([(kk,vv) for (kk,vv) in self.LOS[self._LOSRef].items() if kk[:5]=='Etend'])
+        else:
+            Attr = dict([(kk,vv) for (kk,vv) in self.__dict__.items() if any([kk.startswith(pp) for pp in _Detect_CacheAttr[Stage]])])
+        tfpf._Cache_save(self._Cache_Keys[Stage], Stage, Attr, self._Cache, MaxSize=tfd.DetCacheMaxSize)
+
+    def _set_nInOrient(self):
+        """ Check that the perpendicular vectors nIn are all pointing in the right direction, correct them if necessary """
+        Ldir = [(oo.BaryS-self.BaryS)/np.linalg.norm(oo.BaryS-self.BaryS) for oo in self.Optics]
+        for ii in range(0,len(self.Optics)):
+            if np.sum(Ldir[ii]*self.Optics[ii].nIn)<0.:
+                self.Optics[ii]._nIn = -self.Optics[ii].nIn
+        self._nIn = -self.nIn if np.sum(self.nIn*Ldir[0])<0. else self.nIn
+
     def _set_SAngPnPe1e2(self):
         if not self.Optics is None:
             #sca = np.array([np.sum((aa.BaryS-self.BaryS)*self.nIn) for aa in self.LApert])
@@ -2354,15 +2566,18 @@ class Detect(object):
 
     def _set_LOS(self, CalcEtend=True, Method=tfd.DetEtendMethod, RelErr=tfd.DetEtendepsrel, dX12=tfd.DetEtenddX12, dX12Mode=tfd.DetEtenddX12Mode, Ratio=tfd.DetEtendRatio, Colis=tfd.DetCalcEtendColis, LOSRef='Cart', Verb=True):
         self._check_inputs(CalcEtend=CalcEtend, Etend_Method=Method, Etend_RelErr=RelErr, Etend_dX12=dX12, Etend_dX12Mode=dX12Mode, Etend_Ratio=Ratio, Colis=Colis, LOSRef=LOSRef, Verb=Verb)
+        self._drop_Lazy('LOS')
         if not (self.Ves is None or self.Optics is None):
             #try:
             self._LOS_ApertPolyInt, self._LOS_ApertPolyInt_S, self._LOS_ApertPolyInt_BaryS, du = _tfg_c._Detect_set_LOS(self.Id.Name, [oo.Surf for oo in self.Optics], [oo.BaryS for oo in self.Optics],
                     [oo.nIn for oo in self.Optics], [oo.Poly for oo in self.Optics], self.BaryS, self.Poly, OpType=self.OpticsType, Verb=Verb, Test=True)
-            LOSCart = LOS(self.Id.Name+"_Cart", (self.BaryS,du), Ves=self.Ves, Exp=self.Id.Exp, Diag=self.Id.Diag, shot=self.Id.shot,
-                    dtime=self.Id.dtime, dtimeIn=self.Id._dtimeIn, SavePath=self.Id.SavePath)
+            LOSCart = LOS(self.Id.derive(self.Id.Name+"_Cart", Cls='LOS'), (self.BaryS,du), Ves=self.Ves)
             PRef = (LOSCart.POut+LOSCart.PIn)/2.
             self._LOS = {'Cart':{'LOS':LOSCart,'PRef':PRef}}
             self._LOSRef = LOSRef
+            self._load_Cache('LOS', dict(LOSRef=LOSRef))
+            if 'Etend' in self._Lazy.keys():
+                self._LOS['Cart'] = _Detect_LazyLOSDict(self, self._LOS['Cart'])
             if CalcEtend:
                 self._set_Etendue(Method=Method, RelErr=RelErr, dX12=dX12, dX12Mode=dX12Mode, Ratio=Ratio, Colis=Colis)
             #except:
@@ -2372,7 +2587,10 @@ class Detect(object):
 
     def _set_Etendue(self, Method=tfd.DetEtendMethod, RelErr=tfd.DetEtendepsrel, dX12=tfd.DetEtenddX12, dX12Mode=tfd.DetEtenddX12Mode, Ratio=tfd.DetEtendRatio, Colis=tfd.DetCalcEtendColis, NEdge=tfd.DetSpanNEdge, NRad=tfd.DetSpanNRad):    # Pb with Lens quad vs trapz !
         self._check_inputs(Etend_Method=Method, Etend_RelErr=RelErr, Etend_dX12=dX12, Etend_dX12Mode=dX12Mode, Etend_Ratio=Ratio, Colis=Colis)
+        self._drop_Lazy('Etend')
         if not self.LOS in ["Impossible !",None]:
+            if self._load_Cache('Etend', dict(Method=Method, RelErr=RelErr, dX12=dX12, dX12Mode=dX12Mode, Ratio=Ratio, Colis=Colis, NEdge=NEdge, NRad=NRad)):
+                return
             print "    "+self.Id.Name+" : Computing Entendue..."
             LOPolys = [oo.Poly for oo in self.Optics]
             LOnIns = [oo.nIn for oo in self.Optics]
@@ -2397,17 +2615,21 @@ class Detect(object):
                 self.LOS[kk]['Etend_RelErr'] = RelErr if Method=='quad' else None
                 self.LOS[kk]['Etend_dX12'] = None if Method=='quad' else dX12
                 self.LOS[kk]['Etend_dX12Mode'] = None if Method=='quad' else dX12Mode
+            self._save_Cache('Etend')
         else:
             warnings.warn("Detect "+ self.Id.Name +" : calculation of Etendue not possible because LOS impossible !")
 
 
     def _set_SinoSpan(self, Sino_RefPt=None, CalcSpanImp=True, MarginRMin=tfd.DetSpanRMinMargin, NEdge=tfd.DetSpanNEdge, NRad=tfd.DetSpanNRad, Eps=1.e-10, new=True):
         self._check_inputs(Sino_RefPt=Sino_RefPt, CalcSpanImp=CalcSpanImp, MarginRMin=MarginRMin, NEdge=NEdge, NRad=NRad)
+        self._drop_Lazy('Span')
         if CalcSpanImp and not (self.LOS=='Impossible !' or self.LOS is None):
-            print "    "+self.Id.Name+" : Computing Span and Sinogram..."
             if Sino_RefPt is None:
                 Sino_RefPt = self.Ves.BaryS
             Sino_RefPt = np.asarray(Sino_RefPt).flatten()
+            if self._load_Cache('Span', dict(Sino_RefPt=Sino_RefPt, MarginRMin=MarginRMin, NEdge=NEdge, NRad=NRad, Eps=Eps, new=new)):
+                return
+            print "    "+self.Id.Name+" : Computing Span and Sinogram..."
             for kk in self.LOS.keys():
                 self.LOS[kk]['LOS']._set_Sino(RefPt=Sino_RefPt)
             P, nP, e1, e2 = self._SAngPlane
@@ -2429,11 +2651,15 @@ class Detect(object):
                 self._Sino_RefPt, self._Span_X, self._Span_Y, self._Span_Z, self._Span_k = Sino_RefPt, XMinMax, YMinMax, ZMinMax, kMinMax
                 self._Span_R, self._Span_Theta = None, None
             self._Sino_CrossProj, self._Span_NEdge, self._Span_NRad = Sino_CrossProj, Span_NEdge, Span_NRad
+            self._save_Cache('Span')
             # Sino_CrossProj = Imp_PolProj
 
     def _set_ConeWidthAlongLOS(self,Nk=10, NRad=tfd.DetSpanNRad, NEdge=tfd.DetSpanNEdge, Eps=1.e-10):
         self._check_inputs(Nk=Nk)
+        self._drop_Lazy('ConeWidth')
         if not (self.LOS=='Impossible !' or self.LOS is None or self._Span_k is None):
+            if self._load_Cache('ConeWidth', dict(Nk=Nk, NRad=NRad, NEdge=NEdge, Eps=Eps)):
+                return
             P, u = self.LOS[self._LOSRef]['LOS'].D, self.LOS[self._LOSRef]['LOS'].u
             e1, e2 = _tfg_gg.Calc_DefaultCheck_e1e2_PLane_1D(P, u)
             k = np.linspace(max(self._Span_k[0],1.2*np.max(np.abs(np.sum((np.tile(P,(self.Poly.shape[1],1)).T-self.Poly)*np.tile(u,(self.Poly.shape[1],1)).T)))),self._Span_k[1],Nk)
@@ -2457,6 +2683,7 @@ class Detect(object):
             self._ConeWidth_X1 = np.array([MinX1,MaxX1])
             self._ConeWidth_X2 = np.array([MinX2,MaxX2])
             self._ConeWidth = np.min(np.array([np.diff(self._ConeWidth_X1,axis=0),np.diff(self._ConeWidth_X2,axis=0)]),axis=0).flatten()
+            self._save_Cache('ConeWidth')
 
     def _set_Sino(self,RefPt=None, new=True):
         self._check_inputs(Sino_RefPt=Sino_RefPt)
@@ -2499,7 +2726,10 @@ class Detect(object):
 
         """
 
+        self._drop_Lazy('Cone')
         if CalcCone and not (self.LOS=='Impossible' or self.LOS is None):
+            if self._load_Cache('Cone', dict(DRY=DRY, DXTheta=DXTheta, DZ=DZ, NPsi=NPsi, Nk=Nk)):
+                return
             print "    "+self.Id.Name+" : Computing ConePoly..."
             DPoly, DBaryS, DnIn = self.Poly, self.BaryS, self.nIn
             LOPolys = [oo.Poly for oo in self.Optics]
@@ -2517,6 +2747,8 @@ class Detect(object):
                             RadD=self.Rad, RadL=self.Optics[0].Rad, F1=self.Optics[0].F1, VPoly=VPoly, VVin=VVin, VPolyinside=self.Ves.Poly, DLong=self.Ves.DLong,
                             VType=self.Ves.Type, OpType=self.OpticsType, NPsi=NPsi, Nk=Nk, thet=np.linspace(0.,2.*np.pi,DPoly.shape[1]),
                             DXTheta=DXTheta, DRY=DRY, DZ=DZ, Test=True)
+            self._Cone_Poly_NPsi, self._Cone_Poly_Nk = NPsi, Nk
+            self._save_Cache('Cone')
 
 
     def _get_KPsiCrossInt(self,PtsRZ):
@@ -2630,7 +2862,7 @@ class Detect(object):
 
 
 
-    def set_SigPrecomp(self, CalcPreComp=True, dX12=None, dX12Mode=None, ds=None, dsMode=None, MarginS=None, Colis=None):
+    def set_SigPrecomp(self, CalcPreComp=True, dX12=None, dX12Mode=None, ds=None, dsMode=None, MarginS=None, Colis=None, Compact=None):
         """ Precompute a 3D grid for fast integration of a 3D emissivity for a synthetic diagnostic approach
 
         In order to accelerate the computation of synthetic signal from simulated emissivity, it is possible to pre-compute a discretisation of the VOS (mesh points + solid angle) and store it as an attribute of the Detect object.
@@ -2654,11 +2886,12 @@ class Detect(object):
             Float specifying
         Colis :         bool
             Flag indicating whether collision detection should be used
+        Compact :       None / bool
+            Flag indicating whether the mesh should be stored in a compact quantised form (~4 times lighter, decompressed on the fly by :meth:`~tofu.geom.Detect.calc_Sig`), if None uses tofu.defaults.DetSynthCompact
 
         """
+        self._drop_Lazy('SynthDiag')
         if CalcPreComp and not (self.LOS=='Impossible !' or self.LOS is None):
-            print "    "+self.Id.Name+" : Pre-computing 3D matrix for synthetic diag..."
-
             LOPolys = [oo.Poly for oo in self.Optics]
             LOBaryS = [oo.BaryS for oo in self.Optics]
             LOnIns = [oo.nIn for oo in self.Optics]
@@ -2682,17 +2915,35 @@ class Detect(object):
                 MarginS = tfd.DetSynthMarginS if MarginS is None else MarginS
                 Colis = tfd.DetCalcSAngVectColis if Colis is None else Colis
 
+            Compact = tfd.DetSynthCompact if Compact is None else Compact
+            if self._load_Cache('SynthDiag', dict(dX12=dX12, dX12Mode=dX12Mode, ds=ds, dsMode=dsMode, MarginS=MarginS, Colis=Colis, Compact=Compact)):
+                return
+            print "    "+self.Id.Name+" : Pre-computing 3D matrix for synthetic diag..."
+
             (VPoly, VVin) = (self.Ves.Poly, self.Ves._Vin) if self._VesCalc is None else (self._VesCalc.Poly, self._VesCalc._Vin)
             Out = _tfg_c._Detect_set_SigPrecomp(self.Poly, self.BaryS, self.nIn, LOPolys, LOBaryS, LOnIns, self._SAngPlane, LOSD=LOSD, LOSu=LOSu, Span_k=self._Span_k, ConeWidth_k=self._ConeWidth_k, ConeWidth_X1=self._ConeWidth_X1,
                     ConeWidth_X2=self._ConeWidth_X2, Cone_PolyCrossbis=self._Cone_PolyCrossbis, Cone_PolyHorbis=self._Cone_PolyHorbis,
                     Lens_ConeTip=self._Optics_Lens_ConeTip, Lens_ConeHalfAng=self._Optics_Lens_ConeHalfAng, RadL=self.Optics[0].Rad, RadD=self.Rad, F1=self.Optics[0].F1, thet=thet,
                     VPoly=VPoly, VVin=VVin, DLong=self.Ves.DLong, CrossRef=CrossRef, dX12=dX12, dX12Mode=dX12Mode, ds=ds, dsMode=dsMode, MarginS=MarginS, VType=self.Ves.Type, OpType=self.OpticsType, Colis=Colis)
-            self._SynthDiag_Points, self._SynthDiag_SAng, self._SynthDiag_Vect, self._SynthDiag_dV = Out[0], Out[1], Out[2], Out[3]
+            self._reset_SynthDiag()
+            if Compact:
+                self._SynthDiag_Comp = _tfg_c._Detect_SigPrecomp_Compress(Out[0], Out[1], Out[2], LOSD, LOSu)
+            else:
+                self._SynthDiag_Points, self._SynthDiag_SAng, self._SynthDiag_Vect = Out[0], Out[1], Out[2]
+            self._SynthDiag_dV = Out[3]
             self._SynthDiag_ds, self._SynthDiag_dsMode, self._SynthDiag_MarginS, self._SynthDiag_dX12, self._SynthDiag_dX12Mode, self._SynthDiag_Colis = Out[4], Out[5], Out[6], Out[7], Out[8], Out[9]
             self._SynthDiag_Done = True
+            self._save_Cache('SynthDiag')
 
     def _reset_SynthDiag(self):
         self._SynthDiag_Points, self._SynthDiag_SAng, self._SynthDiag_Vect, self._SynthDiag_dV = None, None, None, None
+        self._SynthDiag_Comp = None
+
+    def _get_SynthDiag(self):
+        """ Return the pre-computed (Points, SAng, Vect), decompressed on the fly if they were stored in compact form """
+        if self._SynthDiag_Comp is None:
+            return self._SynthDiag_Points, self._SynthDiag_SAng, self._SynthDiag_Vect
+        return _tfg_c._Detect_SigPrecomp_Decompress(self._SynthDiag_Comp)
 
     def calc_Sig(self, ff, extargs={}, Method='Vol', Mode='simps', PreComp=True,
             epsrel=tfd.DetSynthEpsrel, dX12=tfd.DetSynthdX12, dX12Mode=tfd.DetSynthdX12Mode, ds=tfd.DetSynthds, dsMode=tfd.DetSynthdsMode, MarginS=tfd.DetSynthMarginS, Colis=tfd.DetCalcSAngVectColis, LOSRef=None,  Test=True):
@@ -2715,7 +2966,7 @@ class Detect(object):
         Mode :      str
             Flag indicating the numerical integration method in ['quad','simps','trapz','nptrapz','sum']
         PreComp :   bool
-            Flag indicating whether the pre-computed grid should be used
+            Flag indicating whether the pre-computed grid should be used, if False a new grid is computed unless the pre-computed one matches the requested dX12, dX12Mode, ds, dsMode, MarginS and Colis (in which case it is re-used)
         epsrel :    float
             Float specifying the tolerated relative error on the numerical integration, used for 'quad'
         dX12 :      list
@@ -2753,12 +3004,13 @@ class Detect(object):
         CrossRef = np.arctan2(self.LOS[LOSRef]['PRef'][1],self.LOS[LOSRef]['PRef'][0]) if self.Ves.Type=='Tor' else self.LOS[LOSRef]['PRef'][0]
 
         (VPoly, VVin) = (self.Ves.Poly, self.Ves._Vin) if self._VesCalc is None else (self._VesCalc.Poly, self._VesCalc._Vin)
+        SynthDiag_Points, SynthDiag_SAng, SynthDiag_Vect = self._get_SynthDiag() if not Method=='LOS' else (None, None, None)
         Sig = _tfg_c._Detect_SigSynthDiag(ff, extargs=extargs, Method=Method, Mode=Mode, PreComp=PreComp,
             DPoly=self.Poly, DBaryS=self.BaryS, DnIn=self.nIn, LOPolys=LOPolys, LOBaryS=LOBaryS, LOnIns=LOnIns, Lens_ConeTip=self._Optics_Lens_ConeTip, Lens_ConeHalfAng=self._Optics_Lens_ConeHalfAng,
             RadL=self.Optics[0].Rad, RadD=self.Rad, F1=self.Optics[0].F1, thet=thet, OpType=self.OpticsType,
             LOSD=LOSD, LOSu=LOSu, LOSkPIn=LOSkPIn, LOSkPOut=LOSkPOut, LOSEtend=LOSEtend, Span_k=self._Span_k, ConeWidth_k=self._ConeWidth_k, ConeWidth_X1=self._ConeWidth_X1, ConeWidth_X2=self._ConeWidth_X2, SAngPlane=self._SAngPlane, CrossRef=CrossRef,
             Cone_PolyCrossbis=self._Cone_PolyCrossbis, Cone_PolyHorbis=self._Cone_PolyHorbis, VPoly=VPoly,  VVin=VVin, DLong=self.Ves.DLong, VType=self.Ves.Type,
-            SynthDiag_Points=self._SynthDiag_Points, SynthDiag_SAng=self._SynthDiag_SAng, SynthDiag_Vect=self._SynthDiag_Vect, SynthDiag_dV=self._SynthDiag_dV,
+            SynthDiag_Points=SynthDiag_Points, SynthDiag_SAng=SynthDiag_SAng, SynthDiag_Vect=SynthDiag_Vect, SynthDiag_dV=self._SynthDiag_dV,
             SynthDiag_dX12=self._SynthDiag_dX12, SynthDiag_dX12Mode=self._SynthDiag_dX12Mode, SynthDiag_ds=self._SynthDiag_ds,
             SynthDiag_dsMode=self._SynthDiag_dsMode, SynthDiag_MarginS=self._SynthDiag_MarginS, SynthDiag_Colis=self._SynthDiag_Colis,
             epsrel=epsrel, dX12=dX12, dX12Mode=dX12Mode, ds=ds, dsMode=dsMode, MarginS=MarginS, Colis=Colis, Test=Test)
@@ -3367,14 +3619,16 @@ class Detect(object):
             Path specifying where to save the file, if None (recommended) uses self.Id.SavePath
         Mode :          str
             Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, heavier and may cause retro-compatibility issues)
-        compressed :    bool
-            Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+        compressed :    bool / int
+            Flag, used when Mode='npz', indicating whether to compress the arrays in parallel chunks (slower saving and loading but smaller files), an int specifying the compression level (see :meth:`~tofu.pathfile.Save_Generic()`)
         SynthDiag :     bool
             Flag indicating whether the pre-computed mesh for synthetic diagnostics calculations shall be saved too (can be heavy, if False, it will be re-computed when opening the saved object)
 
         """
         if not SynthDiag:
+            self._drop_Lazy('SynthDiag')
             self._reset_SynthDiag()
+        self._calc_Lazy()
         tfpf.Save_Generic(self, SaveName=SaveName, Path=Path, Mode=Mode, compressed=compressed)
 
 
@@ -3382,6 +3636,36 @@ class Detect(object):
 
 
 
+_Detect_LazyDeps = {'LOS':[], 'Etend':['LOS'], 'Span':['LOS'], 'ConeWidth':['LOS','Span'], 'Cone':['Span','ConeWidth'], 'SynthDiag':['Cone']}
+_Detect_LazyAttr = [('_LOSRef',None), ('_LOS_NP',None), ('_LOS','LOS'), ('_Sino','Span'), ('_Span','Span'), ('_ConeWidth','ConeWidth'), ('_Cone','Cone'), ('_SAngCross','Cone'), ('_SAngHor','Cone'), ('_SynthDiag','SynthDiag')]
+
+# Inputs on which each stage depends (directly or through the stages it uses) and corresponding lazy stage, used by Detect.update()
+_Detect_UpdateStages = ['LOS','Etend','Sino','ConeWidth','Cone','SynthDiag']
+_Detect_UpdateInputs = {'LOS':['Optics'], 'Etend':['Optics','VesCalc'], 'Sino':['Optics','VesCalc','Sino_RefPt'], 'ConeWidth':['Optics','VesCalc'], 'Cone':['Optics','VesCalc'], 'SynthDiag':['Optics','VesCalc']}
+_Detect_CacheAttr = {'Span':['_Sino','_Span'], 'ConeWidth':['_ConeWidth'], 'Cone':['_Cone_','_SAngCross','_SAngHor'], 'SynthDiag':['_SynthDiag']}
+_Detect_UpdateLazy = {'LOS':'LOS', 'Etend':'Etend', 'Sino':'Span', 'ConeWidth':'ConeWidth', 'Cone':'Cone', 'SynthDiag':'SynthDiag'}
+
+def _Detect_get_LazyStage(Name):
+    for (pp,ss) in _Detect_LazyAttr:
+        if Name.startswith(pp):
+            return ss
+    return None
+
+
+class _Detect_LazyLOSDict(dict):
+    """ LOS dictionary of a lazy Detect, computing the etendue on first access to one of its 'Etend' keys """
+    def __init__(self, Det, *args):
+        dict.__init__(self, *args)
+        self._Det = Det
+    def __missing__(self, key):
+        if key.startswith('Etend') and 'Etend' in self._Det._Lazy.keys():
+            self._Det._calc_Lazy('Etend')
+            return self[key]
+        raise KeyError(key)
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
 def _Detect_set_Defaults(Poly=None, Type=None, Exp=None, Diag=None, shot=None, Ves=None, Optics=None):
     if not Optics is None:
         if type(Optics) is list:
@@ -3528,6 +3812,7 @@ class GDetect(object):
         self._set_Id(Id, Type=Type, Exp=Exp, Diag=Diag, shot=shot, dtime=dtime, dtimeIn=dtimeIn, SavePath=SavePath)
         self._set_LDetect(LDetect)
         self._reset_Res()
+        self._reset_SynthDiag_Shared()
         self._Done = True
 
     @property
@@ -3578,6 +3863,7 @@ class GDetect(object):
         self._check_inputs(LDetect=LDetect)
         self._LDetect = LDetect
         self._nDetect = len(LDetect)
+        self._IdIndex = tfpf.IdIndex(LId=[dd.Id for dd in LDetect])
         self._Optics = _get_OpticsFromLDetect(LDetect)
 
         LObj = [dd.Id for dd in LDetect] + [aa.Id for aa in self._Optics]
@@ -3648,9 +3934,9 @@ class GDetect(object):
 
         """
         if not Out=='Detect':
-            return tfpf.SelectFromListId([ll.Id for ll in self.LDetect], Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=Out)
+            return tfpf.SelectFromListId(self._IdIndex, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=Out)
         else:
-            ind = tfpf.SelectFromListId([ll.Id for ll in self.LDetect], Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=int)
+            ind = tfpf.SelectFromListId(self._IdIndex, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=int)
             return [self.LDetect[ii] for ii in ind]
 
 
@@ -3704,10 +3990,35 @@ class GDetect(object):
             Name = self.Id.Name+'_GLOS'
         return GLOS(Name,LLOS)
 
-    def set_SigPrecomp(self, CalcPreComp=True, dX12=tfd.DetSynthdX12, dX12Mode=tfd.DetSynthdX12Mode, ds=tfd.DetSynthds, dsMode=tfd.DetSynthdsMode, MarginS=tfd.DetSynthMarginS, Colis=tfd.DetCalcSAngVectColis):
+    def set_SigPrecomp(self, CalcPreComp=True, dX12=tfd.DetSynthdX12, dX12Mode=tfd.DetSynthdX12Mode, ds=tfd.DetSynthds, dsMode=tfd.DetSynthdsMode, MarginS=tfd.DetSynthMarginS, Colis=tfd.DetCalcSAngVectColis, Compact=tfd.DetSynthCompact):
         """ Applies :meth:`~tofu.geom.Detect.set_SigPrecomp` to all :class:`~tofu.geom.Detect` instances """
         for ii in range(0,self.nDetect):
-            self._LDetect[ii].set_SigPrecomp(CalcPreComp=CalcPreComp, dX12=dX12, dX12Mode=dX12Mode, ds=ds, dsMode=dsMode, MarginS=MarginS, Colis=Colis)
+            self._LDetect[ii].set_SigPrecomp(CalcPreComp=CalcPreComp, dX12=dX12, dX12Mode=dX12Mode, ds=ds, dsMode=dsMode, MarginS=MarginS, Colis=Colis, Compact=Compact)
+
+    def set_SigPrecomp_Shared(self, dXYZ=tfd.GDetSynthdXYZ, Colis=tfd.DetCalcSAngVectColis, NPChunk=tfd.GDetSynthNPChunk):
+        """ Precompute a single 3D grid, common to all :class:`~tofu.geom.Detect` instances, for fast computation of synthetic signals
+
+        Neighbouring detectors of a camera usually have strongly overlapping VOS, so that a per-detector pre-computation (see :meth:`~tofu.geom.Detect.set_SigPrecomp`) evaluates the emissivity many times at nearby points.
+        Here a regular cartesian grid covering the union of all the cones is built, and the weights (SAng*dV) of each detector are stored as a sparse (nDetect,NP) CSR matrix, keeping only the points seen by at least one detector.
+        :meth:`~tofu.geom.GDetect.calc_Sig` then evaluates the emissivity only once per point and gets all signals from a single sparse matrix-vector product.
+        Only isotropic emissivities can take advantage of it, anisotropic ones fall back to the per-detector pre-computation.
+
+        Parameters
+        ----------
+        dXYZ :      list
+            The 3 resolutions (absolute, in m) of the cartesian grid along X, Y and Z
+        Colis :     bool
+            Flag indicating whether collision detection should be used
+        NPChunk :   int
+            Maximum number of grid points handled at once (to limit the memory usage)
+
+        """
+        print "    "+self.Id.Name+" : Pre-computing shared 3D matrix for synthetic diag..."
+        Points, W = _GDetect_set_SigPrecomp_Shared(self, dXYZ=dXYZ, Colis=Colis, NPChunk=NPChunk)
+        self._SynthDiag_Shared = {'Points':Points, 'W':W, 'dXYZ':list(dXYZ), 'Colis':Colis}
+
+    def _reset_SynthDiag_Shared(self):
+        self._SynthDiag_Shared = None
 
     def calc_SAngVect(self, Pts, In='(X,Y,Z)', Colis=tfd.DetCalcSAngVectColis, Test=True):
         """ Applies :meth:`~tofu.geom.Detect.calc_SAngVect` to all :class:`~tofu.geom.Detect` instances
@@ -3740,9 +4051,19 @@ class GDetect(object):
 
         See :meth:`~tofu.geom.Detect.calc_Sig` for details
         Arguments ind, Val, Crit, PreExp, PostExp, Log and InOut are fed to :meth:`~tofu.geom.GDetect.select`
+        If PreComp=True, Method='Vol', the shared grid was computed (see :meth:`~tofu.geom.GDetect.set_SigPrecomp_Shared`) with the same Colis and ff is isotropic, the shared grid is used.
+        As for the per-detector pre-computed grid, the signal is then a weighted sum over the grid points, so that Mode, epsrel, dX12, dX12Mode, ds, dsMode, MarginS and LOSRef are irrelevant.
+        In this case ff may also return a (Nt,NP) array (one emissivity per time step), and the returned Sig has shape (Nt,nDetect).
+        Otherwise, it falls back to the per-detector computation.
 
         """
         GD, Leg, LOSRef = _tfg_p._get_LD_Leg_LOSRef(self, LOSRef=self._LOSRef, ind=ind, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut)
+        if PreComp and Method=='Vol' and self._SynthDiag_Shared is not None and Colis==self._SynthDiag_Shared['Colis'] and not _tfg_c._Detect_SigSynthDiag_isAni(ff):
+            indD = [self.LDetect.index(dd) for dd in GD]
+            Emiss = ff(self._SynthDiag_Shared['Points'], **extargs)
+            assert Emiss.ndim in [1,2] and Emiss.shape[-1]==self._SynthDiag_Shared['Points'].shape[1], "Arg ff must return a np.ndarray of shape (NP,) or (Nt,NP) !"
+            Sig = self._SynthDiag_Shared['W'][indD,:].dot(Emiss.T).T
+            return Sig.reshape((1,len(GD))) if Emiss.ndim==1 else Sig, GD
         Sig = [dd.calc_Sig(ff, extargs=extargs, Method=Method, Mode=Mode, PreComp=PreComp, epsrel=epsrel, dX12=dX12, dX12Mode=dX12Mode, ds=ds, dsMode=dsMode, MarginS=MarginS, Colis=Colis, LOSRef=LOSRef, Test=Test) for dd in GD]
         return np.vstack(Sig).T, GD
 
@@ -4103,8 +4424,8 @@ class GDetect(object):
             Path specifying where to save the file, if None (recommended) uses self.Id.SavePath
         Mode :          str
             Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, heavier and may cause retro-compatibility issues)
-        compressed :    bool
-            Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+        compressed :    bool / int
+            Flag, used when Mode='npz', indicating whether to compress the arrays in parallel chunks (slower saving and loading but smaller files), an int specifying the compression level (see :meth:`~tofu.pathfile.Save_Generic()`)
         SynthDiag :     bool
             Flag indicating whether the pre-computed mesh for synthetic diagnostics calculations shall be saved too (can be heavy, if False, it will be re-computed when opening the saved object)
 
@@ -4112,6 +4433,7 @@ class GDetect(object):
         if not SynthDiag:
             for ii in range(0,self.nDetect):
                 self.LDetect[ii]._reset_SynthDiag()
+            self._reset_SynthDiag_Shared()
         tfpf.Save_Generic(self, SaveName=SaveName, Path=Path, Mode=Mode, compressed=compressed)
 
 
@@ -4190,6 +4512,38 @@ def _GDetect_check_inputs(Id=None, LDetect=None, Type=None, Optics=None, Vess=No
 
 
 
+def _GDetect_set_SigPrecomp_Shared(GD, dXYZ=tfd.GDetSynthdXYZ, Colis=tfd.DetCalcSAngVectColis, NPChunk=tfd.GDetSynthNPChunk):
+    LD = GD.LDetect
+    nD = len(LD)
+    X, Y, Z, dV = _tfg_c.Calc_SynthDiag_SharedGrid([dd._Cone_PolyCrossbis for dd in LD], [dd._Cone_PolyHorbis for dd in LD], dXYZ=dXYZ, VType=GD.Ves.Type)
+    Ves = GD.Ves if GD._VesCalc is None else GD._VesCalc
+    NZ = max(1,int(NPChunk/(X.size*Y.size)))
+    XX, YY = np.tile(X,(Y.size,1)).flatten(), np.tile(Y,(X.size,1)).T.flatten()
+
+    LPts, LRow, LCol, LW, NP = [], [], [], [], 0
+    for ii in range(0,Z.size,NZ):
+        Zc = Z[ii:ii+NZ]
+        Pts = np.array([np.tile(XX,(Zc.size,)), np.tile(YY,(Zc.size,)), np.repeat(Zc,XX.size)])
+        Pts = Pts[:,Ves.isInside(Pts, In='(X,Y,Z)')]
+        if Pts.shape[1]==0:
+            continue
+        SAng = np.vstack([dd.calc_SAngVect(Pts, In='(X,Y,Z)', Colis=Colis, Test=False)[0] for dd in LD])
+        indP = np.any(SAng>0.,axis=0)
+        SAng = SAng[:,indP]
+        Row, Col = (SAng>0.).nonzero()
+        LPts.append(Pts[:,indP])
+        LRow.append(Row)
+        LCol.append(Col+NP)
+        LW.append(SAng[Row,Col]*dV)
+        NP += SAng.shape[1]
+
+    assert NP>0, "There seems to be no visible point in the plasma... !"
+    Points = np.concatenate(LPts,axis=1)
+    W = scpsp.csr_matrix((np.concatenate(LW),(np.concatenate(LRow),np.concatenate(LCol))), shape=(nD,NP))
+    return Points, W
+
+
+
 def _GDetect_Calc_SAngNb(GD, Pts=None, Proj='Cross', Slice='Int', DRY=None, DXTheta=None, DZ=None, Colis=tfd.DetSAngColis,
                          ind=None, Val=None, Crit='Name', PreExp=None, PostExp=None, Log='any', InOut='In'):
         if ind is None:
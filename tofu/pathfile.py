@@ -10,17 +10,33 @@ import cPickle as pck       # For saving / loading objects
 import numpy as np
 import datetime as dtm
 import getpass
+import hashlib
 import inspect
 import warnings
+import struct
+import zipfile
+import json
+import zlib
+import re
+import bisect
+import time
+import threading
+from multiprocessing.pool import ThreadPool
 
 # ToFu specific
 from tofu.defaults import dtmFormat as TFDdtmFormat
+from tofu.defaults import SaveNpyMinSize as TFDSaveNpyMinSize
+from tofu.defaults import Openmmap as TFDOpenmmap
+from tofu.defaults import OpenNThreads as TFDOpenNThreads
+from tofu.defaults import CompressLevel as TFDCompressLevel
+from tofu.defaults import CompressChunkSize as TFDCompressChunkSize
+from tofu.defaults import CompressNThreads as TFDCompressNThreads
 
 
 __author__ = "Didier Vezinet"
 __all__ = ["Find_Rootpath","get_DefaultPaths","get_Default_dtimeFmt","_get_PathFileExt_FromName","convert_units","get_PolyFromPolyFileObj",
            "ID",
-           "CheckSameObj","Save_Generic","Open"]
+           "CheckSameObj","IdIndex","SelectFromListId","Find_Index","Rebuild_Index","Save_Generic","Open","Open_Bulk"]
 
 
 """
@@ -279,7 +295,10 @@ class ID(object):
     Id          ID instance
         The created ID instance, with all necessary computed attributes and methods
 
+    Note that the default SaveName and SavePath are only computed when first accessed, and that the ID of the many members of a group (e.g.: the LOS of a GLOS) can be created from a template with :meth:`~tofu.pathfile.ID.derive()`
+
     """
+    __slots__ = ['_Exp','_Cls','_Type','_Deg','_Diag','_shot','_dtime','_dtFormat','_dtimeIn','_Name','_SaveName','_SavePath','_LObj','_USRdict','_Version']
 
     def __init__(self, Cls, Name, Type=None, Deg=None, Exp=None, Diag=None, shot=None, SaveName=None, SavePath=None, USRdict=None, LObj=None, dtime=None, dtFormat=TFDdtmFormat, dtimeIn=False):
         assert type(Exp) is str, "Arg Exp must be a str !"
@@ -287,6 +306,10 @@ class ID(object):
         assert shot is None or type(shot) is int, "Arg shot must be a int !"
         assert Diag is None or type(Diag) is str, "Arg Diag must be a str !"
         assert Type is None or type(Type) is str, "Arg Type must be a str !"
+        assert type(Name) is str, "ID.Name must be assigned to a str !"
+        assert SaveName is None or type(SaveName) is str, "ID.SaveName must be assigned to a str !"
+        assert SavePath is None or type(SavePath) is str, "ID.SavePath must be assigned to a str !"
+        assert USRdict is None or type(USRdict) is dict, "Arg USRdict must be a dictionnary !"
 
         self._Exp = Exp
         self._Cls = Cls
@@ -295,11 +318,60 @@ class ID(object):
         self._Diag = Diag
         self._shot = shot
         self._set_dtime(dtime=dtime, dtFormat=dtFormat, dtimeIn=dtimeIn)
-        self.set_Name(Name, SaveName=SaveName)
-        self.set_SavePath(SavePath=SavePath)
+        self._Name = Name
+        # None => computed on first access
+        self._SaveName = SaveName
+        self._SavePath = None if SavePath is None else SavePath.replace('//','/')
         self._LObj = {}
-        self.set_LObj(LObj)
-        self.set_USRdict(USRdict)
+        if not LObj is None:
+            self.set_LObj(LObj)
+        self._USRdict = {} if USRdict is None else USRdict
+        # Incremented by the setters of the fields used for selection (Name, SaveName, SavePath, USRdict), to invalidate the IdIndex columns
+        self._Version = 0
+
+    def __getstate__(self):
+        return dict([(kk,getattr(self,kk)) for kk in self.__slots__])
+
+    def __setstate__(self, State):
+        # Also handles the instances pickled before ID was slotted
+        self._Version = 0
+        for kk in State.keys():
+            if kk in self.__slots__:
+                setattr(self, kk, State[kk])
+
+    def derive(self, Name, Cls=None, SaveName=None, USRdict=None):
+        """ Return a new ID instance sharing all attributes of this one (Exp, Diag, shot, Type, SavePath, dtime, LObj...) except its Name
+
+        Meant for the bulk creation of the members of a group (e.g.: the LOS of a GLOS or the channels of a PreData), this skips all checks and computations of the constructor.
+        The LObj is shared until one of the instances modifies it (see :meth:`~tofu.pathfile.ID.set_LObj()`).
+
+        Parameters
+        ----------
+        Name :      str
+            Name of the new instance
+        Cls :       None / str
+            If provided, the class of the new instance (if different)
+        SaveName :  None / str
+            If provided, overrides the automatically generated name for saving the new instance
+        USRdict :   None / dict
+            If provided, the user-defined dictionary of the new instance (not shared)
+
+        Returns
+        -------
+        Id          ID instance
+            The new ID instance
+
+        """
+        assert type(Name) is str, "ID.Name must be assigned to a str !"
+        Id = ID.__new__(ID)
+        Id._Exp, Id._Type, Id._Deg, Id._Diag, Id._shot = self._Exp, self._Type, self._Deg, self._Diag, self._shot
+        Id._dtime, Id._dtFormat, Id._dtimeIn = self._dtime, self._dtFormat, self._dtimeIn
+        Id._Cls = self._Cls if Cls is None else Cls
+        Id._SavePath = self.SavePath if Cls is None else self._SavePath
+        Id._Name, Id._SaveName, Id._LObj = Name, SaveName, self._LObj
+        Id._USRdict = {} if USRdict is None else USRdict
+        Id._Version = 0
+        return Id
 
     def _set_dtime(self,dtime=None, dtFormat=TFDdtmFormat, dtimeIn=False):
         assert dtime is None or isinstance(dtime,dtm.datetime), "Arg dtime must be a dtm.datetime instance !"
@@ -344,11 +416,13 @@ class ID(object):
 
         """
         assert SaveName is None or type(SaveName) is str, "ID.SaveName must be assigned to a str !"
-        dtimeIn = self._dtimeIn if dtimeIn is None else dtimeIn
-        if SaveName is None:
+        if SaveName is None and (dtimeIn is None or dtimeIn==self._dtimeIn):
+            self._SaveName = None
+        elif SaveName is None:
             self._SaveName = SaveName_Conv(self._Exp, self.Cls, self._Type, self._Deg, self._Diag, self._Name, shot=self._shot, dtime=self._dtime, Format=self._dtFormat, dtimeIn=dtimeIn)
         else:
             self._SaveName = SaveName
+        self._Version += 1
 
     def set_SavePath(self,SavePath=None):
         """ Enables to automatically generate a saving path for the created object, or to override that default path with the user-provided SavePath
@@ -364,9 +438,8 @@ class ID(object):
 
         """
         assert SavePath is None or type(SavePath) is str, "ID.SavePath must be assigned to a str !"
-        if SavePath is None:
-            SavePath = Find_Rootpath()+'/Objects_'+self.Exp+'/' if not self.Cls in ['PreData','Sol2D'] else Find_Rootpath()+'/Outputs_'+self.Exp+'/'
-        self._SavePath = SavePath.replace('//','/')
+        self._SavePath = None if SavePath is None else SavePath.replace('//','/')
+        self._Version += 1
 
     def set_LObj(self,LObj=None):
         """ Set the LObj attribute to store the list of ID of other objects the created instance depends on
@@ -385,14 +458,15 @@ class ID(object):
         """
         assert LObj is None or type(LObj) is dict or (type(LObj) is list and all([isinstance(oo,ID) for oo in LObj])), "Arg LObj must be a list of ID instances !"
         if type(LObj) is list:
-            LCls = [oo.Cls for oo in LObj]
-            ClsU = list(set(LCls))
-            for Cls in ClsU:
-                self._LObj[Cls] = {'Exp':[oo.Exp for oo in LObj if oo.Cls==Cls], 'Name':[oo.Name for oo in LObj if oo.Cls==Cls], 'SaveName':[oo.SaveName for oo in LObj if oo.Cls==Cls],
-                        'SavePath':[oo.SavePath for oo in LObj if oo.Cls==Cls], 'Type':[oo.Type for oo in LObj if oo.Cls==Cls], 'Diag':[oo.Diag for oo in LObj if oo.Cls==Cls],
-                        'shot':[oo.shot for oo in LObj if oo.Cls==Cls],
-                        'dtFormat':[oo._dtFormat for oo in LObj if oo.Cls==Cls], 'dtime':[oo.dtime.strftime(oo._dtFormat) for oo in LObj if oo.Cls==Cls],
-                        'USRdict':[oo._USRdict for oo in LObj if oo.Cls==Cls], 'LObj':[oo._LObj for oo in LObj if oo.Cls==Cls]}
+            # Copy before modifying, as it may be shared with other instances (see derive())
+            self._LObj = dict(self._LObj)
+            LK = ['Exp','Name','SaveName','SavePath','Type','Diag','shot','dtFormat','dtime','USRdict','LObj']
+            for Cls in set([oo.Cls for oo in LObj]):
+                self._LObj[Cls] = dict([(kk,[]) for kk in LK])
+            for oo in LObj:
+                dd = self._LObj[oo.Cls]
+                for (kk,vv) in zip(LK,[oo.Exp, oo.Name, oo.SaveName, oo.SavePath, oo.Type, oo.Diag, oo.shot, oo._dtFormat, oo.dtime.strftime(oo._dtFormat), oo._USRdict, oo._LObj]):
+                    dd[kk].append(vv)
         elif type(LObj) is dict:
             self._LObj = LObj
 
@@ -430,6 +504,7 @@ class ID(object):
         assert USRdict is None or type(USRdict) is dict, "Arg USRdict must be a dictionnary !"
         USRdict = {} if USRdict is None else USRdict
         self._USRdict = USRdict
+        self._Version += 1
 
     @property
     def Cls(self):
@@ -454,12 +529,17 @@ class ID(object):
         return self._Type
     @property
     def SaveName(self):
+        if self._SaveName is None:
+            self._SaveName = SaveName_Conv(self._Exp, self.Cls, self._Type, self._Deg, self._Diag, self._Name, shot=self._shot, dtime=self._dtime, Format=self._dtFormat, dtimeIn=self._dtimeIn)
         return self._SaveName
     @SaveName.setter
     def SaveName(self,Val):
         self.set_SaveName(Val)
     @property
     def SavePath(self):
+        if self._SavePath is None:
+            SavePath = Find_Rootpath()+'/Objects_'+self.Exp+'/' if not self.Cls in ['PreData','Sol2D'] else Find_Rootpath()+'/Outputs_'+self.Exp+'/'
+            self._SavePath = SavePath.replace('//','/')
         return self._SavePath
     @SavePath.setter
     def SavePath(self,Val):
@@ -597,27 +677,79 @@ def CheckSameObj(obj0, obj1, LFields=None):
     return A
 
 
-def SelectFromIdLObj(IdLObjCls, Val=None, Crit='Name', PreExp=None, PostExp=None, Log='any', InOut='In', Out=bool):
-    """ To do (deprecated ?)
+class IdIndex(object):
+    """ Columnar index of a list of ID instances, used for fast selection (see :meth:`~tofu.pathfile.SelectFromListId()`)
+
+    The values of each criterion (attribute of ID or key of ID.USRdict) are gathered in a column when first needed and grouped by distinct value.
+    A selection thus only compares or evaluates the criterion once per distinct value (e.g.: once per camera head) instead of once per ID.
+    The columns are re-computed if the Name, SaveName, SavePath or USRdict of any ID instance was modified through its setters in the meantime.
+
+    Parameters
+    ----------
+    LId :       None / list
+        A list of ID instances
+    IdLObjCls : None / dict
+        Alternatively, a dict of lists of attribute values, as stored in ID.LObj[Cls]
+
     """
-    assert type(Crit) is str or (type(Crit) is list and all([type(cc) is str for cc in Crit])), "Arg Crit must be a str or list of str !"
-    assert all([rr is None or type(rr) is str or (type(rr) is list and all([type(ee) is str for ee in rr])) for rr in [PreExp,PostExp]]), "Args PreExp and PostExp must be a str or list of str !"
-    assert Log in ['any','all'], "Arg Log must be in ['and','or'] !"
-    assert InOut in ['In','Out'], "Arg InOut must be in ['In','Out'] !"
-    NObj = len(IdLObjCls['Name'])
+    def __init__(self, LId=None, IdLObjCls=None):
+        assert (LId is None)!=(IdLObjCls is None), "Either LId or IdLObjCls must be provided !"
+        self._LId, self._IdLObjCls = LId, IdLObjCls
+        self._N = len(LId) if not LId is None else len(IdLObjCls['Name'])
+        self._Cols, self._Versions = {}, self._get_Versions()
+
+    @property
+    def N(self):
+        return self._N
+
+    def _get_Versions(self):
+        return None if self._LId is None else [iid._Version for iid in self._LId]
+
+    def get_Col(self, Crit):
+        """ Return the values of Crit for all ID, the list of their distinct values (dict value => index) and the index of the distinct value of each ID """
+        Versions = self._get_Versions()
+        if not Versions==self._Versions:
+            self._Cols, self._Versions = {}, Versions
+        if not Crit in self._Cols.keys():
+            if not self._LId is None:
+                Col = [getattr(iid,Crit) for iid in self._LId] if hasattr(ID,Crit) else [iid.USRdict[Crit] for iid in self._LId]
+            else:
+                Col = self._IdLObjCls[Crit] if hasattr(ID,Crit) else [dd[Crit] for dd in self._IdLObjCls['USRdict']]
+            try:
+                Uniq = {}
+                inv = np.array([Uniq.setdefault(vv,len(Uniq)) for vv in Col], dtype=int)
+            except TypeError:
+                # Unhashable values (list, np.ndarray...) => no grouping
+                Uniq, inv = None, np.arange(0,len(Col))
+            self._Cols[Crit] = (Col, Uniq, inv)
+        return self._Cols[Crit]
+
+    def isin(self, Crit, Val):
+        """ Return the bool array of the ID for which Crit==Val """
+        Col, Uniq, inv = self.get_Col(Crit)
+        try:
+            if not Uniq is None:
+                return inv==Uniq[Val] if Val in Uniq else np.zeros((self.N,),dtype=bool)
+        except TypeError:
+            pass
+        return self.eval(Crit, lambda vv: vv==Val)
+
+    def eval(self, Crit, func):
+        """ Return the bool array of func(value of Crit) for all ID, func being evaluated once per distinct value """
+        Col, Uniq, inv = self.get_Col(Crit)
+        LV = Col if Uniq is None else sorted(Uniq.keys(), key=Uniq.get)
+        return np.asarray([bool(func(vv)) for vv in LV]+[False], dtype=bool)[inv]
+
+
+def _Select_ind(Index, Val=None, Crit='Name', PreExp=None, PostExp=None, Log='any', InOut='In'):
     if Val is None and PreExp is None and PostExp is None:
-        ind = np.ones((1,NObj),dtype=bool)
+        ind = np.ones((1,Index.N),dtype=bool)
     elif not Val is None:
         if type(Val) is str:
             Val=[Val]
-        N = len(Val)
-        ind = np.zeros((N,NObj),dtype=bool)
-        if Crit in dir(ID):
-            for ii in range(0,N):
-                ind[ii,:] = np.asarray([idd==Val[ii] for idd in IdLObjCls[Crit]],dtype=bool)
-        else:
-            for ii in range(0,N):
-                ind[ii,:] = np.asarray([idd[Crit]==Val[ii] for idd in IdLObjCls['USRdict']],dtype=bool)
+        ind = np.zeros((len(Val),Index.N),dtype=bool)
+        for ii in range(0,len(Val)):
+            ind[ii,:] = Index.isin(Crit, Val[ii])
     else:
         if type(PreExp) is str:
             PreExp = [PreExp]
@@ -628,23 +760,31 @@ def SelectFromIdLObj(IdLObjCls, Val=None, Crit='Name', PreExp=None, PostExp=None
         if PostExp is None:
             PostExp = ["" for ss in PreExp]
         assert len(PreExp)==len(PostExp), "Arg Exp must be a list of same length as Crit !"
-        N = len(PreExp)
-        ind = np.zeros((N,NObj),dtype=bool)
-        if Crit in dir(ID):
-            for ii in range(0,N):
-                ind[ii,:] = np.asarray([eval(PreExp[ii]+" idd "+PostExp[ii]) for idd in IdLObjCls[Crit]],dtype=bool)
-        else:
-            for ii in range(0,N):
-                ind[ii,:] = np.asarray([eval(PreExp[ii]+" idd[Crit] "+PostExp[ii]) for idd in IdLObjCls['USRdict']],dtype=bool)
+        ind = np.zeros((len(PreExp),Index.N),dtype=bool)
+        for ii in range(0,len(PreExp)):
+            # Expressions are compiled once and evaluated once per distinct value of the criterion
+            Exp = compile((PreExp[ii]+" idd "+PostExp[ii]).strip(), '<select>', 'eval')
+            ind[ii,:] = Index.eval(Crit, lambda idd, Exp=Exp: eval(Exp, globals(), {'idd':idd}))
     ind = np.any(ind,axis=0) if Log=='any' else np.all(ind,axis=0)
     if InOut=='Out':
         ind = ~ind
+    return ind
+
+
+def SelectFromIdLObj(IdLObjCls, Val=None, Crit='Name', PreExp=None, PostExp=None, Log='any', InOut='In', Out=bool):
+    """ To do (deprecated ?)
+    """
+    assert type(Crit) is str or (type(Crit) is list and all([type(cc) is str for cc in Crit])), "Arg Crit must be a str or list of str !"
+    assert all([rr is None or type(rr) is str or (type(rr) is list and all([type(ee) is str for ee in rr])) for rr in [PreExp,PostExp]]), "Args PreExp and PostExp must be a str or list of str !"
+    assert Log in ['any','all'], "Arg Log must be in ['and','or'] !"
+    assert InOut in ['In','Out'], "Arg InOut must be in ['In','Out'] !"
+    ind = _Select_ind(IdIndex(IdLObjCls=IdLObjCls), Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut)
     if Out==bool:
         return ind
     elif Out==int:
         return ind.nonzero()[0]
     else:
-        if Out in dir(ID):
+        if hasattr(ID,Out):
             return [IdLObjCls[Out][ii] for ii in ind.nonzero()[0]]
         else:
             return [IdLObjCls['USRdict'][ii][Out] for ii in ind.nonzero()[0]]
@@ -658,7 +798,8 @@ def SelectFromListId(LId, Val=None, Crit='Name', PreExp=None, PostExp=None, Log=
 
     Parameters
     ----------
-    LId :       list
+    LId :       list / :class:`IdIndex`
+        The list of ID instances, or the :class:`IdIndex` built from it (faster for repeated selections)
 
     Val :       None / str / list
 
@@ -685,46 +826,16 @@ def SelectFromListId(LId, Val=None, Crit='Name', PreExp=None, PostExp=None, Log=
     assert all([rr is None or type(rr) is str or (type(rr) is list and all([type(ee) is str for ee in rr])) for rr in [PreExp,PostExp]]), "Args PreExp and PostExp must be a str or list of str !"
     assert Log in ['any','all'], "Arg Log must be in ['any','all'] !"
     assert InOut in ['In','Out'], "Arg InOut must be in ['In','Out'] !"
-    if Val is None and PreExp is None and PostExp is None:
-        ind = np.ones((1,len(LId)),dtype=bool)
-    elif not Val is None:
-        if type(Val) is str:
-            Val=[Val]
-        N = len(Val)
-        ind = np.zeros((N,len(LId)),dtype=bool)
-        if Crit in dir(ID):
-            for ii in range(0,N):
-                ind[ii,:] = np.asarray([getattr(iid,Crit)==Val[ii] for iid in LId],dtype=bool)
-        else:
-            for ii in range(0,N):
-                ind[ii,:] = np.asarray([iid.USRdict[Crit]==Val[ii] for iid in LId],dtype=bool)
-    else:
-        if type(PreExp) is str:
-            PreExp = [PreExp]
-        if type(PostExp) is str:
-            PostExp = [PostExp]
-        if PreExp is None:
-            PreExp = ["" for ss in PostExp]
-        if PostExp is None:
-            PostExp = ["" for ss in PreExp]
-        assert len(PreExp)==len(PostExp), "Arg Exp must be a list of same length as Crit !"
-        N = len(PreExp)
-        ind = np.zeros((N,len(LId)),dtype=bool)
-        if Crit in dir(ID):
-            for ii in range(0,N):
-                ind[ii,:] = np.asarray([eval(PreExp[ii]+" getattr(iid,Crit) "+PostExp[ii]) for iid in LId],dtype=bool)
-        else:
-            for ii in range(0,N):
-                ind[ii,:] = np.asarray([eval(PreExp[ii]+" iid.USRdict[Crit] "+PostExp[ii]) for iid in LId],dtype=bool)
-    ind = np.any(ind,axis=0) if Log=='any' else np.all(ind,axis=0)
-    if InOut=='Out':
-        ind = ~ind
+    Index = LId if isinstance(LId,IdIndex) else IdIndex(LId=LId)
+    ind = _Select_ind(Index, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut)
     if Out==int:
         ind = ind.nonzero()[0]
     elif Out is not bool and hasattr(ID,Out):
-        ind = [getattr(LId[ii],Out) for ii in ind.nonzero()[0]]
-    elif Out is not bool and Out in LId[0].USRdict.keys():
-        ind = [LId[ii].USRdict[Out] for ii in ind.nonzero()[0]]
+        Col = Index.get_Col(Out)[0]
+        ind = [Col[ii] for ii in ind.nonzero()[0]]
+    elif Out is not bool and Index.N>0 and Out in Index.get_Col('USRdict')[0][0].keys():
+        Col = Index.get_Col(Out)[0]
+        ind = [Col[ii] for ii in ind.nonzero()[0]]
     return ind
 
 
@@ -744,6 +855,12 @@ def _Id_recreateFromdict(IdS):
             LObj=IdS[2]['LObj'], USRdict=IdS[2]['USRdict'])
     return Id
 
+def _Id_deriveFromdict(Id, IdS):
+    """ Re-create the ID of a member of the group of ID Id from its saved dict, as derived from the group ID (see :meth:`~tofu.pathfile.ID.derive()`) """
+    Idm = Id.derive(str(IdS[0]['Name']), Cls=IdS[0]['Cls'], SaveName=IdS[0]['SaveName'], USRdict=IdS[2]['USRdict'])
+    Idm.set_LObj(IdS[2]['LObj'])
+    return Idm
+
 
 
 
@@ -766,7 +883,7 @@ def FindSolFile(shot=0, t=0, Dt=None, Mesh='Rough1', Deg=2, Deriv='D2N2', Sep=Tr
     """ Identify the good Sol2D saved file in a given folder (OutPath), based on key ToFu criteria
 
     When trying to load a Sol2D object (i.e.: solution of a tomographic inversion), it may be handy to provide the key parameters (shot, time, mesh name, degree of basis functions, regularisation functional) instead of copy-pasting the full file name.
-    This function identifies, within the relevant repository (OutPath), the files matching the provided criteria.
+    This function identifies, within the relevant repository (OutPath), the files matching the provided criteria, using the index of the repository (see :meth:`~tofu.pathfile.Find_Index()`) instead of scanning it.
     This function only works of the automatically generated default SaveName was preserved for the Sol2D objects.
 
     Parameters
@@ -797,17 +914,7 @@ def FindSolFile(shot=0, t=0, Dt=None, Mesh='Rough1', Deg=2, Deriv='D2N2', Sep=Tr
 
     """
     assert None in [t,Dt] and not (t is None and Dt is None), "Arg t or Dt must be None, but not both !"
-    LF = [ff for ff in os.listdir(OutPath) if 'TFI_Sol2D_AUG_SXR' in ff]
-    LF = [ff for ff in LF if all([ss in ff for ss in ['_'+str(shot)+'_', '_'+Mesh+'_D'+str(Deg), '_Deriv'+Deriv+'_Sep'+str(Sep)+'_Pos'+str(Pos)]])]
-    if len(LF)==0:
-        print "No matching Sol2D file in ", OutPath
-        out = None
-    LDTstr = [ff[ff.index('_Dt')+3:ff.index('s_')] for ff in LF]
-    LDTstr = [(ss[:7],ss[8:]) for ss in LDTstr]
-    if t is None:
-        LF = [LF[ii] for ii in range(0,len(LF)) if LDTstr[ii][0]+'-'+LDTstr[ii][1]=='{0:07.4f}-{1:07.4f}'.format(Dt[0],Dt[1])]
-    elif Dt is None:
-        LF = [LF[ii] for ii in range(0,len(LF)) if t>=float(LDTstr[ii][0]) and t<=float(LDTstr[ii][1])]
+    LF = Find_Index(OutPath, Cls='Sol2D', Exp='AUG', Diag='SXR', shot=shot, t=t, Dt=Dt, Mesh=Mesh, Deg=Deg, Deriv=Deriv, Sep=Sep, Pos=Pos)
     if len(LF)==0:
         print "No matching Sol2D file in ", OutPath
         out = None
@@ -821,6 +928,173 @@ def FindSolFile(shot=0, t=0, Dt=None, Mesh='Rough1', Deg=2, Deriv='D2N2', Sep=Tr
 
 
 
+###########################
+#   Indexing
+###########################
+
+# Each folder containing saved ToFu objects has an index file, with one json line per saved file, appended by Save_Generic()
+_IndexFile = '.tofu_index.jsonl'
+_IndexCache = {}
+_IndexLock = threading.Lock()
+_IndexKeys = ['Exp','Diag','Mesh','Deg','Deriv','Sep','Pos']
+_IndexRe = {'shot':re.compile(r'_sh(\d+)(?:_|$)|_(\d+)(?:_|$)'),
+            'Sol':re.compile(r'_(?P<Mesh>[^_]+)_D(?P<Deg>\d+)_Deriv(?P<Deriv>[^_]+)_Sep(?P<Sep>True|False)_Pos(?P<Pos>True|False)'),
+            'Dt':re.compile(r'_Dt(?P<t0>-?[0-9.]+)-(?P<t1>-?[0-9.]+)s(?:_|$)')}
+
+def _Index_entry(FileExt, Id=None):
+    """ Return the index entry (dict of the searchable parameters) of a saved file, from its name and from its ID if provided """
+    Name = os.path.splitext(FileExt)[0]
+    LS = Name.split('_')
+    try:
+        Cls = _get_ClsFromName(Name+'_')
+    except AssertionError:
+        Cls = None
+    shot = _IndexRe['shot'].search(Name)
+    Diag = [ss[2:] for ss in LS[3:] if ss[:2]=='Dg']
+    dd = {'File':FileExt, 'Cls':Cls, 'Exp':LS[2] if len(LS)>2 else None, 'Diag':Diag[0] if len(Diag)>0 else (LS[3] if Cls=='Sol2D' and len(LS)>3 else None),
+          'shot':None if shot is None else int([ss for ss in shot.groups() if ss is not None][0]), 'Mesh':None, 'Deg':None, 'Deriv':None, 'Sep':None, 'Pos':None, 'Dt':None}
+    Sol, Dt = _IndexRe['Sol'].search(Name), _IndexRe['Dt'].search(Name)
+    if Sol is not None:
+        dd.update({'Mesh':Sol.group('Mesh'), 'Deg':int(Sol.group('Deg')), 'Deriv':Sol.group('Deriv'), 'Sep':Sol.group('Sep')=='True', 'Pos':Sol.group('Pos')=='True'})
+    if Dt is not None:
+        dd['Dt'] = [float(Dt.group('t0')), float(Dt.group('t1'))]
+    if Id is not None:
+        dd.update({'Cls':Id.Cls, 'Exp':Id.Exp, 'Diag':Id.Diag, 'shot':Id.shot})
+    return dd
+
+
+def _Index_add(Index, dd):
+    # Files of a given (Cls,shot) are kept sorted by the start of their time interval (list of starts, list of files), for time searches
+    if dd['File'] in Index['Files'].keys():
+        Old = Index['Files'][dd['File']]
+        LT0, LF = Index['Keys'][(Old['Cls'],Old['shot'])]
+        ii = LF.index(dd['File'])
+        del LT0[ii], LF[ii]
+    Index['Files'][dd['File']] = dd
+    LT0, LF = Index['Keys'].setdefault((dd['Cls'],dd['shot']), ([],[]))
+    t0 = -np.inf if dd['Dt'] is None else dd['Dt'][0]
+    ii = bisect.bisect_right(LT0,t0)
+    LT0.insert(ii,t0)
+    LF.insert(ii,dd['File'])
+
+
+def _Index_build(LEntries):
+    Index = {'Files':dict([(dd['File'],dd) for dd in LEntries]), 'Keys':{}}
+    for dd in Index['Files'].values():
+        Index['Keys'].setdefault((dd['Cls'],dd['shot']), []).append((-np.inf if dd['Dt'] is None else dd['Dt'][0], dd['File']))
+    for kk in Index['Keys'].keys():
+        LL = sorted(Index['Keys'][kk])
+        Index['Keys'][kk] = ([ll[0] for ll in LL], [ll[1] for ll in LL])
+    return Index
+
+
+def _Index_load(Path):
+    """ Return the index of folder Path, (re-)loaded from the index file only if it changed, and built by scanning the folder if it does not exist """
+    pfe = Path+_IndexFile
+    if not os.path.isfile(pfe):
+        Rebuild_Index(Path)
+    stat = os.stat(pfe)
+    Index = _IndexCache.get(Path)
+    if Index is None or Index['stat']!=(stat.st_mtime,stat.st_size):
+        with open(pfe,'r') as ff:
+            LEntries = [json.loads(ll) for ll in ff if ll.strip()!='']
+        # Later lines (re-saved files) override earlier ones
+        Index = _Index_build([dict([(str(kk),str(vv) if type(vv) is unicode else vv) for (kk,vv) in dd.items()]) for dd in LEntries])
+        Index['stat'] = (stat.st_mtime,stat.st_size)
+        _IndexCache[Path] = Index
+    return Index
+
+
+def _Index_update(Path, FileExt, Id=None):
+    """ Append the entry of a newly saved file to the index of folder Path (only if the index already exists, else it will be built when first needed) """
+    pfe = Path+_IndexFile
+    if not os.path.isfile(pfe):
+        return
+    dd = _Index_entry(FileExt, Id=Id)
+    with _IndexLock:
+        Index = _IndexCache.get(Path)
+        stat = os.stat(pfe)
+        UpToDate = Index is not None and Index['stat']==(stat.st_mtime,stat.st_size)
+        with open(pfe,'a') as ff:
+            ff.write(json.dumps(dd)+'\n')
+        if UpToDate:
+            _Index_add(Index, dd)
+            stat = os.stat(pfe)
+            Index['stat'] = (stat.st_mtime,stat.st_size)
+
+
+def Rebuild_Index(Path):
+    """ (Re-)build the index of the saved ToFu objects of folder Path by scanning it
+
+    The index is automatically built when first queried and then kept up-to-date by :meth:`~tofu.pathfile.Save_Generic()`, so that re-building it is only necessary when files were added to the folder by other means (copy...)
+
+    Parameters
+    ----------
+    Path :      str
+        The absolute path of the folder
+
+    """
+    Path = Path if Path[-1]=='/' else Path+'/'
+    LF = sorted([ff for ff in os.listdir(Path) if ff[:2]=='TF' and os.path.splitext(ff)[1] in ['.npz','.pck']])
+    with _IndexLock:
+        with open(Path+_IndexFile+'.tmp','w') as ff:
+            for ll in LF:
+                ff.write(json.dumps(_Index_entry(ll))+'\n')
+        os.rename(Path+_IndexFile+'.tmp', Path+_IndexFile)
+        _IndexCache.pop(Path, None)
+
+
+def Find_Index(Path, Cls=None, shot=None, t=None, Dt=None, **kwdargs):
+    """ Return the list of the files of folder Path matching the provided criteria, using the index of the folder
+
+    The index (a json-lines file in the folder, see :meth:`~tofu.pathfile.Rebuild_Index()`) is loaded once and kept in memory, files are grouped by (Cls,shot) and sorted by time interval, so that no scan of the folder is needed.
+
+    Parameters
+    ----------
+    Path :      str
+        The absolute path of the folder
+    Cls :       None / str
+        If provided, the class of the saved objects
+    shot :      None / int
+        If provided, the shot number
+    t :         None / int / float
+        If provided, a time value that must be contained in the time interval of the files
+    Dt :        None / iterable
+        If provided, the time interval (to 1e-4 s) of the files
+    kwdargs :
+        Other criteria, among ['Exp','Diag','Mesh','Deg','Deriv','Sep','Pos']
+
+    Returns
+    -------
+    LF :        list
+        The sorted list of the matching file names (existing files only)
+
+    """
+    assert None in [t,Dt], "Arg t or Dt must be None !"
+    assert all([kk in _IndexKeys for kk in kwdargs.keys()]), "Criteria must be in "+str(_IndexKeys)+" !"
+    Path = Path if Path[-1]=='/' else Path+'/'
+    Index = _Index_load(Path)
+    if Cls is not None and shot is not None:
+        LK = [(Cls,shot)] if (Cls,shot) in Index['Keys'] else []
+    else:
+        LK = [kk for kk in Index['Keys'].keys() if (Cls is None or kk[0]==Cls) and (shot is None or kk[1]==shot)]
+    LF = []
+    for kk in LK:
+        LT0, Lf = Index['Keys'][kk]
+        if t is not None:
+            Lf = [ff for ff in Lf[:bisect.bisect_right(LT0,t)] if Index['Files'][ff]['Dt'] is not None and Index['Files'][ff]['Dt'][1]>=t]
+        elif Dt is not None:
+            Lf = Lf[bisect.bisect_left(LT0,Dt[0]-5.e-5):bisect.bisect_right(LT0,Dt[0]+5.e-5)]
+            Lf = [ff for ff in Lf if abs(Index['Files'][ff]['Dt'][1]-Dt[1])<5.e-5]
+        LF += [ff for ff in Lf if all([Index['Files'][ff][cc]==kwdargs[cc] for cc in kwdargs.keys()])]
+    # Indexed files may have been removed since, the folder is only listed again when its mtime changed
+    stat = os.stat(Path)
+    if Index.get('Dir') is None or Index['Dir'][0]!=stat.st_mtime:
+        Index['Dir'] = (stat.st_mtime, set(os.listdir(Path)))
+    return sorted([ff for ff in LF if ff in Index['Dir'][1]])
+
+
+
 def _get_ClsFromName(PathFileExt):
     assert type(PathFileExt) is str, "Arg PathFileExt must be a str !"
     LCls = ['Ves','LOS','GLOS','Apert','Lens','Detect','GDetect','Mesh1D','Mesh2D','BF1D','BF2D','PreData','Sol2D']
@@ -846,7 +1120,7 @@ def Save_Generic(obj, SaveName=None, Path=None, Mode='npz', compressed=False):
     They can be saved at their default SavePath under their default SaveName or user-defined values can be forced if necessary.
     Saving can be done in two ways :
         - by direct object saving using cPickle (straightforward but heavy)
-        - by mapping the key object attributes to a dictionary and using :meth:`numpy.savez_compressed()` (faster and lighter, recommended)
+        - by mapping the key object attributes to a dictionary and using :meth:`numpy.savez()` (faster and lighter, recommended)
 
     ToFu now automatically saves information on smaller objects on which the object of interest depends (like apertures for detectors), so that all info is stored in a single file.
     In particular, provided the Ves object is saved separately, a whole camera can be saved in a single file (i.e.: all detectors and apertures).
@@ -859,10 +1133,12 @@ def Save_Generic(obj, SaveName=None, Path=None, Mode='npz', compressed=False):
         Path specifying where to save the file, if None (recommended) uses obj.Id.SavePath
     Mode :          str
         Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, may cause retro-compatibility issues with later versions)
-    compressed :    bool
-        Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+    compressed :    bool / int
+        Flag, used when Mode='npz', indicating whether to compress the numerical arrays (slower saving and loading but smaller files)
+        If True, or an int (the zlib compression level, in [1,9]), the arrays are split in chunks compressed in parallel threads (see :meth:`~tofu.pathfile._savez_chunked()`), which can be decompressed independently
 
     """
+    assert type(compressed) is bool or (type(compressed) is int and 1<=compressed<=9), "Arg compressed must be a bool or an int in [1,9] !"
     if Path is None:
         Path = obj.Id.SavePath
     else:
@@ -879,6 +1155,7 @@ def Save_Generic(obj, SaveName=None, Path=None, Mode='npz', compressed=False):
         _save_np(obj, pathfileext, compressed=compressed)
     else:
         _save_object(obj, pathfileext)
+    _Index_update(Path, SaveName+Ext, Id=obj.Id)
     print("Saved in :  "+pathfileext)
 
 
@@ -937,17 +1214,127 @@ def _convert_Detect2Ldict(obj):
 
 def _convert_PreData2Ldict(obj):
     Init = {'data':obj._dataRef, 't':obj._tRef, 'Chans':obj._ChansRef, 'DtRef':obj._DtRef}
-    PhysNoiseParam = None if obj._PhysNoise is None else obj._PhysNoise['Param'].update(obj._NoiseModel['Par'])
+    PhysNoiseParam = None if obj._PhysNoise is None else dict(obj._PhysNoise['Param'], Method=obj._PhysNoise['Method'], **obj._NoiseModel['Par'])
     Update = {'Dt':obj.Dt, 'Resamp_t':obj._Resamp_t, 'Resamp_f':obj._Resamp_f, 'Resamp_Method':obj._Resamp_Method, 'Resamp_interpkind':obj._Resamp_interpkind,
             'indOut':obj._indOut, 'indCorr':obj._indCorr, 'interp_lt':obj._interp_lt, 'interp_lNames':obj._interp_lNames, 'Subtract_tsub':obj._Subtract_tsub,
-            'FFTPar':obj._FFTPar, 'PhysNoiseParam':PhysNoiseParam}
+            'FFTPar':obj._FFTPar, 'ModeSmooth':obj._ModeSmooth, 'PhysNoiseParam':PhysNoiseParam}
     return Init, Update
 
 
+def _apply_Ldict2PreData(obj, Update):
+    """ Apply to a PreData object the treatment stored in Update (see :meth:`~tofu.pathfile._convert_PreData2Ldict()`), the excluded / corrected channels being given either as bool arrays or as lists of channel names """
+    obj.set_Dt(Update['Dt'], Calc=False)
+    obj.set_Resamp(t=Update['Resamp_t'], f=Update['Resamp_f'], Method=Update['Resamp_Method'], interpkind=Update['Resamp_interpkind'], Calc=False)
+    indOut, indCorr = Update['indOut'], Update['indCorr']
+    if type(indOut) is list:
+        indOut = np.array([cc in indOut for cc in obj._ChansRef], dtype=bool)
+    if type(indCorr) is list:
+        indCorr = np.array([cc in indCorr for cc in obj._ChansRef], dtype=bool)
+    obj.Out_add(indOut=indOut, Calc=False)
+    obj.Corr_add(indCorr=indCorr, Calc=False)
+    if not Update['interp_lt'] is None:
+        obj.interp(lt=Update['interp_lt'], lNames=Update['interp_lNames'], Calc=False)
+    obj.substract_Dt(tsub=Update['Subtract_tsub'], Calc=False)
+    obj.set_ModeSmoothing(Calc=False, **({} if Update.get('ModeSmooth',None) is None else Update['ModeSmooth']))
+    obj.set_fft(Calc=True, **({} if Update['FFTPar'] is None else Update['FFTPar']))
+    if not Update['PhysNoiseParam'] is None:
+        Par = dict(Update['PhysNoiseParam'])
+        if not 'Method' in Par.keys():
+            Par['Method'] = 'svd' if 'Modes' in Par.keys() else 'fft'
+        obj.set_PhysNoise(**Par)
+
+
+
+###########################
+#   Chunked compression
+###########################
+
+_zchH, _zchO, _zch, _zchS = 'zchH_', 'zchO_', 'zch_', 'zchS'
+
+def _savez_chunked(pathfileext, Level=TFDCompressLevel, ChunkSize=TFDCompressChunkSize, NThreads=TFDCompressNThreads, MinSize=TFDSaveNpyMinSize, **Arr):
+    """ Save the members of Arr in a npz file, the numerical arrays being split in chunks which are compressed (zlib) in parallel threads
+
+    The npz file itself is not compressed, each numerical member Name of at least MinSize bytes is replaced by:
+        - 'zch_'+Name:  the concatenated compressed chunks (uint8)
+        - 'zchO_'+Name: the offsets of the chunks in the former (int64)
+        - 'zchH_'+Name: a json header with the dtype, shape, order and number of elements per chunk
+    The chunks can thus be decompressed independently (see _get_npzChunks()).
+    All the other members (small arrays, pickled objects such as the dict of attributes of a Detect) are pickled together and compressed as a single member 'zchS' (uint8), to avoid the overhead of many small members.
+    """
+    Out, Small, LJobs = {}, {}, []
+    for kk in Arr.keys():
+        aa = Arr[kk]
+        if isinstance(aa,np.ndarray) and aa.dtype.kind in 'biufc' and aa.nbytes>=MinSize:
+            fortran = bool(aa.flags.f_contiguous and not aa.flags.c_contiguous)
+            flat = aa.ravel(order='F' if fortran else 'C')
+            nEl = max(1,ChunkSize//aa.itemsize)
+            LJobs += [(kk,flat[ii:ii+nEl]) for ii in range(0,flat.size,nEl)]
+            Out[_zchH+kk] = np.array(json.dumps({'dtype':aa.dtype.str, 'shape':aa.shape, 'fortran':fortran, 'nEl':nEl}))
+        else:
+            Small[kk] = np.asanyarray(aa)
+    if len(Small)>0:
+        Out[_zchS] = np.frombuffer(zlib.compress(pck.dumps(Small, protocol=pck.HIGHEST_PROTOCOL), Level), dtype=np.uint8)
+    pool = ThreadPool(NThreads)
+    try:
+        LZ = pool.map(lambda job: zlib.compress(buffer(np.ascontiguousarray(job[1])), Level), LJobs)
+    finally:
+        pool.close()
+        pool.join()
+    for kk in set([jj[0] for jj in LJobs]):
+        lz = [LZ[ii] for ii in range(0,len(LJobs)) if LJobs[ii][0]==kk]
+        Out[_zch+kk] = np.frombuffer(''.join(lz), dtype=np.uint8)
+        Out[_zchO+kk] = np.cumsum([0]+[len(zz) for zz in lz]).astype(np.int64)
+    np.savez(pathfileext, **Out)
+
+
+def _get_npzChunks(pathfileext, Out, Name, ind=None, NThreads=TFDCompressNThreads, mmap=True):
+    """ Return member Name of a file saved by _savez_chunked(), or if ind is provided only the (flattened) elements of its chunks of indices ind, decompressed in parallel threads """
+    Head, Off = json.loads(str(Out[_zchH+Name])), Out[_zchO+Name]
+    Z = _get_npzMember(pathfileext, Out, _zch+Name, mmap=mmap)
+    dtype, shape, nEl = np.dtype(str(Head['dtype'])), tuple(Head['shape']), Head['nEl']
+    ind = range(0,Off.size-1) if ind is None else [ind] if type(ind) is int else ind
+    Size = int(np.prod(shape))
+    nn = np.cumsum([0]+[min(nEl,Size-ii*nEl) for ii in ind])
+    aa = np.empty((nn[-1],), dtype=dtype)
+    def _decompress(jj):
+        aa[nn[jj]:nn[jj+1]] = np.frombuffer(zlib.decompress(buffer(Z[Off[ind[jj]]:Off[ind[jj]+1]])), dtype=dtype)
+    pool = ThreadPool(min(NThreads,max(1,len(ind))))
+    try:
+        pool.map(_decompress, range(0,len(ind)))
+    finally:
+        pool.close()
+        pool.join()
+    return aa.reshape(shape, order='F' if Head['fortran'] else 'C') if nn[-1]==Size and len(ind)==Off.size-1 else aa
+
+
+class _NpzChunked(object):
+    """ Wrapper around a npz file saved by _savez_chunked(), giving access to the compressed members as if they were regular members (the chunks of member Name can be read with get_Chunks(Name, ind)) """
+    def __init__(self, pathfileext, Out, mmap=True):
+        self._pathfileext, self._Out, self._mmap = pathfileext, Out, mmap
+        self._Chunked = set([kk[len(_zchH):] for kk in Out.keys() if kk[:len(_zchH)]==_zchH])
+        self._Small = pck.loads(zlib.decompress(Out[_zchS].tostring())) if _zchS in Out.keys() else {}
+        self.zip = Out.zip
+    def keys(self):
+        return [kk for kk in self._Out.keys() if kk!=_zchS and not any([kk[:len(pp)]==pp for pp in [_zchH,_zchO,_zch]])] + list(self._Chunked) + self._Small.keys()
+    def __contains__(self, Name):
+        return Name in self.keys()
+    def __getitem__(self, Name):
+        if Name in self._Small:
+            return self._Small[Name]
+        elif Name in self._Chunked:
+            return _get_npzChunks(self._pathfileext, self._Out, Name, mmap=self._mmap)
+        return self._Out[Name]
+    def get_Chunks(self, Name, ind=None):
+        return _get_npzChunks(self._pathfileext, self._Out, Name, ind=ind, mmap=self._mmap)
+
 
 def _save_np(obj, pathfileext, compressed=False):
 
-    func = np.savez_compressed if compressed else np.savez
+    if compressed is False:
+        func = np.savez
+    else:
+        Level = TFDCompressLevel if compressed is True else compressed
+        func = lambda pathfileext, **kwdargs: _savez_chunked(pathfileext, Level=Level, **kwdargs)
 
     Idsave = obj.Id.todict()
 
@@ -975,24 +1362,31 @@ def _save_np(obj, pathfileext, compressed=False):
     elif obj.Id.Cls=='Detect':
         LOSprops, Sino, Span, Cone, SAng, SynthDiag, Res, Optics = _convert_Detect2Ldict(obj)
         VesCalc = {'SavePath':None} if (not hasattr(obj,'_VesCalc') or obj._VesCalc is None) else {'SavePath':obj._VesCalc.Id.SavePath, 'SaveName':obj._VesCalc.Id.SaveName}
+        Arr = {}
+        Sino, Span, Cone, SAng, SynthDiag, Res = [_extract_npyArrays(dd, Arr) for dd in [Sino, Span, Cone, SAng, SynthDiag, Res]]
         func(pathfileext, Idsave=Idsave, Poly=obj.Poly, Rad=obj.Rad, BaryS=obj.BaryS, nIn=obj.nIn, arrayorder=obj._arrayorder, Clock=obj._Clock, Sino_RefPt=obj.Sino_RefPt, LOSNP=[obj._LOS_NP],
-                LOSprops=[LOSprops], Sino=[Sino], Span=[Span], Cone=[Cone], SAng=[SAng], SynthDiag=[SynthDiag], Res=[Res], Optics=[Optics], VesCalc=[VesCalc])
+                LOSprops=[LOSprops], Sino=[Sino], Span=[Span], Cone=[Cone], SAng=[SAng], SynthDiag=[SynthDiag], Res=[Res], Optics=[Optics], VesCalc=[VesCalc], **Arr)
 
     elif obj.Id.Cls=='GDetect':
-        LDetsave, LDetSynthRes = [], []
+        LDetsave = []
         for ii in range(0,obj.nDetect):
-            ddIdsave = obj.LDetect[ii].Id.todict()
             LOSprops, Sino, Span, Cone, SAng, SynthDiag, Res, Optics = _convert_Detect2Ldict(obj.LDetect[ii])
             VesCalc = {'SavePath':None} if (not hasattr(obj.LDetect[ii],'_VesCalc') or obj.LDetect[ii]._VesCalc is None) else {'SavePath':obj.LDetect[ii]._VesCalc.Id.SavePath, 'SaveName':obj.LDetect[ii]._VesCalc.Id.SaveName}
-            dd = dict(Idsave=ddIdsave, Poly=obj.LDetect[ii].Poly, Rad=obj.LDetect[ii].Rad, BaryS=obj.LDetect[ii].BaryS, nIn=obj.LDetect[ii].nIn, arrayorder=obj._arrayorder, Clock=obj._Clock, Sino_RefPt=obj.Sino_RefPt,
-                      LOSNP=[obj.LDetect[ii]._LOS_NP], LOSprops=[LOSprops], Sino=[Sino], Span=[Span], Cone=[Cone], SAng=[SAng], Optics=[Optics], VesCalc=[VesCalc])
-            LDetsave.append(dd)
-            LDetSynthRes.append({'SynthDiag':[SynthDiag],'Res':[Res]})
+            LDetsave.append(dict(Idsave=obj.LDetect[ii].Id.todict(), Poly=obj.LDetect[ii].Poly, Rad=obj.LDetect[ii].Rad, BaryS=obj.LDetect[ii].BaryS, nIn=obj.LDetect[ii].nIn, LOSNP=obj.LDetect[ii]._LOS_NP,
+                                 LOSprops=LOSprops, Sino=Sino, Span=Span, Cone=Cone, SAng=SAng, SynthDiag=SynthDiag, Res=Res, Optics=Optics, VesCalc=VesCalc))
         Res, lAttr = {}, dir(obj)
         for pp in lAttr:
             if not inspect.ismethod(getattr(obj,pp)) and '_Res' in pp:
                 Res[pp] = getattr(obj,pp)
-        func(pathfileext, Idsave=Idsave, arrayorder=obj._arrayorder, Clock=obj._Clock, Sino_RefPt=obj.Sino_RefPt, LOSRef=obj._LOSRef, Res=[Res], LDetsave=LDetsave, LDetSynthRes=LDetSynthRes)
+        Shared = obj._SynthDiag_Shared
+        if Shared is not None:
+            Shared = {'Points':Shared['Points'], 'data':Shared['W'].data, 'indices':Shared['W'].indices, 'indptr':Shared['W'].indptr, 'shape':Shared['W'].shape, 'dXYZ':Shared['dXYZ'], 'Colis':Shared['Colis']}
+        GD = dict(Idsave=Idsave, arrayorder=obj._arrayorder, Clock=obj._Clock, Sino_RefPt=obj.Sino_RefPt, LOSRef=obj._LOSRef, Res=Res, SynthDiagShared=Shared)
+        Arr, Str = {}, {}
+        Header = {'Format':'tofu.col', 'Version':1, 'Cls':obj.Id.Cls, 'GD':_Col_encode([GD], 'GD_', Arr, Str), 'LD':_Col_encode(LDetsave, 'LD_', Arr, Str),
+                  'LDNames':[dd.Id.Name for dd in obj.LDetect]}
+        Arr['StrData'], Arr['StrOff'] = _Col_encode_Str(Str)
+        func(pathfileext, Header=np.array(json.dumps(Header)), **Arr)
 
     # tofu.Eq
     elif obj.Id.Cls=='Eq2D':
@@ -1073,12 +1467,170 @@ def save_np_IdObj(Id):
 
 
 
+_npyRef = 'tofu.npy:'
+
+def _extract_npyArrays(dd, Arr, MinSize=TFDSaveNpyMinSize):
+    """ Return a copy of dict dd where the large numerical np.ndarrays are (recursively) replaced by a reference to a separate npz member, added to dict Arr, so that they can be memory-mapped when loading
+
+    The nested dicts are rebuilt rather than modified in place, since they may be attributes of the saved object (e.g.: Detect._SynthDiag_Comp)
+    """
+    Out = {}
+    for kk in dd.keys():
+        if type(dd[kk]) is dict:
+            Out[kk] = _extract_npyArrays(dd[kk], Arr, MinSize=MinSize)
+        elif isinstance(dd[kk], np.ndarray) and not dd[kk].dtype==object and dd[kk].nbytes>=MinSize:
+            Name = 'Arr'+str(len(Arr))
+            Arr[Name] = dd[kk]
+            Out[kk] = _npyRef+Name
+        else:
+            Out[kk] = dd[kk]
+    return Out
+
+
+
+###########################
+#   Columnar layout
+###########################
+
+# Kinds of the nodes of the nested structures stored in columns
+_Col_Kinds = {'Absent':0, 'None':1, 'Array':2, 'Scalar':3, 'str':4, 'unicode':5, 'list':6, 'tuple':7, 'dict':8, 'datetime':9}
+_Col_dtFormat = '%Y-%m-%d %H:%M:%S.%f'
+
+def _Col_walk(x, pp, ii, Val, Paths, Str):
+    if not pp in Val.keys():
+        Val[pp] = {}
+        Paths.append(pp)
+    if x is None:
+        Val[pp][ii] = (_Col_Kinds['None'], 0)
+    elif type(x) is dict:
+        Val[pp][ii] = (_Col_Kinds['dict'], 0)
+        for kk in x.keys():
+            _Col_walk(x[kk], pp+(kk,), ii, Val, Paths, Str)
+    elif type(x) in [list,tuple]:
+        Val[pp][ii] = (_Col_Kinds[type(x).__name__], len(x))
+        for jj in range(0,len(x)):
+            _Col_walk(x[jj], pp+(jj,), ii, Val, Paths, Str)
+    elif type(x) in [str,unicode,np.string_,np.unicode_]:
+        kk = 'unicode' if isinstance(x,unicode) else 'str'
+        Val[pp][ii] = (_Col_Kinds[kk], Str.setdefault(x.encode('utf-8') if kk=='unicode' else str(x), len(Str)))
+    elif type(x) is dtm.datetime:
+        Val[pp][ii] = (_Col_Kinds['datetime'], Str.setdefault(x.strftime(_Col_dtFormat), len(Str)))
+    elif isinstance(x, np.ndarray) and x.dtype.kind in 'biufc':
+        Val[pp][ii] = (_Col_Kinds['Array'], x)
+    elif isinstance(x, np.ndarray):
+        _Col_walk(x.tolist(), pp, ii, Val, Paths, Str)
+    else:
+        assert isinstance(x,(bool,int,long,float,complex,np.number,np.bool_)), "Type "+str(type(x))+" (in "+str(pp)+") cannot be saved in columnar format !"
+        Val[pp][ii] = (_Col_Kinds['Scalar'], np.asarray(x))
+
+
+def _Col_encode(LObj, Prefix, Arr, Str):
+    """ Store a list of nested structures (dict, list, tuple of np.ndarray, scalar, str, datetime or None) as columns in dict Arr and return the header describing them
+
+    Each path (sequence of keys / indices) to a node of the structures gets a column of kinds (one per object) and a column of integers (length of lists and tuples or index of strings in the string table Str).
+    The numerical values (arrays and scalars) of a path are flattened and concatenated across objects in a single data column, with an offset, a shape and a dtype column, so that no pickling is needed and any subset of objects can be read independently.
+    """
+    nObj, Paths, Val = len(LObj), [], {}
+    for ii in range(0,nObj):
+        _Col_walk(LObj[ii], (), ii, Val, Paths, Str)
+    DTypes = []
+    for pp in range(0,len(Paths)):
+        vv = Val[Paths[pp]]
+        K, I = np.zeros((nObj,),dtype=np.int8), np.zeros((nObj,),dtype=np.int64)
+        LA = []
+        for ii in sorted(vv.keys()):
+            K[ii] = vv[ii][0]
+            if vv[ii][0] in [_Col_Kinds['Array'],_Col_Kinds['Scalar']]:
+                LA.append((ii,vv[ii][1]))
+            else:
+                I[ii] = vv[ii][1]
+        Arr[Prefix+'K'+str(pp)], Arr[Prefix+'I'+str(pp)] = K, I
+        if len(LA)>0:
+            dtype = np.result_type(*[aa.dtype for (ii,aa) in LA])
+            Off, S, T = np.zeros((nObj+1,),dtype=np.int64), -np.ones((nObj,max(1,max([aa.ndim for (ii,aa) in LA]))),dtype=np.int64), -np.ones((nObj,),dtype=np.int16)
+            for (ii,aa) in LA:
+                Off[ii+1], S[ii,:aa.ndim] = aa.size, aa.shape
+                if not aa.dtype.str in DTypes:
+                    DTypes.append(aa.dtype.str)
+                T[ii] = DTypes.index(aa.dtype.str)
+            Arr[Prefix+'D'+str(pp)] = np.concatenate([aa.astype(dtype).ravel() for (ii,aa) in LA])
+            Arr[Prefix+'O'+str(pp)], Arr[Prefix+'S'+str(pp)], Arr[Prefix+'T'+str(pp)] = np.cumsum(Off), S, T
+    return {'nObj':nObj, 'Paths':[list(pp) for pp in Paths], 'DTypes':DTypes}
+
+
+def _Col_encode_Str(Str):
+    LS = sorted(Str.keys(), key=Str.get)
+    Off = np.cumsum([0]+[len(ss) for ss in LS]).astype(np.int64)
+    Data = np.frombuffer(''.join(LS), dtype=np.uint8).copy() if len(''.join(LS))>0 else np.zeros((0,),dtype=np.uint8)
+    return Data, Off
+
+
+def _Col_decode(Head, Prefix, get, Str, ind=None):
+    """ Re-create the list of nested structures stored by _Col_encode() (only those of indices ind if provided), using get(Name, Large) to retrieve the columns """
+    Paths = [tuple([str(kk) if type(kk) is unicode else kk for kk in pp]) for pp in Head['Paths']]
+    indP = dict([(Paths[pp],pp) for pp in range(0,len(Paths))])
+    Children = {}
+    for pp in Paths[1:]:
+        Children.setdefault(pp[:-1],[]).append(pp)
+    K = [get(Prefix+'K'+str(pp), False) for pp in range(0,len(Paths))]
+    I = [get(Prefix+'I'+str(pp), False) for pp in range(0,len(Paths))]
+    Cols = {}
+
+    def build(pp, ii):
+        ip = indP[pp]
+        kk = K[ip][ii]
+        if kk==_Col_Kinds['None']:
+            return None
+        elif kk in [_Col_Kinds['Array'],_Col_Kinds['Scalar']]:
+            if not ip in Cols.keys():
+                Cols[ip] = [get(Prefix+'D'+str(ip), True)]+[get(Prefix+cc+str(ip), False) for cc in ['O','S','T']]
+            D, O, S, T = Cols[ip]
+            aa = D[O[ii]:O[ii+1]].reshape(tuple(S[ii][S[ii]>=0]))
+            dtype = np.dtype(str(Head['DTypes'][T[ii]]))
+            aa = aa if aa.dtype==dtype else aa.astype(dtype)
+            return aa.item() if kk==_Col_Kinds['Scalar'] else aa
+        elif kk in [_Col_Kinds['str'],_Col_Kinds['unicode'],_Col_Kinds['datetime']]:
+            ss = Str[I[ip][ii]]
+            return ss if kk==_Col_Kinds['str'] else ss.decode('utf-8') if kk==_Col_Kinds['unicode'] else dtm.datetime.strptime(ss,_Col_dtFormat)
+        elif kk in [_Col_Kinds['list'],_Col_Kinds['tuple']]:
+            ll = [build(pp+(jj,), ii) for jj in range(0,I[ip][ii])]
+            return ll if kk==_Col_Kinds['list'] else tuple(ll)
+        elif kk==_Col_Kinds['dict']:
+            return dict([(cc[-1],build(cc, ii)) for cc in Children.get(pp,[]) if K[indP[cc]][ii]!=_Col_Kinds['Absent']])
+
+    ind = range(0,Head['nObj']) if ind is None else ind
+    return [build((), ii) for ii in ind]
+
+
+def _Col_open(pathfileext, Out, ind=None, mmap=True):
+    """ Load a GDetect saved in columnar format and return a dict with the same fields as the legacy (pickled) layout, ind being the indices or names of the detectors to be loaded """
+    Head = json.loads(str(Out['Header']))
+    get = lambda Name, Large: _get_npzMember(pathfileext, Out, Name, mmap=mmap) if Large else Out[Name]
+    StrData, StrOff = Out['StrData'].tostring(), Out['StrOff']
+    Str = [StrData[StrOff[ii]:StrOff[ii+1]] for ii in range(0,StrOff.size-1)]
+    if not ind is None:
+        ind = [ind] if isinstance(ind,(int,np.integer,str)) else ind
+        ind = [Head['LDNames'].index(ii) if type(ii) is str else int(ii) for ii in ind]
+    GD = _Col_decode(Head['GD'], 'GD_', get, Str)[0]
+    LD = _Col_decode(Head['LD'], 'LD_', get, Str, ind=ind)
+    LDetsave, LDetSynthRes = [], []
+    for dd in LD:
+        LDetSynthRes.append({'SynthDiag':[dd.pop('SynthDiag')], 'Res':[dd.pop('Res')]})
+        for kk in ['LOSNP','LOSprops','Sino','Span','Cone','SAng','Optics','VesCalc']:
+            dd[kk] = [dd[kk]]
+        LDetsave.append(dd)
+    Dout = dict([(kk,np.asarray(GD[kk])) for kk in ['arrayorder','Clock','Sino_RefPt','LOSRef']])
+    Dout.update({'Idsave':GD['Idsave'], 'Res':[GD['Res']], 'SynthDiagShared':[GD['SynthDiagShared']], 'LDetsave':LDetsave, 'LDetSynthRes':LDetSynthRes, 'LDind':ind})
+    return Dout
+
+
+
 ###########################
 #   Opening
 ###########################
 
 
-def Open(pathfileext=None, shot=None, t=None, Dt=None, Mesh=None, Deg=None, Deriv=None, Sep=True, Pos=True, OutPath=None, ReplacePath=None, Ves=None, out='full', Verb=False):
+def Open(pathfileext=None, shot=None, t=None, Dt=None, Mesh=None, Deg=None, Deriv=None, Sep=True, Pos=True, OutPath=None, ReplacePath=None, Ves=None, out='full', mmap=TFDOpenmmap, ind=None, Verb=False):
     """ Open a ToFu object saved file
 
     This generic open function identifies the required loading routine by detecting how the object was saved from the file name extension.
@@ -1087,10 +1639,12 @@ def Open(pathfileext=None, shot=None, t=None, Dt=None, Mesh=None, Deg=None, Deri
 
     If pathfileext is not provided (None), then the following keyword arguments are fed to :meth:`~tofu.pathfile.FindSolFile()`: shot, t, Dt, Mesh, Deg, Deriv, Sep, Pos
 
+    If pathfileext is a list of files or a directory, the files are loaded concurrently by :meth:`~tofu.pathfile.Open_Bulk()` and the list of re-created objects is returned
+
     Parameters
     ----------
-    pathfileext :   None / str
-        If provided, the name of the file to load
+    pathfileext :   None / str / list
+        If provided, the name of the file to load (or a list of such files or a directory, see :meth:`~tofu.pathfile.Open_Bulk()`)
     OutPath :       None / str
         If provided, the absolute path where the file is to be found
     ReplacePath :   str
@@ -1099,6 +1653,10 @@ def Open(pathfileext=None, shot=None, t=None, Dt=None, Mesh=None, Deg=None, Deri
         If provided, the :class:`tofu.geom.Ves` object that shall be used to reconstruct the object (if not provided, the appropriate vessel will be loaded).
     out :           str
         Flag indicating whether the object should be loaded completely ('full'), in a light dismissing the heaviest attributes ('light') or whether only the Id or a list of Id should be returned ('Id'), valid only for '.npz'
+    mmap :          bool
+        Flag indicating whether the large arrays saved as separate members of an uncompressed '.npz' file (e.g.: _SynthDiag_Points, _SAngCross_Int) should be memory-mapped (copy-on-write) rather than read, so that they are only paged in when accessed
+    ind :           None / int / str / list
+        If provided, indices or names of the detectors to be loaded (only for :class:`~tofu.geom.GDetect` objects, which are saved in a columnar format allowing to read only a subset of detectors)
     Verb :          bool
         Flag indicating whether to pring intermediate comments on the loading procedure
 
@@ -1109,21 +1667,119 @@ def Open(pathfileext=None, shot=None, t=None, Dt=None, Mesh=None, Deg=None, Deri
 
     """
     assert None in [pathfileext,shot] and not (pathfileext is None and shot is None), "Arg pathfileext or shot must be None, but not both !"
+    if type(pathfileext) is list or (type(pathfileext) is str and os.path.isdir(pathfileext)):
+        assert ind is None, "Arg ind cannot be used when loading several files !"
+        return Open_Bulk(pathfileext, Ves=Ves, ReplacePath=ReplacePath, out=out, mmap=mmap, Verb=Verb)[0]
     if pathfileext is None:
         File = FindSolFile(shot=shot, t=t, Dt=Dt, Mesh=Mesh, Deg=Deg, Deriv=Deriv, Sep=Sep, Pos=Pos, OutPath=OutPath)
         if File is None:
             return File
         pathfileext = OutPath+File
     assert '.npz' in pathfileext or '.pck' in pathfileext, "Arg pathfileext must contain '.npz' or .pck !"
-
-    if '.npz' in pathfileext:
-        obj = _open_np(pathfileext, Ves=Ves, ReplacePath=ReplacePath, out=out, Verb=Verb)
+    assert ind is None or '.npz' in pathfileext, "Arg ind can only be used for GDetect objects saved in columnar format ('.npz') !"
+
+    if '.npz' in pathfileext and not _Open_Cache is None and out=='full' and ind is None:
+        obj, Hit = _open_cached(pathfileext, Ves=Ves, ReplacePath=ReplacePath, mmap=mmap, Verb=Verb)
+        if Hit:
+            return obj
+    elif '.npz' in pathfileext:
+        obj = _open_np(pathfileext, Ves=Ves, ReplacePath=ReplacePath, out=out, mmap=mmap, ind=ind, Verb=Verb)
     else:
         obj = _open_object(pathfileext)
     print("Loaded :  "+pathfileext)
     return obj
 
 
+# In-process cache of the objects loaded during a call to Open_Bulk(), keyed by SaveName, so that the shared dependencies (Ves, Apert, Lens...) are only loaded once
+_Open_Cache = None
+
+def _open_cached(pathfileext, **kwdargs):
+    Key = os.path.basename(pathfileext).replace('.npz','')
+    with _Open_Cache['Lock']:
+        if not Key in _Open_Cache['KeyLocks'].keys():
+            _Open_Cache['KeyLocks'][Key] = threading.Lock()
+    # Dependencies form an acyclic graph (Detect => Apert => Ves), so per-key locks cannot deadlock
+    with _Open_Cache['KeyLocks'][Key]:
+        if Key in _Open_Cache['Obj'].keys():
+            _Open_Cache['Hits'][Key] += 1
+            return _Open_Cache['Obj'][Key], True
+        t0 = time.time()
+        obj = _open_np(pathfileext, out='full', **kwdargs)
+        _Open_Cache['Obj'][Key], _Open_Cache['t'][Key], _Open_Cache['Hits'][Key] = obj, time.time()-t0, 0
+    return obj, False
+
+
+def Open_Bulk(LPathfileext, Lstr=[], NThreads=TFDOpenNThreads, Ves=None, ReplacePath=None, out='full', mmap=TFDOpenmmap, Verb=False):
+    """ Open several ToFu object saved files concurrently, loading their shared dependencies only once
+
+    The files are read in a pool of threads.
+    Within the call, all objects are stored in an in-process cache keyed by their SaveName, so that a dependency shared by several objects (e.g.: the Ves of many Apert and Detect objects) is loaded only once and the same instance is re-used.
+
+    Parameters
+    ----------
+    LPathfileext :  str / list
+        List of the files to be loaded, or directory in which all the '.npz' files (containing all the sub-strings in Lstr) shall be loaded
+    Lstr :          list
+        List of str that the file names must contain (only used if LPathfileext is a directory)
+    NThreads :      int
+        Number of threads to be used
+    Ves :           None / :class:`tofu.geom.Ves`
+        Fed to :meth:`~tofu.pathfile.Open()`
+    ReplacePath :   None / str
+        Fed to :meth:`~tofu.pathfile.Open()`
+    out :           str
+        Fed to :meth:`~tofu.pathfile.Open()`, the cache is only used for 'full'
+    mmap :          bool
+        Fed to :meth:`~tofu.pathfile.Open()`
+    Verb :          bool
+        Flag indicating whether to print the timings report
+
+    Returns
+    -------
+    LObj :          list
+        The list of loaded ToFu objects, in the same order as the files
+    Report :        dict
+        Timings report, with keys:
+            - 'Files': the list of loaded files
+            - 't': the time (s) spent loading each file (including the loading of its dependencies, or the waiting for them)
+            - 'Deps': dict of the time (s) spent loading each object (including dependencies), keyed by SaveName
+            - 'Hits': dict of the number of times each object was retrieved from the cache instead of being loaded, keyed by SaveName
+            - 'Total': the total wall time (s)
+
+    """
+    global _Open_Cache
+    assert type(LPathfileext) in [str,list], "Arg LPathfileext must be a str (directory) or a list of str (files) !"
+    assert type(NThreads) is int and NThreads>=1, "Arg NThreads must be a strictly positive int !"
+    if type(LPathfileext) is str:
+        Path = LPathfileext if LPathfileext[-1]=='/' else LPathfileext+'/'
+        LPathfileext = sorted([Path+ff for ff in os.listdir(Path) if ff[-4:]=='.npz' and all([ss in ff for ss in Lstr])])
+    assert _Open_Cache is None, "Open_Bulk() cannot be called while another bulk loading is running !"
+
+    def _load(pathfileext):
+        t0 = time.time()
+        obj = Open(pathfileext, Ves=Ves, ReplacePath=ReplacePath, out=out, mmap=mmap, Verb=False)
+        return obj, time.time()-t0
+
+    _Open_Cache = {'Lock':threading.Lock(), 'KeyLocks':{}, 'Obj':{}, 't':{}, 'Hits':{}}
+    t0 = time.time()
+    try:
+        pool = ThreadPool(min(NThreads,max(1,len(LPathfileext))))
+        try:
+            Out = pool.map(_load, LPathfileext)
+        finally:
+            pool.close()
+            pool.join()
+        Report = {'Files':LPathfileext, 't':[oo[1] for oo in Out], 'Deps':_Open_Cache['t'], 'Hits':_Open_Cache['Hits'], 'Total':time.time()-t0}
+    finally:
+        _Open_Cache = None
+
+    if Verb:
+        print("Loaded "+str(len(LPathfileext))+" files in "+str(round(Report['Total'],3))+" s ("+str(len(Report['Deps']))+" objects loaded, "+str(sum(Report['Hits'].values()))+" cache hits) :")
+        for ii in range(0,len(LPathfileext)):
+            print("    "+str(round(Report['t'][ii],3))+" s   "+LPathfileext[ii])
+    return [oo[0] for oo in Out], Report
+
+
 
 def _open_object(pathfileext):
     with Open(pathfileext, 'rb') as input:
@@ -1227,7 +1883,7 @@ def _resetDetectAttr(obj, Out):
 
 def _get_light_SynthDiag_Res():
     SynthDiag = {'_SynthDiag_Done':False, '_SynthDiag_ds':None, '_SynthDiag_dsMode':None, '_SynthDiag_MarginS':None, '_SynthDiag_dX12':None, '_SynthDiag_dX12Mode':None, '_SynthDiag_Colis':None,
-                 '_SynthDiag_Points':None, '_SynthDiag_SAng':None, '_SynthDiag_Vect':None, '_SynthDiag_dV':None}
+                 '_SynthDiag_Points':None, '_SynthDiag_SAng':None, '_SynthDiag_Vect':None, '_SynthDiag_dV':None, '_SynthDiag_Comp':None}
     Res = {'_Res_Mode':None, '_Res_Amp':None, '_Res_Deg':None,
            '_Res_Pts':None, '_Res_Res':None, '_Res_CrossMesh':None, '_Res_CrossMeshMode':None,
            '_Res_steps':None, '_Res_Thres':None, '_Res_ThresMode':None, '_Res_ThresMin':None,
@@ -1240,7 +1896,38 @@ def _get_light_SynthDiag_Res():
 
 
 
-def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
+def _get_npzMember(pathfileext, Out, Name, mmap=True):
+    """ Return member Name of a npz file, as a (copy-on-write) memory-mapped array if possible (uncompressed member of numerical dtype), else loaded """
+    if mmap and not (Name in getattr(Out,'_Chunked',set()) or Name in getattr(Out,'_Small',{})):
+        if hasattr(Out,'zip'):
+            info = Out.zip.getinfo(Name+'.npy')
+        else:
+            with zipfile.ZipFile(pathfileext) as zz:
+                info = zz.getinfo(Name+'.npy')
+        if info.compress_type==zipfile.ZIP_STORED:
+            with open(pathfileext,'rb') as ff:
+                ff.seek(info.header_offset)
+                nname, nextra = struct.unpack('<HH', ff.read(30)[26:30])
+                ff.seek(info.header_offset+30+nname+nextra)
+                version = np.lib.format.read_magic(ff)
+                read_header = np.lib.format.read_array_header_1_0 if version==(1,0) else np.lib.format.read_array_header_2_0
+                shape, fortran, dtype = read_header(ff)
+                offset = ff.tell()
+            if not dtype.hasobject:
+                return np.asarray(np.memmap(pathfileext, dtype=dtype, mode='c', shape=shape, order='F' if fortran else 'C', offset=offset))
+    return Out[Name]
+
+def _restore_npyArrays(dd, pathfileext, Out, mmap=True):
+    """ Replace (recursively) in dict dd the references to separate npz members (see _extract_npyArrays()) by the corresponding arrays """
+    for kk in dd.keys():
+        if type(dd[kk]) is dict:
+            _restore_npyArrays(dd[kk], pathfileext, Out, mmap=mmap)
+        elif type(dd[kk]) is str and dd[kk][:len(_npyRef)]==_npyRef:
+            dd[kk] = _get_npzMember(pathfileext, Out, dd[kk][len(_npyRef):], mmap=mmap)
+    return dd
+
+
+def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', mmap=TFDOpenmmap, ind=None, Verb=False):
 
     if 'TFG' in pathfileext:
         import tofu.geom as TFG
@@ -1256,6 +1943,12 @@ def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
         import tofu.inv as TFI
 
     Out = np.load(pathfileext,mmap_mode=None)
+    if any([kk[:len(_zchH)]==_zchH or kk==_zchS for kk in Out.keys()]):
+        Out = _NpzChunked(pathfileext, Out, mmap=mmap)
+    if 'Header' in Out.keys():
+        Out = _Col_open(pathfileext, Out, ind=ind, mmap=mmap)
+    else:
+        assert ind is None, "Arg ind can only be used for GDetect objects saved in columnar format !"
     Id = _Id_recreateFromdict(Out['Idsave'])
     if out=='Id':
         return Id
@@ -1277,7 +1970,7 @@ def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
         Ves = _tryloadVes(Id)
         LLOS, IdLOS = [], Id.LObj['LOS']
         for ii in range(0,len(IdLOS['Name'])):
-            Idl = _Id_recreateFromdict(Out['LIdLOS'][ii])
+            Idl = _Id_deriveFromdict(Id, Out['LIdLOS'][ii])
             ll = TFG.LOS(Idl, Du=(Out['LDs'][:,ii],Out['Lus'][:,ii]), Ves=Ves, Sino_RefPt=Out['Sino_RefPt'], arrayorder=str(Out['arrayorder']))
             LLOS.append(ll)
         obj = TFG.GLOS(Id, LLOS, Ves=Ves, Type=Id.Type, Exp=Id.Exp, Diag=Id.Diag, shot=Id.shot, Sino_RefPt=Out['Sino_RefPt'], SavePath=Id.SavePath, arrayorder=str(Out['arrayorder']), Clock=bool(Out['Clock']),
@@ -1300,6 +1993,8 @@ def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
             VesCalc = None
         LOSprops, Sino, Span, Cone, SAng, Opt = Out['LOSprops'][0], Out['Sino'][0], Out['Span'][0], Out['Cone'][0], Out['SAng'][0], Out['Optics'][0]
         (SynthDiag,Res) = (Out['SynthDiag'][0],Out['Res'][0]) if out=='full' else _get_light_SynthDiag_Res()
+        for dd in [Sino, Span, Cone, SAng, SynthDiag, Res]:
+            _restore_npyArrays(dd, pathfileext, Out, mmap=mmap)
         Optics = _tryLoadOpticsElseCreate(Id, Opt=Opt, Ves=Ves, Verb=Verb)
 
         Poly = Out['Poly'] if type(Optics) is list else dict(Rad=float(Out['Rad']),O=Out['BaryS'],nIn=Out['nIn'])
@@ -1307,7 +2002,7 @@ def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
                          arrayorder=str(Out['arrayorder']), Clock=bool(Out['Clock']))
         obj = _resetDetectAttr(obj, {'LOSprops':LOSprops, 'Sino':Sino, 'Span':Span, 'Cone':Cone, 'SAng':SAng, 'SynthDiag':SynthDiag, 'Res':Res, 'Optics':Opt})
         obj._LOS_NP = Out['LOSNP']
-        if obj._SynthDiag_Done and obj._SynthDiag_Points is None:
+        if obj._SynthDiag_Done and obj._SynthDiag_Points is None and obj._SynthDiag_Comp is None:
             obj.set_SigPrecomp()
 
     elif Id.Cls == 'GDetect':
@@ -1319,7 +2014,7 @@ def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
         else:
             LDetSynthRes = Out['LDetSynthRes']
         for ii in range(0,len(LDetsave)):
-            ddIdsave = _Id_recreateFromdict(LDetsave[ii]['Idsave'])
+            ddIdsave = _Id_deriveFromdict(Id, LDetsave[ii]['Idsave'])
             if 'VesCalc'in LDetsave[ii].keys() and LDetsave[ii]['VesCalc'][0]['SavePath'] is not None:
                 VesCalc = Open(LDetsave[ii]['VesCalc'][0]['SavePath']+LDetsave[ii]['VesCalc'][0]['SaveName']+'.npz')
             else:
@@ -1327,6 +2022,8 @@ def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
             LOSprops, Sino, Span, Cone, SAng, Opt = LDetsave[ii]['LOSprops'][0], LDetsave[ii]['Sino'][0], LDetsave[ii]['Span'][0], LDetsave[ii]['Cone'][0], LDetsave[ii]['SAng'][0], LDetsave[ii]['Optics'][0]
             if out=='full':
                 SynthDiag, Res = LDetSynthRes[ii]['SynthDiag'][0], LDetSynthRes[ii]['Res'][0]
+            for dd in [Sino, Span, Cone, SAng, SynthDiag, Res]:
+                _restore_npyArrays(dd, pathfileext, Out, mmap=mmap)
             Optics = _tryLoadOpticsElseCreate(ddIdsave, Opt=Opt, Ves=Ves, Verb=Verb)
             Poly = LDetsave[ii]['Poly'] if type(Optics) is list else dict(Rad=float(LDetsave[ii]['Rad']),O=LDetsave[ii]['BaryS'],nIn=LDetsave[ii]['nIn'])
             Sino_RefPt = None if Out['Sino_RefPt'].shape==() else Out['Sino_RefPt']
@@ -1334,14 +2031,25 @@ def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
                             arrayorder=str(Out['arrayorder']), Clock=bool(Out['Clock']))
             dd = _resetDetectAttr(dd, {'LOSprops':LOSprops, 'Sino':Sino, 'Span':Span, 'Cone':Cone, 'SAng':SAng, 'SynthDiag':SynthDiag, 'Res':Res, 'Optics':Opt})
             dd._LOS_NP = LDetsave[ii]['LOSNP']
-            if dd._SynthDiag_Done and dd._SynthDiag_Points is None:
+            if dd._SynthDiag_Done and dd._SynthDiag_Points is None and dd._SynthDiag_Comp is None:
                 dd.set_SigPrecomp()
             LDet.append(dd)
         obj = TFG.GDetect(Id, LDet, Type=Id.Type, Exp=Id.Exp, Diag=Id.Diag, shot=Id.shot, dtime=Id.dtime, dtimeIn=Id._dtimeIn, Sino_RefPt=Out['Sino_RefPt'], LOSRef=str(Out['LOSRef']),
                           arrayorder=str(Out['arrayorder']), Clock=bool(Out['Clock']), SavePath=Id.SavePath)
-        Res = Out['Res'][0] if out=='full' else Res
+        Res = _restore_npyArrays(Out['Res'][0], pathfileext, Out, mmap=mmap) if out=='full' else Res
         for kk in Res.keys():
             setattr(obj,kk,Res[kk])
+        if out=='full' and 'SynthDiagShared' in Out.keys() and Out['SynthDiagShared'][0] is not None:
+            import scipy.sparse as scpsp
+            Shared = _restore_npyArrays(Out['SynthDiagShared'][0], pathfileext, Out, mmap=mmap)
+            W = scpsp.csr_matrix((Shared['data'],Shared['indices'],Shared['indptr']), shape=Shared['shape'])
+            Points = Shared['Points']
+            if 'LDind' in Out.keys() and Out['LDind'] is not None:
+                # Only keep the rows of the loaded detectors and the points they see
+                W = W[Out['LDind'],:]
+                indP = np.unique(W.indices)
+                W, Points = W[:,indP], Points[:,indP]
+            obj._SynthDiag_Shared = {'Points':Points, 'W':W, 'dXYZ':Shared['dXYZ'], 'Colis':Shared['Colis']}
 
     elif Id.Cls=='Eq2D':
         Sep = [np.array(ss) for ss in Out['Sep'].tolist()]
@@ -1395,16 +2103,7 @@ def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
         LIdDet = Id.get_LObjasLId('Detect') if 'Detect' in Id.LObj.keys() else None
         Init, Update = Out['Init'][0], Out['Update'][0]
         obj = tft.PreData(Init['data'], Id=Id, t=Init['t'], Chans=Init['Chans'], DtRef=Init['DtRef'], LIdDet=LIdDet)
-        obj.set_Dt(Update['Dt'], Calc=False)
-        obj.set_Resamp(t=Update['Resamp_t'], f=Update['Resamp_f'], Method=Update['Resamp_Method'], interpkind=Update['Resamp_interpkind'], Calc=False)
-        obj.Out_add(indOut=Update['indOut'], Calc=False)
-        obj.Corr_add(indCorr=Update['indCorr'], Calc=False)
-        obj.interp(lt=Update['interp_lt'], lNames=Update['interp_lNames'], Calc=False)
-        obj.substract_Dt(tsub=Update['Subtract_tsub'], Calc=False)
-        obj.set_fft(Calc=True, **Update['FFTPar'])
-        if not Update['PhysNoiseParam'] is None:
-            Method = 'svd' if 'Modes' in Update['PhysNoiseParam'].keys() else 'fft'
-            obj.set_PhysNoise(**Update['PhysNoiseParam'].update({'Method':Method}))
+        _apply_Ldict2PreData(obj, Update)
 
 
         #Id.set_LObj(open_np_IdObj(['Detect'],[Out['LDetect']], [Out['LDetectUSR']]))
@@ -1444,3 +2143,70 @@ def _open_np(pathfileext, Ves=None, ReplacePath=None, out='full', Verb=False):
 
 
 
+
+###########################
+#   Caching
+###########################
+
+
+def _get_HashKey(*args):
+    """ Return a hexadecimal sha1 hash of the provided args (np.ndarrays, scalars, str, None and list, tuple or dict of those), used as key for cached files """
+    hh = hashlib.sha1()
+    _update_Hash(hh, args)
+    return hh.hexdigest()
+
+def _update_Hash(hh, aa):
+    if aa is None or type(aa) is str:
+        hh.update(repr(aa))
+    elif type(aa) in [list,tuple]:
+        hh.update('('+str(len(aa)))
+        for bb in aa:
+            _update_Hash(hh, bb)
+    elif type(aa) is dict:
+        for kk in sorted(aa.keys()):
+            hh.update(repr(kk))
+            _update_Hash(hh, aa[kk])
+    else:
+        aa = np.ascontiguousarray(aa)
+        hh.update(str(aa.dtype)+str(aa.shape))
+        hh.update(aa.tostring() if not aa.dtype==object else repr(aa.tolist()))
+
+
+def _Cache_load(Key, Path):
+    """ Return the dict of attributes stored under Key in cache directory Path (None if not found), and mark it as recently used """
+    pathfileext = os.path.join(Path, Key+'.npz')
+    if not os.path.isfile(pathfileext):
+        return None
+    try:
+        Out = np.load(pathfileext)
+        Attr = Out['Attr'][0]
+        Out.close()
+    except Exception:
+        warnings.warn("Cached file "+pathfileext+" could not be loaded !")
+        return None
+    os.utime(pathfileext, None)
+    return Attr
+
+
+def _Cache_save(Key, Stage, Attr, Path, MaxSize=None):
+    """ Store the dict of attributes Attr under Key in cache directory Path, using the same layout as _save_np(), and remove the least recently used files beyond MaxSize (bytes) """
+    if not os.path.isdir(Path):
+        os.makedirs(Path)
+    pathfileext = os.path.join(Path, Key+'.npz')
+    with open(pathfileext+'.tmp', 'wb') as ff:
+        np.savez(ff, Key=Key, Stage=Stage, Attr=[Attr])
+    os.rename(pathfileext+'.tmp', pathfileext)
+    if not MaxSize is None:
+        _Cache_clean(Path, MaxSize)
+
+
+def _Cache_clean(Path, MaxSize):
+    """ Remove the least recently used files of cache directory Path until its total size is below MaxSize (bytes) """
+    LF = [os.path.join(Path,ff) for ff in os.listdir(Path) if ff[-4:]=='.npz']
+    LF = sorted([(os.path.getmtime(ff), os.path.getsize(ff), ff) for ff in LF])
+    Size = sum([ff[1] for ff in LF])
+    ii = 0
+    while Size>MaxSize and ii<len(LF)-1:
+        os.remove(LF[ii][2])
+        Size -= LF[ii][1]
+        ii += 1
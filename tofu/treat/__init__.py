@@ -11,6 +11,6 @@ from ._core import *
 del _core
 
 __author__ = "Didier Vezinet"
-__all__ = ["PreData"]
+__all__ = ["PreData","PreDataStream","PreData_Batch"]
 
 
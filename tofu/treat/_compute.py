@@ -8,13 +8,17 @@ Created on Thu Sep 11 18:12:05 2014
 # Module used for data treatment
 
 
+import warnings
 import numpy as np
 import scipy.interpolate as scpinterp
+import scipy.signal as scpsig
 import matplotlib.pyplot as plt
 import itertools as itt
+import hashlib
 
 
 # ToFu-specific
+import tofu.defaults as tfd
 import tofu.pathfile as tfpf
 
 
@@ -58,9 +62,12 @@ def _PreData_set_data(data, t=None, Chans=None, DtRef=None, LIdDet=None):
         ind = [LIdN.index(Chans[ii]) for ii in range(0,len(Chans))]
         LIdDet = [LIdDet[ii] for ii in ind]
     else:
-        LIdDet = [tfpf.ID('Detect',Chans[ii],Exp='Misc',Diag='Misc',shot=0) for ii in range(0,data.shape[1])]
+        Id0 = tfpf.ID('Detect',Chans[0],Exp='Misc',Diag='Misc',shot=0)
+        LIdDet = [Id0]+[Id0.derive(Chans[ii]) for ii in range(1,data.shape[1])]
 
-    dataRef, tRef, ChanRef, NChanRef, LIdDetRef = np.copy(data), np.copy(t), list(Chans), len(Chans), list(LIdDet)
+    # A np.memmap is not copied (out-of-core data, only read by chunks)
+    dataRef = data if isinstance(data,np.memmap) else np.copy(data)
+    tRef, ChanRef, NChanRef, LIdDetRef = np.copy(t), list(Chans), len(Chans), list(LIdDet)
     data2, t2, Chans2, NChans, LIdDet2 = None, None, None, None, None
 
     if DtRef is None:
@@ -101,6 +108,22 @@ def _PreData_interp(lt=[], lNames=[]):
     return ltU, lN, UNames
 
 
+def _PreData_doAll_Key(*args):
+    """ Return a key identifying a stage of PreData._doAll() from its parameters (np.ndarray by their content, also inside dict, list and tuple) and the key of the previous stage """
+    return hashlib.md5('|'.join([_PreData_doAll_KeyStr(aa) for aa in args])).hexdigest()
+
+
+def _PreData_doAll_KeyStr(aa):
+    # repr() abbreviates the np.ndarray of more than 1000 elements, so they are represented by their dtype, shape and bytes
+    if isinstance(aa,np.ndarray):
+        return _PreData_doAll_KeyStr(aa.tolist()) if aa.dtype.hasobject else aa.dtype.str+str(aa.shape)+aa.tostring()
+    elif type(aa) is dict:
+        return '{'+','.join([repr(kk)+':'+_PreData_doAll_KeyStr(aa[kk]) for kk in sorted(aa.keys())])+'}'
+    elif type(aa) in [list,tuple]:
+        return ('[{0}]' if type(aa) is list else '({0})').format(','.join([_PreData_doAll_KeyStr(vv) for vv in aa]))
+    return repr(aa)
+
+
 def _PreData_doAll_interp(data, t, lt, lNames, UNames, inds):
     Indt = np.asarray([np.argmin(np.abs(t-tt)) for tt in lt])
 
@@ -126,16 +149,31 @@ def _PreData_doAll_interp(data, t, lt, lNames, UNames, inds):
 
 
 
-def _PreData_doAll_Resamp(DtRef, tRef, data, Resamp_t, Resamp_f, Resamp_Method, Resamp_interpkind):
-    """ Compute the data time re-sampling """
-
-    # Compute the new time vector (t being the priority)
+def _PreData_Resamp_t(DtRef, tRef, Resamp_t, Resamp_f):
+    """ Compute the new time vector (t being the priority) """
     if not Resamp_t is None:
         assert Resamp_t.ndim==1 and np.all(Resamp_t==np.unique(Resamp_t)) and Resamp_t[0]>=tRef[0] and Resamp_t[-1]<=tRef[-1], "The time vector chosen for re-sampling is not fit !"
         t = Resamp_t
     elif not Resamp_f is None:
         assert 1./Resamp_f < (tRef[-1]-tRef[0])/2., "The chosen frequency is not fit !"
         t = np.linspace(DtRef[0],DtRef[-1], np.ceil((DtRef[-1]-DtRef[0])*Resamp_f))
+    return t
+
+
+def _PreData_doAll_Resamp(DtRef, tRef, data, Resamp_t, Resamp_f, Resamp_Method, Resamp_interpkind):
+    """ Compute the data time re-sampling """
+
+    if Resamp_Method=='polyphase':
+        D = _PreData_Resamp_D(tRef, Resamp_f)
+        NC = max(D,tfd.PreDataChunk//max(1,data.shape[1]))
+        State, ld, lt = None, [], []
+        for i0 in range(0,tRef.size,NC):
+            dd, tt, State = _PreData_Resamp_Polyphase(data[i0:i0+NC,:], tRef[i0:i0+NC], D, State=State, Last=i0+NC>=tRef.size)
+            ld.append(dd)
+            lt.append(tt)
+        return np.concatenate(ld,axis=0), np.concatenate(lt)
+
+    t = _PreData_Resamp_t(DtRef, tRef, Resamp_t, Resamp_f)
 
     # Compute data
     if Resamp_Method=='movavrg':
@@ -146,59 +184,337 @@ def _PreData_doAll_Resamp(DtRef, tRef, data, Resamp_t, Resamp_f, Resamp_Method,
     return data, t
 
 
-def _PreData_doAll_Subtract(data, t, tsub):
+def _PreData_Subtract_Ref(data, t, tsub):
+    """ Return the reference signal (at time tsub or averaged over time interval tsub) to be subtracted """
     if hasattr(tsub,'__iter__'):
-        indt = (t>=tsub[0]) & (t<=tsub[-1])
+        indt = slice(np.searchsorted(t,tsub[0],side='left'), np.searchsorted(t,tsub[-1],side='right'))
         datasub = np.mean(data[indt,:],axis=0)
     else:
         indt = np.nanargmin(np.abs(t-tsub))
-        datasub = data[indt,:]
+        datasub = np.array(data[indt,:])
+    return datasub
+
+
+def _PreData_doAll_Subtract(data, t, tsub):
+    datasub = _PreData_Subtract_Ref(data, t, tsub)
     return data - np.tile(datasub,(t.size,1))
 
 
 
-def _PreData_doAll_FFT(data, t, FFTPar):
+def _PreData_doAll_FFT(data, t, FFTPar, Spect=None):
+    """ Return the filtered part of FourierExtract() only, from the spectrum Spect of data if provided """
     if not FFTPar['DF'] is None or not FFTPar['DFEx'] is None:
-        data = FourierExtract(t, data, **FFTPar)[0]
+        A = np.fft.rfft(data, axis=0) if Spect is None else Spect
+        Mask = _Fourier_Mask(_Fourier_Freq(t.size, np.mean(np.diff(t))), **FFTPar)
+        data = np.fft.irfft(A*Mask[:,np.newaxis], t.size, axis=0)
     return data
 
 
+def _PreData_doAll_ModeSmooth(data, t, ModeSmooth):
+    Freq = ModeSmooth['Freq']
+    if type(Freq) is tuple:
+        Freq = np.interp(t, Freq[0], Freq[1])
+    return ModeSmoothing(t, data, Freq, N=ModeSmooth['N'])
+
+
+
+def _Interp_Linear(t, data, tnew):
+    """ Linear interpolation of (Nt,NCh) data from increasing t to tnew (in [t[0],t[-1]]), for all channels at once """
+    ind = np.clip(np.searchsorted(t, tnew), 1, t.size-1)
+    w = ((tnew-t[ind-1])/(t[ind]-t[ind-1]))[:,np.newaxis]
+    return data[ind-1,:]*(1.-w) + data[ind,:]*w
+
+
+def _PreData_Resamp_Stream(data, t, tRes, NP=None, State=None, Last=False):
+    """ Re-sample a chunk of data (Nt,NCh) of time vector t (following the previous chunk) by moving average (over NP points, if provided) and linear interpolation
+
+    The new time vector tRes is either a np.ndarray or a frequency (of a regular time vector starting at the first time point).
+    State keeps track of the moving average and of the last point of the previous chunk, such that all chunks are interpolated as if processed at once
+
+    Returns
+    -------
+    data :      np.ndarray
+        (N,NCh) array, the re-sampled data at the new time points available so far
+    t :         np.ndarray
+        (N,) array, the new time points
+    State :     dict
+        The state to be fed to the next call
+
+    """
+    if State is None:
+        State = {'MovAv':None, 'tq':t[:0], 'tp':None, 'dp':None, 'jj':0, 't0':t[0]}
+    if not NP is None:
+        data, State['MovAv'] = MovAverage_Stream(data, NP, State=State['MovAv'], Last=Last, Test=False)
+        # The moving average is delayed, keep the times of the samples not returned yet
+        tq = np.concatenate((State['tq'],t))
+        t, State['tq'] = tq[:data.shape[0]], tq[data.shape[0]:]
+    # Interpolate from the last point of the previous chunk
+    if not State['tp'] is None:
+        data, t = np.concatenate((State['dp'],data),axis=0), np.concatenate((State['tp'],t))
+    jj = State['jj']
+    if t.size>=2:
+        if isinstance(tRes,np.ndarray):
+            k1 = np.searchsorted(tRes, t[-1], side='right')
+            tn = tRes[jj:k1]
+        else:
+            k1 = int(np.floor((t[-1]-State['t0'])*tRes*(1.+1.e-12)))+1
+            tn = State['t0'] + np.arange(jj,k1)/float(tRes)
+        dn, State['jj'] = _Interp_Linear(t, data, tn), k1
+    else:
+        tn, dn = t[:0], data[:0,:]
+    if t.size>0:
+        State['tp'], State['dp'] = t[-1:], data[-1:,:]
+    return dn, tn, State
+
+
+def _PreData_Resamp_D(t, f):
+    """ Return the (integer) decimation factor of the 'polyphase' re-sampling of time vector t at frequency f """
+    assert not f is None, "The 'polyphase' re-sampling requires a frequency f !"
+    D = int(round(1./(np.mean(np.diff(t))*f)))
+    assert D>=1, "The chosen frequency is not fit !"
+    return D
+
+
+def _PreData_Resamp_Polyphase(data, t, D, NTaps=tfd.PreDataPolyphaseNTaps, State=None, Last=False):
+    """ Decimate a chunk of data (Nt,NCh) of time vector t (following the previous chunk) by a factor D, with an anti-aliasing FIR filter applied by polyphase decomposition
+
+    The FIR filter (window method, cut-off at the new Nyquist frequency) is centered (no delay) and has 2*NTaps*D+1 coefficients, the data being extended by its first and last values at both ends.
+    Only the output samples (the input samples of index multiple of D) are computed (see scipy.signal.upfirdn()), for all channels at once.
+    State keeps the input samples required by the next outputs, such that all chunks are decimated as if processed at once
+
+    Returns
+    -------
+    data :      np.ndarray
+        (N,NCh) array, the decimated data available so far
+    t :         np.ndarray
+        (N,) array, the corresponding time points
+    State :     dict
+        The state to be fed to the next call
+
+    """
+    M = NTaps*D
+    if State is None:
+        h = scpsig.firwin(2*M+1, 1./D, window='hamming') if D>1 else np.ones((1,))
+        State = {'h':h, 'M':M, 'Buf':np.repeat(data[:1,:],M,axis=0), 'b0':0, 'tBuf':t[:0], 'tb0':0, 'k0':0}
+        if D==1:
+            State['M'], State['Buf'] = 0, data[:0,:]
+    h, M = State['h'], State['M']
+    X = np.concatenate((State['Buf'],data),axis=0)
+    tX = np.concatenate((State['tBuf'],t))
+    if Last and X.shape[0]>0:
+        X = np.concatenate((X,np.repeat(X[-1:,:],M,axis=0)),axis=0)
+    # Outputs k require the (extended) input samples k*D to k*D+2*M
+    b0, k0 = State['b0'], State['k0']
+    k1 = max(k0,(b0+X.shape[0]-1-2*M)//D+1)
+    if k1>k0:
+        X0 = X[k0*D-b0:(k1-1)*D+2*M+1-b0,:]
+        dn = scpsig.upfirdn(h, X0, 1, D, axis=0)[2*M//D:2*M//D+k1-k0,:]
+        tn = tX[k0*D-State['tb0']:(k1-1)*D+1-State['tb0']:D]
+    else:
+        dn, tn = X[:0,:], t[:0]
+    State['Buf'], State['b0'] = X[k1*D-b0:,:], k1*D
+    State['tBuf'], State['tb0'], State['k0'] = tX[k1*D-State['tb0']:], k1*D, k1
+    return dn, tn, State
+
+
+def _PreData_doAll_Chunked(dataRef, tRef, indOut, DtRef, interp=None, Resamp=None, tsub=None, FFTPar=None, ModeSmooth=None, Out=None, Chunk=tfd.PreDataChunk, NFIR=None):
+    """ Out-of-core equivalent of the steps of PreData._doAll(), for reference data too large to be held in memory (e.g.: a np.memmap)
+
+    The selection of channels, the interpolation of (isolated) corrupted time points and the re-sampling (linear interpolation only) are done by chunks of time, reading dataRef one chunk at a time.
+    The result is written to Out, then the subtraction is done in place by chunks of time, and the fft filtering and mode smoothing by blocks of channels (as they require the whole time trace).
+
+    Parameters
+    ----------
+    dataRef :   np.ndarray
+        (Nt,NChRef) array (typically np.memmap) of the reference data
+    tRef :      np.ndarray
+        (Nt,) reference time vector
+    indOut :    np.ndarray
+        (NChRef,) bool array, True for the channels to be excluded
+    DtRef :     list
+        Time interval of the reference data
+    interp :    None / tuple
+        If provided, (lt, lNames, UNames, inds) the time points and channels to be interpolated (see :meth:`~tofu.treat.PreData.interp()`)
+    Resamp :    None / tuple
+        If provided, (Resamp_t, Resamp_f, Resamp_Method, Resamp_interpkind) the re-sampling parameters (see :meth:`~tofu.treat.PreData.set_Resamp()`)
+    tsub :      None / float / list
+        If provided, the time or time interval of the signal to be subtracted (see :meth:`~tofu.treat.PreData.substract_Dt()`)
+    FFTPar :    None / dict
+        If provided, the parameters of the fft filtering (see :meth:`~tofu.treat.PreData.set_fft()`)
+    ModeSmooth :    None / dict
+        If provided, the parameters of the mode smoothing (see :meth:`~tofu.treat.PreData.set_ModeSmoothing()`)
+    Out :       None / str
+        If provided, the path of the .npy file to which the result is written (returned as a np.memmap), else the result is returned as a np.ndarray
+    Chunk :     int
+        Max number of elements processed at once
+    NFIR :      None / int
+        If provided, the fft filtering is approximated by a centered FIR filter of NFIR (odd) coefficients (see :meth:`~tofu.treat._compute._Fourier_FIR()`), applied by chunks of time (bounded memory whatever the signal length)
+
+    Returns
+    -------
+    data :      np.ndarray
+        (Nt2,NCh) array (or np.memmap) of the treated data
+    t :         np.ndarray
+        (Nt2,) time vector
+
+    """
+    Nt = tRef.size
+    indCh = (~indOut).nonzero()[0]
+    NCh = indCh.size
+    if Resamp is None:
+        t = tRef
+    else:
+        Resamp_t, Resamp_f, Resamp_Method, Resamp_interpkind = Resamp
+        assert Resamp_interpkind=='linear', "Only linear interpolation is available for re-sampling out-of-core data !"
+        if Resamp_Method=='polyphase':
+            D = _PreData_Resamp_D(tRef, Resamp_f)
+            t = tRef[::D]
+        else:
+            t = _PreData_Resamp_t(DtRef, tRef, Resamp_t, Resamp_f)
+        NP = int(round(1./(np.mean(np.diff(tRef))*Resamp_f))) if Resamp_Method=='movavrg' else None
+    if not interp is None:
+        lt, lNames, UNames, inds = interp
+        Indt = np.asarray([np.argmin(np.abs(tRef-tt)) for tt in lt])
+    data = np.empty((t.size,NCh)) if Out is None else np.lib.format.open_memmap(Out, mode='w+', dtype=float, shape=(t.size,NCh))
+
+    # Selection, interpolation and re-sampling by chunks of time
+    NC = max(2,Chunk//max(1,NCh))
+    State = None
+    for i0 in range(0,Nt,NC):
+        i1 = min(i0+NC,Nt)
+        # One more time point on each side for interpolating the corrupted points
+        j0, j1 = max(i0-1,0), min(i1+1,Nt)
+        dd = np.asarray(dataRef[j0:j1][:,indCh], dtype=float)
+        if not interp is None:
+            ind = ((Indt>=i0) & (Indt<i1)).nonzero()[0]
+            if ind.size>0:
+                dd = _PreData_doAll_interp(dd, tRef[j0:j1], [lt[ii] for ii in ind], [lNames[ii] for ii in ind], UNames, inds)
+        dd, tt = dd[i0-j0:i1-j0,:], tRef[i0:i1]
+        if Resamp is None:
+            data[i0:i1,:] = dd
+            continue
+        if Resamp_Method=='polyphase':
+            jj = 0 if State is None else State['k0']
+            dd, tt, State = _PreData_Resamp_Polyphase(dd, tt, D, State=State, Last=i1==Nt)
+        else:
+            jj = 0 if State is None else State['jj']
+            dd, tt, State = _PreData_Resamp_Stream(dd, tt, t, NP=NP, State=State, Last=i1==Nt)
+        data[jj:jj+tt.size,:] = dd
+
+    # Subtraction in place by chunks of time
+    if not tsub is None:
+        datasub = _PreData_Subtract_Ref(data, t, tsub)
+        for i0 in range(0,t.size,NC):
+            data[i0:i0+NC,:] -= datasub
+
+    # Fft filtering by blocks of channels, or by chunks of time with a FIR filter
+    if not FFTPar is None and (not FFTPar['DF'] is None or not FFTPar['DFEx'] is None) and not NFIR is None:
+        _Fourier_FIR_Blocks(data, _Fourier_FIR(np.mean(np.diff(t)), NFIR, **FFTPar), Chunk=Chunk)
+    elif not FFTPar is None and (not FFTPar['DF'] is None or not FFTPar['DFEx'] is None):
+        NB = max(1,Chunk//t.size)
+        for i0 in range(0,NCh,NB):
+            data[:,i0:i0+NB] = FourierExtract(t, np.asarray(data[:,i0:i0+NB]), **FFTPar)[0]
+
+    # Mode smoothing by blocks of channels
+    if not ModeSmooth is None:
+        NB = max(1,Chunk//(t.size*ModeSmooth['N']))
+        for i0 in range(0,NCh,NB):
+            data[:,i0:i0+NB] = _PreData_doAll_ModeSmooth(np.asarray(data[:,i0:i0+NB]), t, ModeSmooth)
+    if not Out is None:
+        data.flush()
+    return data, t
+
+
+def _PreData_NoiseBins(Phys, Noise, Nbin):
+    """ Return the binned statistics of the noise vs the physical signal, for all channels at once
+
+    For each channel, the range of the physical signal is divided in Nbin bins of equal width, and the std of the noise is computed in each bin (via np.bincount)
+
+    Returns
+    -------
+    Cents :     np.ndarray
+        (Nbin,NChans) array of the bin centers
+    Std :       np.ndarray
+        (Nbin,NChans) array of the std of the noise in each bin (nan if empty)
+    Count :     np.ndarray
+        (Nbin,NChans) array of the number of points in each bin
+
+    """
+    Nt, NChans = Phys.shape
+    Min, Max = np.min(Phys,axis=0), np.max(Phys,axis=0)
+    Width = (Max-Min)/Nbin
+    Width[Width==0.] = 1.
+    Cents = Min + (np.arange(0,Nbin)[:,np.newaxis]+0.5)*Width
+    # Flat index (channel, bin) of each point, the max being included in the last bin
+    ind = np.clip(((Phys-Min)/Width).astype(int), 0, Nbin-1) + Nbin*np.arange(0,NChans)
+    ind = ind.ravel()
+    Count = np.bincount(ind, minlength=Nbin*NChans).astype(float)
+    Mean = np.bincount(ind, weights=Noise.ravel(), minlength=Nbin*NChans)/np.maximum(Count,1.)
+    Var = np.bincount(ind, weights=(Noise.ravel()-Mean[ind])**2, minlength=Nbin*NChans)/np.maximum(Count,1.)
+    Std = np.where(Count>0, np.sqrt(Var), np.nan)
+    return Cents, Std.reshape((NChans,Nbin)).T, Count.reshape((NChans,Nbin)).T
+
+
+def _PolyFit_Batch(X, Y, Deg, W=None):
+    """ Least-square polynomial fits of degree Deg of the columns of Y (N,NFit) vs those of X (N,NFit), all at once, with optional weights W (N,NFit)
+
+    Returns the (Deg+1,NFit) coefficients, highest power first (as np.polyfit)
+    The rank-deficient fits (e.g.: constant or zero X) are solved in the least-square sense, with a np.RankWarning (as np.polyfit)
+    """
+    W = np.ones(Y.shape) if W is None else W
+    Y = np.where(W>0, Y, 0.)
+    V = X.T[:,:,np.newaxis]**np.arange(Deg,-1,-1)            # (NFit,N,Deg+1) Vandermonde matrices
+    V = V*np.sqrt(W).T[:,:,np.newaxis]
+    # Scale the columns for conditioning (as np.polyfit)
+    Scale = np.sqrt(np.sum(V**2,axis=1))
+    Scale[Scale==0.] = 1.
+    V = V/Scale[:,np.newaxis,:]
+    A = np.einsum('kij,kil->kjl', V, V)
+    B = np.einsum('kij,ik->kj', V, Y*np.sqrt(W))
+    try:
+        C = np.linalg.solve(A, B[:,:,np.newaxis])[:,:,0]
+    except np.linalg.LinAlgError:
+        # At least one singular fit => solve them one by one, falling back to lstsq for the singular ones
+        C = np.zeros(B.shape)
+        for kk in range(0,B.shape[0]):
+            try:
+                C[kk,:] = np.linalg.solve(A[kk,:,:], B[kk,:])
+            except np.linalg.LinAlgError:
+                C[kk,:] = np.linalg.lstsq(V[kk,:,:], Y[:,kk]*np.sqrt(W[:,kk]))[0]
+                warnings.warn("Polyfit may be poorly conditioned (fit "+str(kk)+")", np.RankWarning)
+    return (C/Scale).T
+
 
 def _PreData_set_NoiseModel(PhysNoise, Chans, NChans, Nt, Deg, Nbin, LimRatio, Plot=False):
     assert not PhysNoise is None, "PhysNoise must be estimated first (use self.set_PhysNoise() method) !"
-    NoiseCoefs = np.zeros((Deg+1,NChans))
-    Err = np.zeros((Nbin,))
-    if Plot:
-        f = plt.figure(facecolor='w',figsize=(10,8))
-        ax = f.add_axes([0.05, 0.05, 0.85, 0.85],frameon=True,axisbg='w')
     if Deg>=1:
-        Noise = np.zeros((Nt,NChans))
-        for ii in range(0,NChans):
-            bins =  np.linspace(PhysNoise['Phys'][:,ii].min(),PhysNoise['Phys'][:,ii].max(),Nbin+1)
-            inds = np.digitize(PhysNoise['Phys'][:,ii], bins)-1
-            for jj in range(0,Nbin):
-                Err[jj] = np.std(PhysNoise['Noise'][inds==jj,ii])
-            NoiseCoefs[:,ii] = np.polyfit(0.5*(bins[1:]+bins[:-1]), Err, Deg)
-            if Plot:
-                ax.plot(0.5*(bins[1:]+bins[:-1]), Err, label=Chans[ii])
-            Noise[:,ii] = np.polyval(NoiseCoefs,PhysNoise['Phys'][:,ii])
-            if not LimRatio is None:
-                Lim1 = LimRatio*np.mean(Noise[:,ii])
-                Lim2 = np.exp(np.mean(np.log(Noise[:,ii]))-2.*np.std(np.log(Noise[:,ii])))
-                Lim3 = np.sort(Noise[:,ii])[1]
-                Lim = max([Lim1,Lim2,Lim3])
-                Noise[Noise[:,ii]<Lim,ii] = Lim
+        assert Nbin>Deg, "Arg Nbin must be larger than Deg !"
+        # The binned statistics do not depend on Deg nor LimRatio, they are cached
+        if not Nbin in PhysNoise['Bins'].keys():
+            PhysNoise['Bins'][Nbin] = _PreData_NoiseBins(PhysNoise['Phys'], PhysNoise['Noise'], Nbin)
+        Cents, Err, Count = PhysNoise['Bins'][Nbin]
+        NoiseCoefs = _PolyFit_Batch(Cents, Err, Deg, W=(Count>0).astype(float))
+        if Plot:
+            f = plt.figure(facecolor='w',figsize=(10,8))
+            ax = f.add_axes([0.05, 0.05, 0.85, 0.85],frameon=True,axisbg='w')
+            ll = ax.plot(Cents, Err)
+            for ii in range(0,NChans):
+                ll[ii].set_label(Chans[ii])
+        # Horner scheme for all channels at once
+        Noise = NoiseCoefs[0,:]*np.ones((Nt,NChans))
+        for ii in range(1,Deg+1):
+            Noise = Noise*PhysNoise['Phys'] + NoiseCoefs[ii,:]
     else:
-        Nbin, NoiseCoefs = 1, NoiseCoefs.flatten()
-        for ii in range(0,NChans):
-            NoiseCoefs[ii] = np.std(PhysNoise['Noise'][:,ii])
+        Nbin = 1
+        NoiseCoefs = np.std(PhysNoise['Noise'],axis=0)
         Noise = np.copy(NoiseCoefs)
-        if not LimRatio is None:
-            Lim1 = LimRatio*np.mean(Noise)
-            Lim2 = np.exp(np.mean(np.log(Noise))-2.*np.std(np.log(Noise)))
-            Lim3 = np.sort(Noise)[1]
-            Lim = max([Lim1,Lim2,Lim3])
-            Noise[Noise<Lim] = Lim
+    if not LimRatio is None:
+        Lim1 = LimRatio*np.mean(Noise,axis=0)
+        LogN = np.log(Noise)
+        Lim2 = np.exp(np.mean(LogN,axis=0)-2.*np.std(LogN,axis=0))
+        Lim3 = np.partition(Noise,1,axis=0)[1]
+        Lim = np.fmax(np.fmax(Lim1,Lim2),Lim3)
+        Noise = np.maximum(Noise,Lim)
 
     NoiseModel = {'Deg':Deg, 'Nbin':Nbin, 'LimRatio':LimRatio}
     return NoiseModel, Noise, NoiseCoefs
@@ -216,9 +532,144 @@ def _PreData_set_NoiseModel(PhysNoise, Chans, NChans, Nt, Deg, Nbin, LimRatio, P
 
 
 
+# --------- Level of detail (plotting) ---------------
+
+def MinMaxPyramid(data, Base=tfd.LODBase, Test=True):
+    """ Return the min/max envelope pyramid of (Nt,NCh) data, used to plot long signals at the resolution of the screen (level of detail)
+
+    Level 0 is the data itself, and each level k>0 gives the min, max and mean over consecutive blocks of Base**k time points (the last one possibly incomplete), computed from level k-1, until a single block remains.
+
+    Parameters
+    ----------
+    data :      np.ndarray
+        (Nt,) or (Nt,NCh) array
+    Base :      int
+        Decimation factor between two consecutive levels
+
+    Returns
+    -------
+    Pyr :       list
+        List of dict, one per level, with keys 'Step' (int, number of time points per block), 'ind' (the index of the first time point of each block), 'Min', 'Max' and 'Mean' ((NBlock,NCh) arrays)
+
+    """
+    if Test:
+        assert isinstance(data,np.ndarray) and data.ndim in [1,2], "Arg data must be a (Nt,) or (Nt,NCh) np.ndarray !"
+        assert type(Base) is int and Base>=2, "Arg Base must be an int >= 2 !"
+    Nt = data.shape[0]
+    data = data.reshape((Nt,-1))
+    Pyr = [{'Step':1, 'ind':np.arange(0,Nt), 'Min':data, 'Max':data, 'Mean':data}]
+    while Pyr[-1]['ind'].size>1:
+        LL = Pyr[-1]
+        ind = LL['ind'][::Base]
+        N0, N1 = np.diff(np.append(LL['ind'],Nt)).astype(float), np.diff(np.append(ind,Nt)).astype(float)
+        Pyr.append({'Step':LL['Step']*Base, 'ind':ind, 'Min':_BlockReduce(LL['Min'],Base,np.min), 'Max':_BlockReduce(LL['Max'],Base,np.max),
+                    'Mean':_BlockReduce(LL['Mean']*N0[:,np.newaxis],Base,np.sum)/N1[:,np.newaxis]})
+    return Pyr
+
+
+def _BlockReduce(data, Base, func):
+    """ Apply func (e.g.: np.min) over consecutive blocks of Base rows of (N,NCh) data (the last one possibly incomplete), the complete blocks being reduced at once through a reshape """
+    N, NCh = data.shape
+    NB = N//Base
+    out = func(data[:NB*Base,:].reshape((NB,Base,NCh)),axis=1)
+    if NB*Base<N:
+        out = np.append(out, func(data[NB*Base:,:],axis=0)[np.newaxis,:], axis=0)
+    return out
+
+
+def _LOD_Get(Pyr, t, tlim, NPix):
+    """ Return the coarsest level of Pyr (see :meth:`~tofu.treat._compute.MinMaxPyramid()`) with at least NPix blocks in the time interval tlim, as (Step, tb, Min, Max, Mean) of the blocks in tlim, tb being the (NBlock+1,) time edges of the blocks """
+    i0, i1 = np.searchsorted(t, tlim[0], side='left'), np.searchsorted(t, tlim[1], side='right')
+    NPix = max(1,int(NPix))
+    kk = 0
+    while kk<len(Pyr)-1 and (i1-i0)//Pyr[kk+1]['Step']>=NPix:
+        kk += 1
+    LL = Pyr[kk]
+    # One more block on each side, for the lines to reach the edges of the axes
+    j0, j1 = max(0,i0//LL['Step']-1), min(LL['ind'].size,-(-i1//LL['Step'])+1)
+    ind, Min, Max, Mean = LL['ind'][j0:j1], LL['Min'][j0:j1,:], LL['Max'][j0:j1,:], LL['Mean'][j0:j1,:]
+    iEnd = min(ind[-1]+LL['Step'],t.size-1)
+    # Merge the blocks (at most Base per pixel) to get about NPix blocks
+    NR = -(-ind.size//NPix)
+    if NR>1:
+        ii = np.arange(0,ind.size,NR)
+        N0 = np.diff(np.append(ind,min(ind[-1]+LL['Step'],t.size))).astype(float)
+        Min, Max = np.minimum.reduceat(Min,ii,axis=0), np.maximum.reduceat(Max,ii,axis=0)
+        Mean = np.add.reduceat(Mean*N0[:,np.newaxis],ii,axis=0)/np.add.reduceat(N0,ii)[:,np.newaxis]
+        ind = ind[ii]
+    return LL['Step']*NR, t[np.append(ind,iEnd)], Min, Max, Mean
+
+
+
 # --------- Moving average ---------------------------
 
-def MovAverage(data, time, MovMeanfreq, tResamp=False, interpkind='linear', Mode=None, Test=True):
+def MovAverage_Stream(data, NP, State=None, Kahan=False, Last=False, Test=True):
+    """ Return the moving average (over NP points, centered, zero-padded as np.convolve(mode='same')) of a chunk of a long signal, and the state to be used for the next chunk
+
+    The average is computed in O(Nt) for all channels at once, from the difference of the running sum of the signal.
+    The state carries the end of the running sum from chunk to chunk, such that processing a signal in several chunks gives exactly the same result as processing it at once.
+    The returned chunk is delayed by (NP-1)/2 samples with respect to the input chunk, the remaining samples being returned when Last=True.
+
+    Parameters
+    ----------
+    data :      np.ndarray
+        (Nt,) or (Nt,NCh) array, the chunk of signal(s)
+    NP :        int
+        Number of points of the moving average window
+    State :     None / dict
+        The state returned by the previous call, None for the first chunk
+    Kahan :     bool
+        Flag, if True the rounding errors of the running sum are compensated (Kahan-like, more accurate for long signals, ignored if State is provided)
+    Last :      bool
+        Flag, if True the chunk is the last one and the end of the signal is returned
+    Test :      bool
+        If True tests all the input arguments for any mistake
+
+    Returns
+    -------
+    data :      np.ndarray
+        (N,) or (N,NCh) array, the moving average of the samples available so far
+    State :     dict
+        The state to be fed to the next call
+
+    """
+    if Test:
+        assert isinstance(data,np.ndarray) and data.ndim in [1,2], "Arg data must be a (Nt,) or (Nt,NCh) np.ndarray !"
+        assert type(NP) is int and NP>0, "Arg NP must be a strictly positive int !"
+        assert State is None or (type(State) is dict and State['NP']==NP), "Arg State must be a dict returned by a previous call with the same NP !"
+        assert type(Kahan) is bool and type(Last) is bool, "Args Kahan and Last must be bool !"
+    NDim = data.ndim
+    if NDim==1:
+        data = data.reshape((data.size,1))
+    if State is None:
+        State = {'NP':NP, 'Kahan':Kahan, 'Skip':(NP-1)//2, 'CTail':np.zeros((NP,data.shape[1])), 'ETail':np.zeros((NP,data.shape[1])) if Kahan else None}
+    if Last:
+        data = np.concatenate((data,np.zeros(((NP-1)//2,data.shape[1]))),axis=0)
+
+    # Running sum continued from the previous chunk (sequential, hence independent of the chunking)
+    CC = np.cumsum(np.concatenate((State['CTail'][-1:],data),axis=0),axis=0)
+    CC = np.concatenate((State['CTail'],CC[1:]),axis=0)
+    S = CC[NP:]-CC[:-NP]
+    if State['Kahan']:
+        # Exact rounding error of each addition (TwoSum), accumulated separately
+        C0, C1 = CC[NP-1:-1], CC[NP:]
+        bb = C1-C0
+        EE = np.cumsum(np.concatenate((State['ETail'][-1:],(C0-(C1-bb))+(data-bb)),axis=0),axis=0)
+        EE = np.concatenate((State['ETail'],EE[1:]),axis=0)
+        S = S + (EE[NP:]-EE[:-NP])
+        State['ETail'] = EE[-NP:]
+    State['CTail'] = CC[-NP:]
+
+    # Skip the first samples, whose window center is before the beginning of the signal
+    Skip = min(State['Skip'],S.shape[0])
+    State['Skip'] = State['Skip']-Skip
+    S = S[Skip:]/float(NP)
+    if NDim==1:
+        S = S[:,0]
+    return S, State
+
+
+def MovAverage(data, time, MovMeanfreq, tResamp=False, interpkind='linear', Mode=None, Kahan=False, Test=True):
     if Test:
         assert isinstance(time,np.ndarray) and time.ndim==1, "Arg time must be a (N,) np.ndarray !"
         assert isinstance(data,np.ndarray) and data.shape[0]==time.size, "Arg data must be a (N,M) np.ndarray !"
@@ -226,13 +677,10 @@ def MovAverage(data, time, MovMeanfreq, tResamp=False, interpkind='linear', Mode
         assert type(tResamp) in [bool,np.ndarray], "Arg Resamp must be a bool or an array !"
     Nt = time.size
     time = np.copy(time)
-    data = np.copy(data)
     if data.ndim==1:
         data = data.reshape((Nt,1))
-    NP = int(round(1./(np.mean(np.diff(time))*MovMeanfreq)))       # Getting the number of points for the convolution
-    window = np.ones((NP,),dtype=float)/float(NP)               # Building the convolution window with that number of points
-    for ii in range(0,data.shape[1]):
-        data[:,ii] = np.convolve(data[:,ii], window, mode='same')
+    NP = int(round(1./(np.mean(np.diff(time))*MovMeanfreq)))       # Getting the number of points for the moving average
+    data = MovAverage_Stream(data, NP, Kahan=Kahan, Last=True, Test=False)[0]
     if not Mode is None:
         #Ind = np.zeros((Nt,),dtype=bool)
         if NP%2==0:
@@ -265,14 +713,51 @@ def Plot_MovAverage(data, time, MovMeanfreq, Resamp=True, interpkind='linear', T
 
 # --------- SVD ------------------------------------
 
-def SVDExtractPhysNoise(data, Modes=range(0,10)):
-    u,s,v = np.linalg.svd(data, full_matrices=1, compute_uv=1)
-    indPhys = Modes
-    indNoise = np.arange(0,s.size)
-    indNoise = np.delete(indNoise,Modes)
+def SVDTrunc(data, Rank=None, NIter=2, Test=True):
+    """ Return the thin svd of data (Nt,NCh), or its randomised approximation truncated to the first Rank modes
+
+    Only the first min(Nt,NCh) (or Rank) temporal modes are computed, i.e.: u is (Nt,min(Nt,NCh)) or (Nt,Rank) instead of the full (Nt,Nt) basis.
+    The randomised svd projects the data on Rank random combinations of the channels, refined by NIter power iterations (Halko et al., 2011), the result is reproducible (fixed seed)
 
-    Physic = u[:,indPhys].dot(np.diag(s[indPhys])).dot(v[indPhys,:])
-    Noise = u[:,indNoise].dot(np.diag(s[indNoise])).dot(v[indNoise,:])
+    Parameters
+    ----------
+    data :      np.ndarray
+        (Nt,NCh) array, the data to be decomposed
+    Rank :      None / int
+        If None, the exact thin svd is computed, else the number of modes of the randomised svd
+    NIter :     int
+        Number of power iterations used by the randomised svd (more accurate for slowly decreasing singular values)
+    Test :      bool
+        If True tests all the input arguments for any mistake
+
+    Returns
+    -------
+    u, s, v :   np.ndarray
+        (Nt,NM), (NM,) and (NM,NCh) arrays, the temporal modes, singular values and spatial modes, such that data ~ (u*s).dot(v)
+
+    """
+    if Test:
+        assert isinstance(data,np.ndarray) and data.ndim==2, "Arg data must be a (Nt,NCh) np.ndarray !"
+        assert Rank is None or (type(Rank) is int and 0<Rank<=min(data.shape)), "Arg Rank must be None or a strictly positive int <= min(data.shape) !"
+        assert type(NIter) is int and NIter>=0, "Arg NIter must be a positive int !"
+    if Rank is None:
+        return np.linalg.svd(data, full_matrices=0, compute_uv=1)
+    Q = data.dot(np.random.RandomState(0).standard_normal((data.shape[1],Rank)))
+    for ii in range(0,NIter):
+        Q = data.dot(data.T.dot(np.linalg.qr(Q)[0]))
+    Q = np.linalg.qr(Q)[0]
+    u,s,v = np.linalg.svd(Q.T.dot(data), full_matrices=0, compute_uv=1)
+    return Q.dot(u), s, v
+
+
+def SVDExtractPhysNoise(data, Modes=range(0,10), Rank=None, NIter=2):
+    """ Return the part of data reconstructed from the chosen svd Modes (physics) and the rest (noise), see :meth:`~tofu.treat._compute.SVDTrunc()` for Rank and NIter """
+    Modes = list(Modes)
+    if not Rank is None:
+        assert Rank>max(Modes), "Arg Rank must be larger than the highest of Modes !"
+    u,s,v = SVDTrunc(data, Rank=Rank, NIter=NIter)
+    Physic = (u[:,Modes]*s[Modes]).dot(v[Modes,:])
+    Noise = data - Physic
     return Physic, Noise
 
 
@@ -322,7 +807,75 @@ def FourierMainFreq(data, t, Method='Max', Trunc=0.60, Plot=False, Test=True):
         Freq = np.sum(Freq*np.abs(A)**2)/np.sum(np.abs(A)**2)
     return Freq
 
-def FourierExtract(t, data, DF=None, DFEx=None, Harm=True, HarmEx=True, Test=True):
+def _Fourier_Freq(Nt, Dt):
+    """ Return the frequencies of the rfft of Nt time points of spacing Dt, as used by :meth:`~tofu.treat._compute.FourierExtract()` """
+    Freq = np.fft.fftfreq(Nt, Dt)
+    Freq = Freq[Freq>=0]
+    if Nt%2==0:
+        Freq = np.concatenate((Freq,np.array([Dt*Nt/2])))
+    return Freq
+
+
+def _Fourier_MaskHarm(Freq, DF, Harm):
+    """ Return the bool array of the frequencies Freq in interval DF or, if Harm, in one of its harmonics DF*ii (ii in [1,floor(Freq.max()/DF[0])-1]), without looping over the harmonics """
+    indin = (Freq>=DF[0]) & (Freq<=DF[1])
+    NH = int(np.floor(Freq.max()/DF[0]))-1 if DF[0]>0. else np.inf
+    if Harm and NH>=1:
+        # The largest candidate harmonic of each frequency is floor(Freq/DF[0]), checked with its neighbours for rounding errors
+        kk = np.floor(Freq/DF[0]) if DF[0]>0. else NH*np.ones(Freq.shape)
+        kk = np.clip(np.minimum(kk,NH),1,None)
+        for dd in [-1,0,1]:
+            ii = np.clip(kk+dd,1,NH)
+            indin = indin | ((Freq>=DF[0]*ii) & (Freq<=DF[1]*ii))
+    return indin
+
+
+def _Fourier_Mask(Freq, DF=None, DFEx=None, Harm=True, HarmEx=True):
+    """ Return the bool array of the frequencies Freq in interval DF (and its harmonics) and not in interval DFEx (and its harmonics), see :meth:`~tofu.treat._compute.FourierExtract()` """
+    indin = np.ones((Freq.size,),dtype=bool) if DF is None else _Fourier_MaskHarm(Freq, DF, Harm)
+    if not DFEx is None:
+        indin = indin & ~_Fourier_MaskHarm(Freq, DFEx, HarmEx)
+    return indin
+
+
+def _Fourier_FIR(Dt, NFIR, DF=None, DFEx=None, Harm=True, HarmEx=True):
+    """ Return the (NFIR,) coefficients (NFIR odd, delay of (NFIR-1)/2 samples) of a FIR filter approximating the frequency mask of :meth:`~tofu.treat._compute.FourierExtract()` (frequency sampling, hamming window) """
+    assert NFIR%2==1, "Arg NFIR must be odd !"
+    Mask = _Fourier_Mask(np.fft.rfftfreq(NFIR, Dt), DF=DF, DFEx=DFEx, Harm=Harm, HarmEx=HarmEx)
+    return np.roll(np.fft.irfft(Mask.astype(float), NFIR), NFIR//2)*np.hamming(NFIR)
+
+
+def _Fourier_OverlapSave(data, h, State=None):
+    """ Filter a chunk of (Nt,NCh) data (following the previous chunk) with FIR coefficients h, using the overlap-save method, State keeping the last len(h)-1 samples """
+    NFIR = h.size
+    if State is None:
+        State = {'Hist':np.zeros((NFIR-1,data.shape[1]))}
+    X = np.concatenate((State['Hist'],data),axis=0)
+    NX = X.shape[0]
+    NL = int(2**np.ceil(np.log2(NX)))
+    Y = np.fft.irfft(np.fft.rfft(X, NL, axis=0)*np.fft.rfft(h, NL)[:,np.newaxis], NL, axis=0)[NFIR-1:NX,:]
+    State['Hist'] = X[NX-NFIR+1:,:]
+    return Y, State
+
+
+def _Fourier_FIR_Blocks(data, h, Chunk=tfd.PreDataChunk):
+    """ Filter (Nt,NCh) data (np.ndarray or np.memmap) in place by chunks of time, with centered FIR coefficients h (odd size, no delay, zero-padding at both ends), using the overlap-save method """
+    Nt, NCh = data.shape
+    M = h.size//2
+    NC = max(h.size,Chunk//max(1,NCh))
+    State = {'Hist':np.zeros((h.size-1,NCh))}
+    # The outputs lag the inputs by M samples, hence they are written on samples already read
+    for i0 in range(0,Nt+M,NC):
+        X = np.asarray(data[i0:i0+NC,:],dtype=float)
+        if i0+NC>Nt:
+            X = np.concatenate((X,np.zeros((min(i0+NC,Nt+M)-max(i0,Nt),NCh))),axis=0)
+        Y, State = _Fourier_OverlapSave(X, h, State=State)
+        j0 = i0-M
+        data[max(j0,0):j0+Y.shape[0],:] = Y[max(-j0,0):,:]
+    return data
+
+
+def FourierExtract(t, data, DF=None, DFEx=None, Harm=True, HarmEx=True, Spect=None, Test=True):
     """ Return the FFT-filtered signal (and the rest) in the chosen frequency interval (in Hz) and in all the higher harmonics (optional)
 
     Can also exclude a given interval and its higher harmonics from the filtering (optional)
@@ -341,6 +894,8 @@ def FourierExtract(t, data, DF=None, DFEx=None, Harm=True, HarmEx=True, Test=Tru
         List or tuple of len()=2, containing the lower and upper bounds of the frequency interval to be excluded from filtering (in case it overlaps with some high harmonics of DF), default=None
     HarmEx :    bool
         If True all the higher harmonics of the interval DFEx will also be excluded, default=True
+    Spect :     None / np.ndarray
+        If provided, the spectrum of data (np.fft.rfft(data,axis=0)), e.g.: cached from a previous call, to avoid re-computing it
     Test :      bool
         If True tests all the input arguments for any mistake
 
@@ -360,29 +915,14 @@ def FourierExtract(t, data, DF=None, DFEx=None, Harm=True, HarmEx=True, Test=Tru
         assert type(Harm) is bool and type(HarmEx) is bool, "Args Harm and HarmEx must be bool !"
     if data.ndim==1:
         data = np.reshape(data,(data.size,1))
-    Dt = np.mean(np.diff(t))
     Nt = t.size
-    Freq = np.fft.fftfreq(Nt, Dt)
-    Freq = Freq[Freq>=0]
-    if Nt%2==0:
-        Freq = np.concatenate((Freq,np.array([Dt*Nt/2])))
+    Freq = _Fourier_Freq(Nt, np.mean(np.diff(t)))
     NF = Freq.size
-    A = np.fft.rfft(data, axis=0)
+    A = np.fft.rfft(data, axis=0) if Spect is None else np.copy(Spect.reshape((NF,-1)))
     assert A.shape[0]==NF, "Problem with frequency scale !"
 
     # Defining the intervals of interest for reconstruction
-    if not DF is None:
-        indin = (Freq>=DF[0]) & (Freq<=DF[1])
-        if Harm:
-            for ii in range(1,int(np.floor(Freq.max()/DF[0]))):
-                indin = indin | ((Freq>=DF[0]*ii) & (Freq<=DF[1]*ii))
-    else:
-        indin = np.ones((NF,),dtype=bool)
-    if not DFEx is None:
-        indin = indin & ~((Freq>=DFEx[0]) & (Freq<=DFEx[1]))
-        if HarmEx:
-            for ii in range(1,int(np.floor(Freq.max()/DFEx[0]))):
-                indin = indin & ~((Freq>=DFEx[0]*ii) & (Freq<=DFEx[1]*ii))
+    indin = _Fourier_Mask(Freq, DF=DF, DFEx=DFEx, Harm=Harm, HarmEx=HarmEx)
     # Reconstructing
     Aphys = np.copy(A)
     Aphys[~indin,:] = 0
@@ -390,81 +930,154 @@ def FourierExtract(t, data, DF=None, DFEx=None, Harm=True, HarmEx=True, Test=Tru
     return np.fft.irfft(Aphys, Nt, axis=0), np.fft.irfft(A, Nt, axis=0)
 
 
-def FourierPowSpect(data, t, DTF=None, RatDef=100., Test=True):
+def FourierExtractBands(t, data, LPar, Spect=None, Test=True):
+    """ Return the FFT-filtered signals in several frequency bands (and their harmonics), from a single fft and a single inverse fft of the data
+
+    Parameters
+    ----------
+    t :         np.ndarray
+        1D array, monotonously increasing time vector with regular spacing
+    data :      np.ndarray
+        1 or 2D array, with shape[0]=t.size, the data to be filtered
+    LPar :      list
+        List of NB dict, the parameters (DF, DFEx, Harm, HarmEx) of each band, see :meth:`~tofu.treat._compute.FourierExtract()`
+    Spect :     None / np.ndarray
+        If provided, the spectrum of data (np.fft.rfft(data,axis=0))
+    Test :      bool
+        If True tests all the input arguments for any mistake
+
+    Returns
+    -------
+    In :        np.ndarray
+        (NB,Nt,NCh) array, the filtered signals of each band
+
+    """
     if Test:
         assert isinstance(data,np.ndarray) and isinstance(t,np.ndarray) and t.ndim==1 and data.shape[0]==t.size, "Args t and data must be np.ndarray with data.shape[0]==t.size !"
-        assert data.ndim==1 or 1 in data.shape, "Arg data must be 1D !"
-    if not data.ndim==1:
-        data = data.flatten()
-    Dt = np.mean(np.diff(t))
+        assert type(LPar) is list and all([type(pp) is dict for pp in LPar]), "Arg LPar must be a list of dict !"
     Nt = t.size
-    if DTF is None:
-        DTF = (t.max()-t.min())/RatDef
-    Nnt = int(np.ceil(DTF/Dt))
-    Freq = np.fft.fftfreq(Nnt, Dt)
-    Freq = Freq[Freq>=0]
-    if Nnt%2==0:
-        Freq = np.concatenate((Freq,np.array([Dt*Nnt/2])))
-    NF = Freq.size
-    Pow = np.nan*np.zeros((Nt,NF))
-    nn = Nnt/2
-    Res = Nnt%2
-    for ii in range(0,Nt):
-        if ii>=nn and ii<=Nt-nn-Res:
-            indt = np.arange(ii-nn,ii+nn+Res)
-            A = np.fft.rfft(data[indt], axis=0)
-            assert A.size==NF, "Problem with frequency scale !"
-            Pow[ii,:] = np.abs(A)**2
-    ind = np.argsort(Freq)
-    return Pow[:,ind], Freq[ind]
+    data = data.reshape((Nt,-1))
+    A = np.fft.rfft(data, axis=0) if Spect is None else Spect.reshape((-1,data.shape[1]))
+    Freq = _Fourier_Freq(Nt, np.mean(np.diff(t)))
+    Masks = np.array([_Fourier_Mask(Freq, **pp) for pp in LPar])
+    return np.fft.irfft(A[np.newaxis,:,:]*Masks[:,:,np.newaxis], Nt, axis=1)
 
 
-def FourierPowSpect_V2(data, t, DTF=None, RatDef=100., Test=True):
+def FourierPowSpect_STFT(data, t, DTF=None, RatDef=100., Hop=1, Window=None, Detrend=False, Test=True):
+    """ Return the running power spectrum (short-time fft) of one or several signals, computed on all time windows and channels at once
+
+    The time windows are built as a strided view of the data (no copy), one every Hop samples, and fed by chunks of tofu.defaults.FFTChunkSize elements to a single np.fft.rfft() call
+
+    Parameters
+    ----------
+    data :      np.ndarray
+        (Nt,) or (Nt,NCh) array, the signal(s) to be analysed
+    t :         np.ndarray
+        (Nt,) array, monotonously increasing time vector with regular spacing
+    DTF :       None / float
+        Size (in seconds) of the running time window, if None it is (t.max()-t.min())/RatDef
+    RatDef :    float
+        Used if DTF not provided, the number by which the total signal duration is divided to get a time window
+    Hop :       int
+        Number of time samples between two consecutive windows (default: 1, i.e.: one window centered on each time sample where possible)
+    Window :    None / str / tuple / np.ndarray
+        If provided, the window function applied to each time window, either as an array of the window size or fed to scipy.signal.get_window() (e.g.: 'hann'), default: None (no windowing)
+    Detrend :   bool
+        Flag, if True the average of the signal in each time window is substracted to emphasize high frequencies
+    Test :      bool
+        If True tests all the input arguments for any mistake
+
+    Returns
+    -------
+    Pow :       np.ndarray
+        (NW,NF) or (NW,NF,NCh) array, the power spectrum of each time window
+    Freq :      np.ndarray
+        (NF,) array, the increasing frequencies of the power spectrum
+    indt :      np.ndarray
+        (NW,) array, the indices of the time samples on which the time windows are centered
+
+    """
     if Test:
         assert isinstance(data,np.ndarray) and isinstance(t,np.ndarray) and t.ndim==1 and data.shape[0]==t.size, "Args t and data must be np.ndarray with data.shape[0]==t.size !"
-        assert data.ndim==1 or 1 in data.shape, "Arg data must be 1D !"
-    if not data.ndim==1:
-        data = data.flatten()
-    Dt = np.mean(np.diff(t))
+        assert data.ndim in [1,2], "Arg data must be a (Nt,) or (Nt,NCh) np.ndarray !"
+        assert type(Hop) is int and Hop>=1, "Arg Hop must be a strictly positive int !"
+        assert Window is None or type(Window) in [str,tuple] or (isinstance(Window,np.ndarray) and Window.ndim==1), "Arg Window must be None, a str, a tuple or a 1D np.ndarray !"
+        assert type(Detrend) is bool, "Arg Detrend must be a bool !"
+    NDim = data.ndim
     Nt = t.size
+    if NDim==1:
+        data = data.reshape((Nt,1))
+    NCh = data.shape[1]
+    Dt = np.mean(np.diff(t))
     if DTF is None:
         DTF = (t.max()-t.min())/RatDef
     Nnt = int(np.ceil(DTF/Dt))
-    Freq = np.fft.fftfreq(Nnt, Dt)
-    Freq = Freq[Freq>=0]
-    if Nnt%2==0:
-        Freq = np.concatenate((Freq,np.array([Dt*Nnt/2])))
+    assert Nnt<=Nt, "The time window DTF must be shorter than the signal !"
+    if not Window is None and not isinstance(Window,np.ndarray):
+        Window = scpsig.get_window(Window, Nnt)
+    assert Window is None or Window.size==Nnt, "Arg Window must be an array of the size of the time window !"
+    Freq = np.fft.rfftfreq(Nnt, Dt)
     NF = Freq.size
-    Pow = np.nan*np.zeros((Nt,NF))
-    nn = Nnt/2
-    Res = Nnt%2
-    for ii in range(0,Nt):
-        if ii>=nn and ii<=Nt-nn-Res:
-            indt = np.arange(ii-nn,ii+nn+Res)
-            A = np.fft.rfft(data[indt]-np.mean(data[indt]), axis=0)
-            assert A.size==NF, "Problem with frequency scale !"
-            Pow[ii,:] = np.abs(A)**2
-    ind = np.argsort(Freq)
-    return Pow[:,ind], Freq[ind]
-
-
-def Fourier_MainFreqPowSpect(data, t, DTF=None, RatDef=100, Method='Max', Trunc=0.60, V=2, Test=True):
-    """ Get the dominant frequency of the running FFT of a 1D signal, and the power spectrum """
-    Nt = t.size
-    if V==1:
-        Pow, Freq = FourierPowSpect(data, t, DTF=DTF, RatDef=RatDef, Test=Test)
-    elif V==2:
-        Pow, Freq = FourierPowSpect_V2(data, t, DTF=DTF, RatDef=RatDef, Test=Test)
-    indnan = np.any(np.isnan(Pow),axis=1)
-    MainFreq = np.nan*np.ones((t.size,))
+
+    # All time windows as a (NW,Nnt,NCh) strided view of the data
+    NW = (Nt-Nnt)//Hop+1
+    indt = np.arange(0,NW)*Hop + Nnt//2
+    Win = np.lib.stride_tricks.as_strided(data, shape=(NW,Nnt,NCh), strides=(Hop*data.strides[0],data.strides[0],data.strides[1]))
+
+    # Computed by chunks of windows to limit the memory usage
+    Pow = np.empty((NW,NF,NCh))
+    NC = max(1,tfd.FFTChunkSize//(Nnt*NCh))
+    for ii in range(0,NW,NC):
+        W = Win[ii:ii+NC]
+        if Detrend:
+            W = W - np.mean(W,axis=1)[:,np.newaxis,:]
+        if not Window is None:
+            W = W*Window[np.newaxis,:,np.newaxis]
+        Pow[ii:ii+NC] = np.abs(np.fft.rfft(W, axis=1))**2
+    if NDim==1:
+        Pow = Pow[:,:,0]
+    return Pow, Freq, indt
+
+
+def _FourierPowSpect_Full(Pow, indt, Nt):
+    """ Return the power spectrum on the full time vector, with nan where no time window is centered """
+    PowF = np.nan*np.ones((Nt,)+Pow.shape[1:])
+    PowF[indt] = Pow
+    return PowF
+
+
+def _Fourier_MainFreq(Pow, Freq, Method='Max', Trunc=0.60):
+    """ Return the dominant frequency of each time window of a (NW,NF) or (NW,NF,NCh) power spectrum """
     if Method=='Max':
-        MainFreq[~indnan] = Freq[np.argmax(Pow[~indnan,:], axis=1)]
-    elif Method=='Trunc':
-        ind = (Pow >= Trunc*np.tile(np.nanmax(Pow,axis=1),(Nt,1))) & (~indnan)
-        MainFreq[ind] = np.sum(Freq[ind]*Pow[ind],axis=1)/np.sum(Pow,axis=1)
-    elif Method=='Average':
-        MainFreq[~indnan] = np.sum(Freq*Pow[~indnan,:],axis=1)/np.sum(Pow[~indnan,:],axis=1)
-    return Pow, MainFreq, Freq
+        return Freq[np.argmax(Pow, axis=1)]
+    FF = Freq.reshape([1,Freq.size]+[1 for ii in range(2,Pow.ndim)])
+    if Method=='Trunc':
+        Pow = np.where(Pow >= Trunc*np.max(Pow,axis=1)[:,np.newaxis], Pow, 0.)
+    return np.sum(FF*Pow,axis=1)/np.sum(Pow,axis=1)
+
+
+def FourierPowSpect(data, t, DTF=None, RatDef=100., Test=True):
+    if Test:
+        assert isinstance(data,np.ndarray) and isinstance(t,np.ndarray) and t.ndim==1 and data.shape[0]==t.size, "Args t and data must be np.ndarray with data.shape[0]==t.size !"
+        assert data.ndim==1 or 1 in data.shape, "Arg data must be 1D !"
+    Pow, Freq, indt = FourierPowSpect_STFT(data.flatten(), t, DTF=DTF, RatDef=RatDef, Detrend=False, Test=False)
+    return _FourierPowSpect_Full(Pow, indt, t.size), Freq
+
+
+def FourierPowSpect_V2(data, t, DTF=None, RatDef=100., Test=True):
+    if Test:
+        assert isinstance(data,np.ndarray) and isinstance(t,np.ndarray) and t.ndim==1 and data.shape[0]==t.size, "Args t and data must be np.ndarray with data.shape[0]==t.size !"
+        assert data.ndim==1 or 1 in data.shape, "Arg data must be 1D !"
+    Pow, Freq, indt = FourierPowSpect_STFT(data.flatten(), t, DTF=DTF, RatDef=RatDef, Detrend=True, Test=False)
+    return _FourierPowSpect_Full(Pow, indt, t.size), Freq
+
+
+def Fourier_MainFreqPowSpect(data, t, DTF=None, RatDef=100, Method='Max', Trunc=0.60, V=2, Window=None, Test=True):
+    """ Get the dominant frequency of the running FFT of a (Nt,) or (Nt,NCh) signal, and the power spectrum (nan where the time window is not complete) """
+    assert Method in ['Max','Trunc','Average'], "Arg Method must be in ['Max','Trunc','Average'] !"
+    Pow, Freq, indt = FourierPowSpect_STFT(data, t, DTF=DTF, RatDef=RatDef, Window=Window, Detrend=V==2, Test=Test)
+    MainFreq = _Fourier_MainFreq(Pow, Freq, Method=Method, Trunc=Trunc)
+    return _FourierPowSpect_Full(Pow, indt, t.size), _FourierPowSpect_Full(MainFreq, indt, t.size), Freq
 
 
 
@@ -472,45 +1085,67 @@ def Fourier_MainFreqPowSpect(data, t, DTF=None, RatDef=100, Method='Max', Trunc=
 
 # ------------- Hybrid smoothing methods ------------------------
 
-def ModeSmoothing(t, data, Freq, N=5, Test=True):
-    """ Smoothe a mode by doing a running average of N data points separated by the estimated period """
+def ModeSmoothing(t, data, Freq, N=5, Chunk=tfd.PreDataChunk, Test=True):
+    """ Smoothe a mode by doing a running average of N data points separated by the estimated period
+
+    For each time point, the (N-1)/2 points before and after are found step by step, each step being one period (estimated at the previous point) away from the previous point.
+    The points falling outside of the time vector are ignored, and all channels are averaged at once
 
+    Parameters
+    ----------
+    t :         np.ndarray
+        (Nt,) array of increasing time values
+    data :      np.ndarray
+        (Nt,) or (Nt,NCh) array of data
+    Freq :      float / int / np.ndarray
+        The frequency of the mode (in Hz), either a single value or its (Nt,) time trace
+    N :         int
+        Number (odd) of points averaged
+    Chunk :     int
+        Max number of elements gathered at once
+
+    Returns
+    -------
+    databis :   np.ndarray
+        The smoothed data, same shape as data
+
+    """
     if Test:
-        assert isinstance(t,np,ndarray) and t.ndim==1, "Arg t must be a (Nt,) np.ndarray !"
+        assert isinstance(t,np.ndarray) and t.ndim==1, "Arg t must be a (Nt,) np.ndarray !"
         assert isinstance(data,np.ndarray) and data.ndim in [1,2] and data.shape[0]==t.size, "Arg data must be a (Nt,) or (Nt,Np) np.ndarray !"
-        assert (not hasattr(Freq,'__getitem__') and type(Freq) in [float, int]) or (isinstance(Freq,np.ndarray) and Freq.ndim==1 and Freq.size==t.size), "Arg Freq must be a single frequency value (in Hz) or the time trace of a frequency value !"
+        assert (not hasattr(Freq,'__getitem__') and type(Freq) in [float, int, np.float64]) or (isinstance(Freq,np.ndarray) and Freq.ndim==1 and Freq.size==t.size), "Arg Freq must be a single frequency value (in Hz) or the time trace of a frequency value !"
         assert type(N) is int and N>0 and N%2==1, "Arg N must be a strictly positive odd int !"
 
     NDim = data.ndim
     Nt = t.size
     if NDim==1:
         data = data.reshape((Nt,1))
-    if not hasattr(Freq,'__getitem__'):
-        Freq = Freq*np.ones((Nt,))
-
-    T = 1./Freq
-    nn = (N-1)/2
-    indtbis = []
-    t1, t2 = t.min(), t.max()
-    for ii in range(0,Nt):
-        indt = [ii]
-        ttmp1, temp2 = np.copy(t[ii]), np.copy(t[ii])
-        indt1, indt2 = np.copy([ii]), np.copy([ii])
+    T = 1./Freq*np.ones((Nt,))
+    nn = (N-1)//2
+
+    # Indices of the N points of each time point (-1 if outside of t), all time points at once for each step
+    Ind = -np.ones((Nt,N),dtype=int)
+    Ind[:,0] = np.arange(0,Nt)
+    for ss, cc in [(-1.,1),(1.,1+nn)]:
+        tt, ii, ok = np.copy(t), np.arange(0,Nt), np.ones((Nt,),dtype=bool)
         for jj in range(0,nn):
-            ttmp1 = ttmp1-T[indt1]
-            ttmp2 = ttmp2+T[indt2]
-            if ttmp1>=t1:
-                indt1 = np.argmin(np.abs(t-ttmp1))
-                indt.append(indt1)
-            if ttmp2<=t2:
-                indt2 = np.argmin(np.abs(t-ttmp2))
-                indt.append(indt2)
-        indtbis.append(np.sort(indt).astype(int))
-
-    databis = np.nan*np.ones(data.shape)
-    for ii in range(0,Nt):
-        databis[ii,:] = np.mean(data[ii,indtbis[ii]])
-    return databis
+            tt = tt + ss*T[ii]
+            ok = ok & (tt>=t[0]) & (tt<=t[-1])
+            # Nearest time point (the first one if equidistant)
+            ind = np.clip(np.searchsorted(t, tt, side='left'), 1, max(1,Nt-1))
+            ind = ind - (tt-t[ind-1] <= t[ind]-tt)
+            ii = np.where(ok, ind, ii)
+            Ind[ok,cc+jj] = ii[ok]
+
+    # Gather and average by chunks of time points
+    databis = np.empty(data.shape)
+    W = (Ind>=0).astype(float)
+    Ind[Ind<0] = 0
+    NC = max(1,Chunk//(N*data.shape[1]))
+    for i0 in range(0,Nt,NC):
+        ww = W[i0:i0+NC,:]
+        databis[i0:i0+NC,:] = np.sum(data[Ind[i0:i0+NC,:],:]*ww[:,:,np.newaxis],axis=1)/np.sum(ww,axis=1)[:,np.newaxis]
+    return databis.reshape((Nt,)) if NDim==1 else databis
 
 
 
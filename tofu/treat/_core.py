@@ -5,6 +5,9 @@ Provide data handling class and methods (storing, processing, plotting...)
 
 import numpy as np
 import matplotlib.pyplot as plt
+import time
+import traceback
+import multiprocessing
 
 
 # ToFu-specific
@@ -15,7 +18,7 @@ from . import _plot as _tft_p
 
 
 __author__ = "Didier Vezinet"
-__all__ = ["PreData"]
+__all__ = ["PreData","PreDataStream","PreData_Batch"]
 
 
 
@@ -25,6 +28,7 @@ class PreData(object):
     The name of the class refers to Pre-treatment Data (i.e.: in the context of tomography, data that is pre-treated before being fed to an inversion algorithm).
     ToFu provide a generic data-handling class, which comes a robust data storing policy: the input data is stored in a read-only attribute and the data-processing methods are used on a copy (e.g.: for computing the SVD, Fourier transform, shorten the time interval of interest, eliminate some channels...).
     Furthermore, methods for interactive plotting are provided as well as a saving method
+    For data too large to be held in memory, data can be a np.memmap (e.g.: from np.load(..., mmap_mode='r') or a raw binary file) or the path of a .npy file, it is then not copied and processed out-of-core, see :meth:`~tofu.treat.PreData.set_Memmap()`
 
     Parameters:
     -----------
@@ -101,12 +105,15 @@ class PreData(object):
         self._Id = Val
 
     def _set_data(self, data, t=None, Chans=None, DtRef=None, LIdDet=None):
+        if type(data) is str:
+            data = np.load(data, mmap_mode='r')
         self._check_inputs(data=data, t=t, Chans=Chans, DtRef=DtRef, LIdDet=LIdDet)
 
         OutRef, Out, Outind = _tft_c._PreData_set_data(data, t, Chans, DtRef=DtRef, LIdDet=LIdDet)
         self._dataRef, self._tRef, self._ChansRef, self._NChansRef, self._LIdDetRef, self._DtRef = OutRef
         self._data, self._t, self._Chans, self._NChans, self._LIdDet, self._Dt = Out
         self._indOut, self._indCorr = Outind
+        self._IdIndexRef = tfpf.IdIndex(LId=self._LIdDetRef)
 
         if not LIdDet is None:    # On purpose, because if they are created they should not be stored as objects
             self.Id.set_LObj(self._LIdDetRef)
@@ -116,8 +123,21 @@ class PreData(object):
         self._interp_lt, self._interp_lNames, self._interp_UNames = None, None, None
         self._Subtract_tsub = None
         self._FFTPar = None
+        self._ModeSmooth = None
         self._PhysNoise = None
         self._NoiseModel = None
+        self._Stages = {}
+        self._Memmap = {'Path':None, 'Chunk':tfd.PreDataChunk, 'NFIR':None}
+
+    def __getstate__(self):
+        # The cached stages of self._doAll() can be re-computed, no need to pickle them
+        State = dict(self.__dict__)
+        State['_Stages'] = {}
+        return State
+
+    def __setstate__(self, State):
+        self.__dict__.update(State)
+        self._Stages = {}
 
     def set_Dt(self, Dt=None, Calc=True):
         """ Set the time interval to which the data should be limited (does not affect the reference data)
@@ -151,6 +171,9 @@ class PreData(object):
 
         Then, the data is re-computed on this new time vector using either interpolation ('interp') or moving average ('movavrg')
 
+        Alternatively, for down-sampling by an integer ratio D (the closest to the ratio of the sampling frequency to f), the 'polyphase' method keeps one time point out of D, after an anti-aliasing FIR filter (see :meth:`~tofu.treat._compute._PreData_Resamp_Polyphase()`).
+        It is done by chunks of time and only computes the kept points, which is faster, less memory-consuming and more accurate than 'movavrg' (t and interpkind are then ignored)
+
         Parameters
         ----------
         t :             None / np.ndarray
@@ -158,6 +181,7 @@ class PreData(object):
         f :             None / int / float
 
         Method :        str
+            Flag indicating the re-sampling method, in ['interp','movavrg','polyphase']
 
         Resamp :        bool
 
@@ -222,9 +246,9 @@ class PreData(object):
         """
 
         if ToIn:
-            return tfpf.SelectFromListId(self._LIdDet, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=Out)
+            return tfpf.SelectFromListId(self._IdIndex, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=Out)
         else:
-            return tfpf.SelectFromListId(self._LIdDetRef, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=Out)
+            return tfpf.SelectFromListId(self._IdIndexRef, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=Out)
 
 
 
@@ -393,48 +417,159 @@ class PreData(object):
             List or tuple of len()=2, containing the lower and upper bounds of the frequency interval to be excluded from filtering (in case it overlaps with some high harmonics of DF)
         HarmEx :    bool
             If True all the higher harmonics of the interval DFEx will also be excluded
+        Calc :      bool
+            Flag indicating whether data should be updated immediately
 
         """
         self._FFTPar = {'DF':DF, 'Harm':Harm, 'DFEx':DFEx, 'HarmEx':HarmEx}
         if Calc:
             self._doAll()
 
+    def set_ModeSmoothing(self, Freq=None, N=5, Calc=True):
+        """ Smoothe a mode by averaging, at each time point, N data points separated by the period of the mode (applied after fft filtering)
+
+        See :meth:`~tofu.treat._compute.ModeSmoothing()`
+
+        Parameters
+        ----------
+        Freq :      None / float / np.ndarray / tuple
+            The frequency of the mode (Hz), as a single value, as its time trace on the treated time vector (np.ndarray) or as a tuple (t,Freq) of its time trace, interpolated on the treated time vector. If None, no smoothing
+        N :         int
+            Number (odd) of points averaged
+        Calc :      bool
+            Flag indicating whether data should be updated immediately
+
+        """
+        assert Freq is None or type(Freq) in [int,float,np.float64,np.ndarray] or (type(Freq) is tuple and len(Freq)==2), "Arg Freq must be a frequency value, a np.ndarray or a tuple (t,Freq) !"
+        assert type(N) is int and N>0 and N%2==1, "Arg N must be a strictly positive odd int !"
+        self._ModeSmooth = None if Freq is None else {'Freq':Freq, 'N':N}
+        if Calc:
+            self._doAll()
+
+    def set_Memmap(self, Path=None, Chunk=None, NFIR=None, Calc=True):
+        """ Set where and by how large chunks the treated data is computed when the reference data is a np.memmap (out-of-core)
+
+        When the reference data is a np.memmap, it is never loaded as a whole: the selection of channels, the interpolation of corrupted points and the re-sampling (linear interpolation only) are done by chunks of time.
+        The treated data is written either to a new array in memory (recommended if it is re-sampled to a lower frequency) or to a .npy file, then self.data is a np.memmap
+
+        Parameters
+        ----------
+        Path :      None / str
+            If provided, the path of the .npy file to which the treated data is written, else it is stored in memory
+        Chunk :     None / int
+            Max number of elements processed at once, if None uses tofu.defaults.PreDataChunk
+        NFIR :      None / int
+            If provided, the fft filtering (see self.set_fft()) is approximated by a centered FIR filter of NFIR (odd) coefficients applied by chunks of time (overlap-save), else it is exact but done on the whole time trace of blocks of channels
+        Calc :      bool
+            Flag indicating whether data should be updated immediately
+
+        """
+        assert Path is None or type(Path) is str, "Arg Path must be a str !"
+        assert Chunk is None or (type(Chunk) is int and Chunk>0), "Arg Chunk must be a strictly positive int !"
+        assert NFIR is None or (type(NFIR) is int and NFIR>0 and NFIR%2==1), "Arg NFIR must be a strictly positive odd int !"
+        self._Memmap = {'Path':Path, 'Chunk':tfd.PreDataChunk if Chunk is None else Chunk, 'NFIR':NFIR}
+        if Calc:
+            self._doAll()
+
+    def calc(self):
+        """ Update the data after one or several changes made with Calc=False (e.g.: set_Dt(), set_Resamp(), Out_add(), interp(), set_fft()...)
+
+        Only the data treatment steps affected by these changes are re-computed, see :meth:`~tofu.treat.PreData._doAll()`
+
+        """
+        self._doAll()
+
 
     def _doAll(self):
-        """ Centralizes all the computations, run everytime something is updated (time interval, valid channels, resampling, subtraction, fft...) """
+        """ Centralizes all the computations, run everytime something is updated (time interval, valid channels, resampling, subtraction, fft...)
+
+        The output of each step is cached with a key made of its parameters and of the key of the previous step, so that only the steps downstream of a change are re-computed
+
+        """
 
         # Get the list of channels considered valid
         self._Chans = self.In_list()
         self._NChans = np.sum(~self._indOut)
         self._LIdDet = [self._LIdDetRef[ii] for ii in range(0,self._NChansRef) if not self._indOut[ii]]
+        self._IdIndex = tfpf.IdIndex(LId=self._LIdDet)
+
+        if isinstance(self._dataRef,np.memmap):
+            self._doAll_Memmap()
+            return
 
-        data = np.copy(self._dataRef[:,~self._indOut])
-        t = np.copy(self._tRef)
+        Key = _tft_c._PreData_doAll_Key(self._indOut)
+        data, t = self._doAll_Stage('Sel', Key, lambda: (self._dataRef[:,~self._indOut], self._tRef))
 
         # Interp of individual corrupted time points (must be done on reference data and time vector to be robust)
+        Key = _tft_c._PreData_doAll_Key(Key, self._interp_lt, self._interp_lNames, self._interp_UNames)
         if not self._interp_lt is None:
             unames = [nn for nn in self._interp_UNames if not nn=='All']
             inds = [self.select(Val=nn, Crit='Name', Out=bool)[~self._indOut].nonzero()[0][0] for nn in unames]
-            data = _tft_c._PreData_doAll_interp(data, t, self._interp_lt, self._interp_lNames, unames, inds)
+            data, t = self._doAll_Stage('interp', Key, lambda: (_tft_c._PreData_doAll_interp(data, t, self._interp_lt, self._interp_lNames, unames, inds), t))
+        else:
+            self._Stages.pop('interp',None)
 
         # Time re-sampling
+        Key = _tft_c._PreData_doAll_Key(Key, self._Resamp_t, self._Resamp_f, self._Resamp_Method, self._Resamp_interpkind)
         if not (self._Resamp_t is None and self._Resamp_f is None):
-            data, t = _tft_c._PreData_doAll_Resamp(self._DtRef, t, data, self._Resamp_t, self._Resamp_f, self._Resamp_Method, self._Resamp_interpkind)
+            data, t = self._doAll_Stage('Resamp', Key, lambda: _tft_c._PreData_doAll_Resamp(self._DtRef, t, data, self._Resamp_t, self._Resamp_f, self._Resamp_Method, self._Resamp_interpkind))
+        else:
+            self._Stages.pop('Resamp',None)
 
         # Subtracting reference time
+        Key = _tft_c._PreData_doAll_Key(Key, self._Subtract_tsub)
         if not self._Subtract_tsub is None:
-            data = _tft_c._PreData_doAll_Subtract(data, t, self._Subtract_tsub)
+            data, t = self._doAll_Stage('Subtract', Key, lambda: (_tft_c._PreData_doAll_Subtract(data, t, self._Subtract_tsub), t))
+        else:
+            self._Stages.pop('Subtract',None)
 
-        # Performing fft
-        if not self._FFTPar is None:
-            data = _tft_c._PreData_doAll_FFT(data, t, self._FFTPar)
+        # Performing fft (the spectrum of the data is cached, so that changing the frequency bands only costs an inverse fft)
+        KeySpect, Key = Key, _tft_c._PreData_doAll_Key(Key, self._FFTPar)
+        if not self._FFTPar is None and not (self._FFTPar['DF'] is None and self._FFTPar['DFEx'] is None):
+            Spect = self._doAll_Stage('Spect', KeySpect, lambda: (np.fft.rfft(data, axis=0),))[0]
+            data, t = self._doAll_Stage('FFT', Key, lambda: (_tft_c._PreData_doAll_FFT(data, t, self._FFTPar, Spect=Spect), t))
+        else:
+            self._Stages.pop('Spect',None)
+            self._Stages.pop('FFT',None)
+
+        # Mode smoothing
+        Key = _tft_c._PreData_doAll_Key(Key, self._ModeSmooth)
+        if not self._ModeSmooth is None:
+            data, t = self._doAll_Stage('ModeSmooth', Key, lambda: (_tft_c._PreData_doAll_ModeSmooth(data, t, self._ModeSmooth), t))
+        else:
+            self._Stages.pop('ModeSmooth',None)
 
-        # Focus on time interval (only for visualization)
-        if not self._Dt is None:
-            indt = (t>=self._Dt[0]) & (t<=self._Dt[1]) if not self._Dt is None else np.ones((t.size,),dtype=bool)
-            data, t = data[indt,:], t[indt]
+        # Focus on time interval (only for visualization), always returns a copy, to preserve the cached steps
+        indt = (t>=self._Dt[0]) & (t<=self._Dt[1]) if not self._Dt is None else np.ones((t.size,),dtype=bool)
+        self._data, self._t = data[indt,:], t[indt]
+        self._DataKey = _tft_c._PreData_doAll_Key(Key, self._Dt)
 
-        self._data, self._t = data, t
+    def _doAll_Memmap(self):
+        """ Out-of-core version of self._doAll(), used when the reference data is a np.memmap, with the same steps done by chunks (see :meth:`~tofu.treat._compute._PreData_doAll_Chunked()`) """
+        interp, Resamp = None, None
+        if not self._interp_lt is None:
+            unames = [nn for nn in self._interp_UNames if not nn=='All']
+            inds = [self.select(Val=nn, Crit='Name', Out=bool)[~self._indOut].nonzero()[0][0] for nn in unames]
+            interp = (self._interp_lt, self._interp_lNames, unames, inds)
+        if not (self._Resamp_t is None and self._Resamp_f is None):
+            Resamp = (self._Resamp_t, self._Resamp_f, self._Resamp_Method, self._Resamp_interpkind)
+        Key = _tft_c._PreData_doAll_Key(self._indOut, interp, Resamp, self._Subtract_tsub, self._FFTPar, self._ModeSmooth, self._Memmap)
+        if 'Memmap' in self._Stages.keys() and not self._Stages['Memmap'][0]==Key:
+            # Release the previous result first, as it may be mapped to the file about to be over-written
+            del self._Stages['Memmap']
+            self._data = None
+        data, t = self._doAll_Stage('Memmap', Key, lambda: _tft_c._PreData_doAll_Chunked(self._dataRef, self._tRef, self._indOut, self._DtRef, interp=interp, Resamp=Resamp,
+                                                                                        tsub=self._Subtract_tsub, FFTPar=self._FFTPar, ModeSmooth=self._ModeSmooth, Out=self._Memmap['Path'], Chunk=self._Memmap['Chunk'], NFIR=self._Memmap['NFIR']))
+        # Focus on time interval (contiguous, hence no copy)
+        indt = slice(0,t.size) if self._Dt is None else slice(np.searchsorted(t,self._Dt[0],side='left'), np.searchsorted(t,self._Dt[1],side='right'))
+        self._data, self._t = data[indt,:], t[indt]
+        self._DataKey = _tft_c._PreData_doAll_Key(Key, self._Dt)
+
+    def _doAll_Stage(self, Stage, Key, func):
+        """ Return the cached (data,t) output of a step of self._doAll(), re-computed with func() if its Key has changed """
+        if not (Stage in self._Stages.keys() and self._Stages[Stage][0]==Key):
+            self._Stages[Stage] = (Key,)+tuple(func())
+        return self._Stages[Stage][1:]
 
 
     def Corr_add(self, Val=[], LCrit=['Name','Cam','CamHead'], indCorr=None, Calc=True):
@@ -510,7 +645,7 @@ class PreData(object):
         L = [L[ii] for ii in range(0,len(L)) if self._indCorr[ii]]
         return L
 
-    def set_PhysNoise(self, Method='svd', Modes=range(0,8), DF=None, DFEx=None, Harm=True, HarmEx=True, Deg=0, Nbin=3, LimRatio=0.05, Plot=False):
+    def set_PhysNoise(self, Method='svd', Modes=range(0,8), Rank=None, NIter=2, DF=None, DFEx=None, Harm=True, HarmEx=True, Deg=0, Nbin=3, LimRatio=0.05, Plot=False):
         """ Use a svd or a fft to estimate the physical part of the signal and the part which can be assimilated to noise, then uses specified degree for polynomial noise model
 
         This method provides an easy way to compute the noise level on each channel.
@@ -528,6 +663,10 @@ class PreData(object):
             Flag indicating with which method should the noise be estimated ('svd' or 'fft')
         Phys        list
             Modes to be extracted from the svd (default: first 8 modes), use method .plot_svd() to choose the modes
+        Rank        None / int
+            If None, the exact (thin) svd is used, else the number of modes of a randomised svd (faster for many channels, must be larger than the highest of Modes)
+        NIter       int
+            Number of power iterations of the randomised svd (used if Rank is provided)
         DF          list
             2 values delimiting a frequency interval (in Hz) from which to extract signal using a fft and rfft
         Harm        bool
@@ -552,12 +691,13 @@ class PreData(object):
 
         """
         if Method=='svd':
-            Phys, Noise = _tft_c.SVDExtractPhysNoise(self.data, Modes=Modes)
-            Param = {'Modes':Modes}
+            Phys, Noise = _tft_c.SVDExtractPhysNoise(self.data, Modes=Modes, Rank=Rank, NIter=NIter)
+            Param = {'Modes':Modes, 'Rank':Rank, 'NIter':NIter}
         elif Method=='fft':
-            Phys, Noise = _tft_c.FourierExtract(self.t, self.data, DF=DF, DFEx=DFEx, Harm=Harm, HarmEx=HarmEx, Test=True)
+            Spect = self._doAll_Stage('SpectData', self._DataKey, lambda: (np.fft.rfft(self.data, axis=0),))[0]
+            Phys, Noise = _tft_c.FourierExtract(self.t, self.data, DF=DF, DFEx=DFEx, Harm=Harm, HarmEx=HarmEx, Spect=Spect, Test=True)
             Param = {'DF':DF, 'DFEx':DFEx, 'Harm':Harm, 'HarmEx':HarmEx}
-        self._PhysNoise = {'Method':Method, 'Param':Param, 'Phys':Phys, 'Noise':Noise}
+        self._PhysNoise = {'Method':Method, 'Param':Param, 'Phys':Phys, 'Noise':Noise, 'Bins':{}}
         self._set_NoiseModel(Deg=Deg, Nbin=Nbin, LimRatio=LimRatio, Plot=Plot)
 
 
@@ -565,8 +705,9 @@ class PreData(object):
         """ Fit the noise as a function of the physical part of the signal by a polynomial, using np.polyfit and the noise level estimated from self.set_PhysNoise()
 
         After the physical part of the data has been extracted with self.set_PhysNoise(), this function provides tools for estimating how the noise level varies with the signal value (i.e. fixed noise vs signal-dependent noise).
-        It fits the noise vs data plot to give a least-square noise model.
+        It fits the noise vs data plot to give a least-square noise model, for all channels at once.
         If you want a constant noise model, just use Deg=0.
+        The binned noise statistics are cached for each Nbin, so changing Deg or LimRatio is cheap.
 
         Parameters
         ----------
@@ -588,6 +729,7 @@ class PreData(object):
         """ Plot the signal in an interactive window, no arguments needed
 
         Plot an interactive matplotlib window to explore the data
+        Long signals are drawn at the resolution of the screen, from min/max envelope pyramids computed once for the current data (see :meth:`~tofu.treat._compute.MinMaxPyramid()`)
 
         Parameters
         ----------
@@ -600,7 +742,8 @@ class PreData(object):
             List of plt.Axes on which the plots are made
 
         """
-        Lax = _tft_p.Plot_Signal(self.data, self.t, self.Chans, nMax=4, shot=self.shot, a4=a4)
+        LOD = self._doAll_Stage('LOD', self._DataKey, lambda: (_tft_c.MinMaxPyramid(self.data),))[0]
+        Lax = _tft_p.Plot_Signal(self.data, self.t, self.Chans, nMax=4, shot=self.shot, a4=a4, LOD=LOD)
         return Lax
 
 
@@ -633,7 +776,7 @@ class PreData(object):
 
 
     def plot_fft(self, Val=None, Crit='Name', V='simple', tselect=None, Fselect=None, PreExp=None, PostExp=None, Log='any', InOut='In', SpectNorm=True, DTF=None, RatDef=100., Inst=True, MainF=True,
-                 ylim=(None,None), cmap=plt.cm.gray_r, a4=False):
+                 Hop=1, Window=None, ylim=(None,None), cmap=plt.cm.gray_r, a4=False):
         """ Plot the power spectrum (fft) of the chosen signals
 
         Computes the fft of the data and plots the power spectrum, normalized or not, for the chosen channels
@@ -658,6 +801,10 @@ class PreData(object):
             Flag, if true, the average of the signal is substracted at each time step to emphasize high frequencies (higher than the one associated to the running time window, default: True)
         MainF :     bool
             Flag
+        Hop :       int
+            Number of time samples between two consecutive time windows, increase to speed up the computation on long signals (default: 1)
+        Window :    None / str / tuple / np.ndarray
+            If provided, the window function applied to each time window (e.g.: 'hann'), see :meth:`~tofu.treat._compute.FourierPowSpect_STFT()`
         ylim :      tuple
             Each limit which is not None is fed to plt.Axes.set_ylim()
         a4 :        bool
@@ -670,11 +817,10 @@ class PreData(object):
 
         """
         ind = self.select(Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=int, ToIn=True)
-        Pow, MainFreq, Freq = [None for ii in range(0,ind.size)], [None for ii in range(0,ind.size)], [None for ii in range(0,ind.size)]
-        v = 2 if Inst else 1
-        for ii in range(0,ind.size):
-            Pow[ii], MainFreq[ii], Freq[ii] = _tft_c.Fourier_MainFreqPowSpect(self.data[:,ind[ii]], self.t, DTF=DTF, RatDef=RatDef, Method='Max', Trunc=0.60, V=v, Test=True)
-        Lax = _tft_p._PreData_plot_fft(self.Chans, V, ind, Pow, MainFreq, Freq, self.t, SpectNorm, cmap, ylim, tselect, Fselect, MainF=MainF, a4=False)
+        Pow, Freq, indt = _tft_c.FourierPowSpect_STFT(self.data[:,ind], self.t, DTF=DTF, RatDef=RatDef, Hop=Hop, Window=Window, Detrend=Inst, Test=True)
+        MainFreq = _tft_c._Fourier_MainFreq(Pow, Freq, Method='Max')
+        Pow, MainFreq, Freq = [Pow[:,:,ii] for ii in range(0,ind.size)], [MainFreq[:,ii] for ii in range(0,ind.size)], [Freq for ii in range(0,ind.size)]
+        Lax = _tft_p._PreData_plot_fft(self.Chans, V, ind, Pow, MainFreq, Freq, self.t[indt], SpectNorm, cmap, ylim, tselect, Fselect, MainF=MainF, a4=False)
         return Lax
 
     def _plot_NoiseVSPhys(self, Val=None, Crit='Name', PreExp=None, PostExp=None, Log='any', a4=False):
@@ -683,6 +829,21 @@ class PreData(object):
         Coefs = self._NoiseCoefs[:,ind] if self._NoiseCoefs.ndim==2 else self._NoiseCoefs[ind]
         return Plot_Noise(self._PhysNoise['Phys'][:,ind], self._PhysNoise['Noise'][:,ind], self._NoiseCoefs[:,ind], LNames, self._NoiseModel['Deg'], a4=a4)
 
+    def get_recipe(self):
+        """ Return the treatment applied to the data, as a dict that can be applied to other data with similar channels (e.g.: other shots), see :meth:`~tofu.treat.PreData_Batch()`
+
+        The recipe holds the same parameters as the saved object (see :meth:`~tofu.pathfile._convert_PreData2Ldict()`), except that the excluded and corrected channels are stored by name
+
+        Returns
+        -------
+        Recipe :    dict
+            The treatment parameters (set_Dt, set_Resamp, Out_add, Corr_add, interp, substract_Dt, set_ModeSmoothing, set_fft, set_PhysNoise)
+
+        """
+        Recipe = tfpf._convert_PreData2Ldict(self)[1]
+        Recipe['indOut'], Recipe['indCorr'] = self.Out_list(), self.Corr_list()
+        return Recipe
+
     def save(self, SaveName=None, Path=None, Mode='npz', compressed=False):
         """ Save the object in folder Name, under file name SaveName, using specified mode
 
@@ -696,8 +857,8 @@ class PreData(object):
             Path specifying where to save the file, if None (recommended) uses self.Id.SavePath
         Mode :      str
             Flag specifying whether to save the object as a numpy array file ('.npz', recommended) or an object using cPickle (not recommended, heavier and may cause retro-compatibility issues)
-        compressed :    bool
-            Flag, used when Mode='npz', indicating whether to use np.savez or np.savez_compressed (slower saving and loading but smaller files)
+        compressed :    bool / int
+            Flag, used when Mode='npz', indicating whether to compress the arrays in parallel chunks (slower saving and loading but smaller files), an int specifying the compression level (see :meth:`~tofu.pathfile.Save_Generic()`)
 
         """
         tfpf.Save_Generic(self, SaveName=SaveName, Path=Path, Mode=Mode, compressed=compressed)
@@ -713,13 +874,368 @@ class PreData(object):
 
 
 
+class PreDataStream(object):
+    """ A streaming counterpart of :class:`~tofu.treat.PreData`, fed with blocks of data as they are acquired and treating them online
+
+    Each block appended with :meth:`~tofu.treat.PreDataStream.append()` is treated on the fly, and the last NBuffer treated time samples are kept in a ring buffer, returned by self.data and self.t (bounded memory and latency).
+    The treatment uses the same routines as PreData, such that the online and offline results match:
+        - selection of the valid channels, see :meth:`~tofu.treat.PreDataStream.Out_add()`
+        - re-sampling by moving average and linear interpolation on a new time vector, or by polyphase decimation, see :meth:`~tofu.treat.PreDataStream.set_Resamp()` (delay of half the averaging window, or of the anti-aliasing filter)
+        - fft filtering, done online by a FIR filter (overlap-save) approximating the frequency mask of PreData, see :meth:`~tofu.treat.PreDataStream.set_fft()` (delay of half the filter length)
+        - subtraction of the signal at a reference time (or averaged over a reference time interval), applied as soon as it is available, see :meth:`~tofu.treat.PreDataStream.substract_Dt()`
+    Changing the treatment re-starts the stream (i.e.: empties the ring buffer).
+
+    Parameters
+    ----------
+    Chans :     list
+        List of the names (str) of the channels, in the order of the columns of the appended data
+    NBuffer :   int
+        Number of treated time samples kept in the ring buffer
+    Id :        None / str / tfpf.ID
+        A name string or a pre-built tfpf.ID class to be used to identify this particular instance, if a string is provided, it is fed to tfpf.ID()
+    Exp :       str
+        Flag specifying the experiment (e.g.: 'AUG', 'WEST'...)
+    shot :      None / int
+        Shot number from which this data is taken
+    Diag :      str
+        Flag specifying the diagnostic from which this data is taken
+    LIdDet :    None / list
+        If provided, list of the tfpf.ID of the detectors corresponding to the channels (see :class:`~tofu.treat.PreData`)
+
+    Returns
+    -------
+    obj :       PreDataStream
+        The created instance
+
+    """
+
+    def __init__(self, Chans, NBuffer=tfd.PreDataStreamNBuffer, Id=None, Exp='AUG', shot=None, Diag='SXR', dtime=None, dtimeIn=False, SavePath=None, LIdDet=None):
+        assert hasattr(Chans,'__iter__') and all([type(ss) is str for ss in Chans]), "Arg Chans must be an iterable of str !"
+        assert type(NBuffer) is int and NBuffer>0, "Arg NBuffer must be a strictly positive int !"
+        _PreData_check_inputs(Id=Id, LIdDet=LIdDet, Exp=Exp, shot=shot, Diag=Diag, dtime=dtime, dtimeIn=dtimeIn, SavePath=SavePath)
+        if Id is None or type(Id) is str:
+            Id = tfpf.ID('PreData', 'Stream' if Id is None else Id, Exp=Exp, Diag=Diag, shot=shot, SavePath=SavePath, dtime=dtime, dtimeIn=dtimeIn)
+        self._Id = Id
+        data = np.zeros((1,len(Chans)))
+        OutRef, Out, Outind = _tft_c._PreData_set_data(data, t=np.zeros((1,)), Chans=list(Chans), LIdDet=LIdDet)
+        self._ChansRef, self._NChansRef, self._LIdDetRef = OutRef[2:5]
+        self._indOut = Outind[0]
+        self._IdIndexRef = tfpf.IdIndex(LId=self._LIdDetRef)
+        self._NBuffer = NBuffer
+        self._Resamp_t, self._Resamp_f, self._Resamp_Method = None, None, None
+        self._FFTPar, self._NFIR = None, None
+        self._Subtract_tsub = None
+        self._reset()
+
+    @property
+    def Id(self):
+        return self._Id
+    @property
+    def Chans(self):
+        return [self._ChansRef[ii] for ii in range(0,self._NChansRef) if not self._indOut[ii]]
+    @property
+    def NTot(self):
+        """ Total number of treated time samples since the stream (re-)started """
+        return self._NTot
+    @property
+    def t(self):
+        N = min(self._NTot,self._NBuffer)
+        return self._tBuf[(self._NTot-N+np.arange(0,N)) % self._NBuffer]
+    @property
+    def data(self):
+        N = min(self._NTot,self._NBuffer)
+        data = self._Buf[(self._NTot-N+np.arange(0,N)) % self._NBuffer,:]
+        if not self._Sub is None and self._Sub['Ref'] is not None:
+            data = data - self._Sub['Ref']*self._Sub['H0']
+        return data
+
+    def _reset(self):
+        """ Re-start the stream, with empty ring buffer and treatment states """
+        NCh = int(np.sum(~self._indOut))
+        self._Buf, self._tBuf = np.zeros((self._NBuffer,NCh)), np.zeros((self._NBuffer,))
+        self._NTot = 0
+        self._States = {'Resamp':None, 'FFT':None, 'FFTt':None, 'Dt':None, 'Hold':None, 'FFTh':None, 'FFTHold':None}
+        self._Sub = None if self._Subtract_tsub is None else {'Sum':np.zeros((NCh,)), 'N':0, 'Dist':np.inf, 'Ref':None, 'H0':1.}
+
+    def select(self, Val=None, Crit='Name', PreExp=None, PostExp=None, Log='any', InOut='In', Out=bool):
+        """ Return the indices (or attributes) of the channels matching the criteria, see :meth:`~tofu.treat.PreData.select()` """
+        return tfpf.SelectFromListId(self._IdIndexRef, Val=Val, Crit=Crit, PreExp=PreExp, PostExp=PostExp, Log=Log, InOut=InOut, Out=Out)
+
+    def Out_add(self, Val=[], LCrit=['Name'], indOut=None):
+        """ Add channels to the list of excluded channels, see :meth:`~tofu.treat.PreData.Out_add()` (re-starts the stream) """
+        if not indOut is None:
+            assert isinstance(indOut,np.ndarray) and indOut.dtype.name=='bool' and indOut.ndim==1 and indOut.size==self._NChansRef, "Arg indOut must be a (N,) np.ndarray of bool !"
+            self._indOut = indOut
+        elif not Val==[]:
+            ind = np.zeros((len(LCrit),self._NChansRef),dtype=bool)
+            for ii in range(0,len(LCrit)):
+                ind[ii,:] = self.select(Val=Val, Crit=LCrit[ii], InOut='In', Out=bool)
+            self._indOut = self._indOut | np.any(ind,axis=0)
+        self._reset()
+
+    def In_add(self, Val=[], LCrit=['Name']):
+        """ Re-include channels excluded with self.Out_add(), see :meth:`~tofu.treat.PreData.In_add()` (re-starts the stream) """
+        if not Val==[]:
+            ind = np.ones((len(LCrit),self._NChansRef),dtype=bool)
+            for ii in range(0,len(LCrit)):
+                ind[ii,:] = self.select(Val=Val, Crit=LCrit[ii], InOut='Out', Out=bool)
+            self._indOut = self._indOut & np.all(ind,axis=0)
+        self._reset()
+
+    def set_Resamp(self, t=None, f=None, Method='movavrg'):
+        """ Re-sample the data online on a new time vector, see :meth:`~tofu.treat.PreData.set_Resamp()` (re-starts the stream)
+
+        Parameters
+        ----------
+        t :         None / np.ndarray
+            If provided, the new time vector (has priority over f)
+        f :         None / int / float
+            Frequency of the re-sampling, used for the moving average and, if t is None, for a regular time vector starting at the first acquired time point (unlike PreData, the end of the acquisition is not known in advance)
+        Method :    str
+            Flag indicating whether the data is averaged over 1/f before interpolation ('movavrg'), only interpolated ('interp') or decimated after anti-aliasing filtering ('polyphase', t is then ignored)
+
+        """
+        _PreData_check_inputs(Resamp_t=t, Resamp_f=f, Resamp_Method=Method)
+        assert not Method=='polyphase' or not f is None, "The 'polyphase' re-sampling requires a frequency f !"
+        self._Resamp_t, self._Resamp_f, self._Resamp_Method = t, f, Method
+        self._reset()
+
+    def set_fft(self, DF=None, Harm=True, DFEx=None, HarmEx=True, NFIR=tfd.PreDataStreamNFIR):
+        """ Filter the data online in the chosen frequency window (in Hz) and its harmonics, see :meth:`~tofu.treat.PreData.set_fft()` (re-starts the stream)
+
+        The frequency mask is applied with a FIR filter of NFIR coefficients (overlap-save), which is an approximation of the offline fft filtering (the narrower the frequency window, the larger NFIR should be)
+
+        Parameters
+        ----------
+        DF, Harm, DFEx, HarmEx :
+            See :meth:`~tofu.treat.PreData.set_fft()`, if DF and DFEx are None no filtering
+        NFIR :      int
+            Number of coefficients (odd) of the FIR filter
+
+        """
+        assert type(NFIR) is int and NFIR>0 and NFIR%2==1, "Arg NFIR must be a strictly positive odd int !"
+        self._FFTPar = None if DF is None and DFEx is None else {'DF':DF, 'Harm':Harm, 'DFEx':DFEx, 'HarmEx':HarmEx}
+        self._NFIR = NFIR
+        self._reset()
+
+    def substract_Dt(self, tsub=None):
+        """ Subtract the signal at time tsub (or averaged over time interval tsub) from the data, as soon as it is available, see :meth:`~tofu.treat.PreData.substract_Dt()` (re-starts the stream) """
+        assert tsub is None or type(tsub) in [int,float,np.float64,list,tuple,np.ndarray], "Arg tsub must be a time value (int,float) or a time interval (list,tuple,np.ndarray) !"
+        self._Subtract_tsub = tsub
+        self._reset()
+
+    def append(self, data, t, Last=False):
+        """ Append a block of acquired data, treat it and store it in the ring buffer
+
+        Blocks can be of any size (even a single sample): the re-sampling and filtering, which rely on the time step, hold back the first samples until there are at least 2 of them
+
+        Parameters
+        ----------
+        data :      np.ndarray
+            (Nt,NChans) array of the new block of data (all channels, in the order of Chans)
+        t :         np.ndarray
+            (Nt,) array of increasing time values, following those of the previous block
+        Last :      bool
+            Flag indicating whether this is the last block, in which case the samples delayed by the treatment are returned too
+
+        Returns
+        -------
+        data :      np.ndarray
+            (N,NCh) array of the new treated samples (without the reference subtraction)
+        t :         np.ndarray
+            (N,) array of their time values
+
+        """
+        assert isinstance(data,np.ndarray) and data.ndim==2 and data.shape[1]==self._NChansRef, "Arg data must be a (Nt,NChans) np.ndarray !"
+        assert isinstance(t,np.ndarray) and t.ndim==1 and t.size==data.shape[0], "Arg t must be a (Nt,) np.ndarray !"
+        dd, tt = np.asarray(data[:,~self._indOut],dtype=float), t
+        St = self._States
+
+        # Re-sampling (the moving average window is set from the sampling of the first raw samples, held back until there are at least 2)
+        if not (self._Resamp_t is None and self._Resamp_f is None) and St['Dt'] is None:
+            dd, tt = self._hold(dd, tt, 'Hold', Last=Last)
+            if tt.size>=2:
+                St['Dt'] = np.mean(np.diff(tt))
+            else:
+                dd, tt = dd[:0,:], tt[:0]
+        if not St['Dt'] is None and (tt.size>0 or Last):
+            if self._Resamp_Method=='polyphase':
+                if not (St['Resamp'] is None and tt.size==0):
+                    D = int(round(1./(St['Dt']*self._Resamp_f)))
+                    dd, tt, St['Resamp'] = _tft_c._PreData_Resamp_Polyphase(dd, tt, D, State=St['Resamp'], Last=Last)
+            else:
+                NP = int(round(1./(St['Dt']*self._Resamp_f))) if self._Resamp_Method=='movavrg' and not self._Resamp_f is None else None
+                tRes = self._Resamp_f if self._Resamp_t is None else self._Resamp_t
+                dd, tt, St['Resamp'] = _tft_c._PreData_Resamp_Stream(dd, tt, tRes, NP=NP, State=St['Resamp'], Last=Last)
+
+        # Reference for subtraction (before filtering)
+        if not self._Sub is None:
+            self._update_Sub(dd, tt, Last=Last)
+
+        # Fft filtering (FIR, delayed by (NFIR-1)/2 samples)
+        if not self._FFTPar is None and St['FFTh'] is None:
+            # The filter is set from the sampling of the first treated samples, held back until there are at least 2
+            dd, tt = self._hold(dd, tt, 'FFTHold', Last=Last)
+            if tt.size>=2:
+                Dt = np.mean(np.diff(tt))
+                St['FFTh'] = _tft_c._Fourier_FIR(Dt, self._NFIR, **self._FFTPar)
+                St['FFTt'], St['FFTSkip'] = tt[:0], self._NFIR//2
+                if not self._Sub is None:
+                    self._Sub['H0'] = np.sum(St['FFTh'])
+            else:
+                dd, tt = dd[:0,:], tt[:0]
+        if not St['FFTh'] is None:
+            if Last:
+                dd = np.concatenate((dd,np.zeros((self._NFIR//2,dd.shape[1]))),axis=0)
+            dd, St['FFT'] = _tft_c._Fourier_OverlapSave(dd, St['FFTh'], State=St['FFT'])
+            Skip = min(St['FFTSkip'],dd.shape[0])
+            dd, St['FFTSkip'] = dd[Skip:,:], St['FFTSkip']-Skip
+            tq = np.concatenate((St['FFTt'],tt))
+            tt, St['FFTt'] = tq[:dd.shape[0]], tq[dd.shape[0]:]
+
+        # Storing in the ring buffer
+        N = tt.size
+        ind = (self._NTot+np.arange(max(0,N-self._NBuffer),N)) % self._NBuffer
+        self._Buf[ind,:], self._tBuf[ind] = dd[N-ind.size:,:], tt[N-ind.size:]
+        self._NTot += N
+        return dd, tt
+
+    def _hold(self, data, t, Key, Last=False):
+        """ Prepend the samples held back in self._States[Key] to the block, and hold them all back again while there are less than 2 (unless it is the last block) """
+        St = self._States
+        if not St[Key] is None:
+            data, t = np.concatenate((St[Key][0],data),axis=0), np.concatenate((St[Key][1],t))
+        St[Key] = (data, t) if t.size<2 and not Last else None
+        return data, t
+
+    def _update_Sub(self, data, t, Last=False):
+        """ Accumulate the reference to be subtracted (same as :meth:`~tofu.treat._compute._PreData_Subtract_Ref()`), until it is complete """
+        Sub, tsub = self._Sub, self._Subtract_tsub
+        if not Sub['Ref'] is None or t.size==0:
+            return
+        if hasattr(tsub,'__iter__'):
+            ind = (t>=tsub[0]) & (t<=tsub[-1])
+            Sub['Sum'], Sub['N'] = Sub['Sum']+np.sum(data[ind,:],axis=0), Sub['N']+np.sum(ind)
+            if (t[-1]>tsub[-1] or Last) and Sub['N']>0:
+                Sub['Ref'] = Sub['Sum']/Sub['N']
+        else:
+            Dist = np.abs(t-tsub)
+            ii = np.argmin(Dist)
+            if Dist[ii]<Sub['Dist']:
+                Sub['Dist'], Sub['Sum'] = Dist[ii], np.array(data[ii,:])
+            if t[-1]>=tsub or Last:
+                Sub['Ref'] = Sub['Sum']
+
+
+
+
+
+
+
+
+
+def PreData_Batch(Recipe, LInputs, Path=None, NProc=tfd.PreDataBatchNProc, compressed=False, Verb=True):
+    """ Apply the same treatment to many data sets (e.g.: shots) in a pool of processes, saving each treated PreData object to disk as soon as it is done
+
+    Each input is treated independently in a worker process: a PreData object is created (or loaded), the recipe is applied, and the object is saved (.npz, see :meth:`~tofu.treat.PreData.save()`), then freed.
+    A failure on one input is reported and does not stop the batch.
+    To limit the data sent to the processes, the data can be provided as the path of a .npy file, which is then opened as a np.memmap (see :class:`~tofu.treat.PreData`)
+
+    Parameters
+    ----------
+    Recipe :    dict / :class:`~tofu.treat.PreData`
+        The treatment to be applied, as returned by :meth:`~tofu.treat.PreData.get_recipe()`, or a PreData object from which it is extracted
+    LInputs :   list
+        List of the inputs, each being either the path (str) of a saved PreData object (.npz) or a dict of the arguments of :class:`~tofu.treat.PreData` (with at least 'data', e.g.: {'data':..., 't':..., 'Chans':..., 'shot':...})
+    Path :      None / str
+        Path of the folder where the treated objects are saved, if None uses the SavePath of each object
+    NProc :     int
+        Number of processes (if 1 the inputs are treated sequentially in the current process)
+    compressed :    bool / int
+        Fed to :meth:`~tofu.treat.PreData.save()`
+    Verb :      bool
+        Flag indicating whether to print the report of each input as soon as it is done
+
+    Returns
+    -------
+    Report :    dict
+        Report of the batch, with keys:
+            - 'Inputs': the list of the names of the inputs (file path or shot number)
+            - 'Out': the list of the saved files (None if failed)
+            - 't': the time (s) spent on each input
+            - 'Error': the list of the error messages (traceback, None if succeeded)
+            - 'Total': the total wall time (s)
+
+    """
+    if isinstance(Recipe,PreData):
+        Recipe = Recipe.get_recipe()
+    assert type(Recipe) is dict, "Arg Recipe must be a dict or a PreData object !"
+    assert type(LInputs) is list and all([type(ii) in [str,dict] for ii in LInputs]), "Arg LInputs must be a list of str or dict !"
+    assert all([type(ii) is str or 'data' in ii.keys() for ii in LInputs]), "Each dict of LInputs must contain 'data' !"
+    assert Path is None or type(Path) is str, "Arg Path must be a str !"
+    assert type(NProc) is int and NProc>=1, "Arg NProc must be a strictly positive int !"
+
+    NIn = len(LInputs)
+    LNames = [ii if type(ii) is str else 'shot '+str(ii.get('shot',None)) for ii in LInputs]
+    Report = {'Inputs':LNames, 'Out':[None]*NIn, 't':[None]*NIn, 'Error':[None]*NIn}
+    Args = [(ii, Recipe, LInputs[ii], Path, compressed) for ii in range(0,NIn)]
+    t0 = time.time()
+    if NProc==1 or NIn<=1:
+        pool, Res = None, (_PreData_Batch_Run(aa) for aa in Args)
+    else:
+        pool = multiprocessing.Pool(min(NProc,NIn))
+        Res = pool.imap_unordered(_PreData_Batch_Run, Args)
+    try:
+        # The results are collected as they come
+        for (ii, Out, tt, Err) in Res:
+            Report['Out'][ii], Report['t'][ii], Report['Error'][ii] = Out, tt, Err
+            if Verb:
+                print("    "+str(round(tt,3))+" s   "+LNames[ii]+("   OK" if Err is None else "   FAILED :\n"+Err))
+    finally:
+        if not pool is None:
+            pool.close()
+            pool.join()
+    Report['Total'] = time.time()-t0
+    if Verb:
+        NFail = len([ee for ee in Report['Error'] if not ee is None])
+        print("Treated "+str(NIn)+" inputs in "+str(round(Report['Total'],3))+" s ("+str(NFail)+" failed)")
+    return Report
+
+
+def _PreData_Batch_Run(Args):
+    """ Treat one input of :meth:`~tofu.treat.PreData_Batch()` (in a worker process), returning (index, saved file, time, error) """
+    ii, Recipe, Input, Path, compressed = Args
+    t0 = time.time()
+    try:
+        if type(Input) is str:
+            obj = tfpf.Open(Input)
+        else:
+            kwdargs = dict(Input)
+            if not Path is None:
+                kwdargs['SavePath'] = Path
+            obj = PreData(kwdargs.pop('data'), **kwdargs)
+        tfpf._apply_Ldict2PreData(obj, Recipe)
+        obj.save(Path=Path, compressed=compressed)
+        Out, Err = obj.Id.SavePath+obj.Id.SaveName+'.npz', None
+        del obj
+    except Exception:
+        Out, Err = None, traceback.format_exc()
+    return ii, Out, time.time()-t0, Err
+
+
+
+
+
+
+
+
 
 def _PreData_check_inputs(Id=None, data=None, t=None, Chans=None, LIdDet=None, DtRef=None, Exp=None, shot=None, Diag=None, dtime=None, dtimeIn=None, SavePath=None,
                           Dt=None, Resamp_t=None, Resamp_f=None, Resamp_Method=None, Resamp_interpkind=None, Calc=None):
     if not Id is None:
         assert type(Id) in [str,tfpf.ID], "Arg Id must be a str or a tfpf.ID object !"
     if not data is None:
-        assert type(data) is np.ndarray and data.ndim==2, "Arg data must be a 2D np.ndarray !"
+        assert isinstance(data,np.ndarray) and data.ndim==2, "Arg data must be a 2D np.ndarray (or np.memmap) !"
     if not t is None:
         assert type(t) is np.ndarray and t.ndim==1 and np.all(t==np.unique(t)), "Arg t must be a 1D np.ndarray of increasing values !"
         if not data is None:
@@ -754,7 +1270,7 @@ def _PreData_check_inputs(Id=None, data=None, t=None, Chans=None, LIdDet=None, D
     if not Resamp_f is None:
         assert type(Resamp_f) in [int,float,np.float64] and Resamp_f>0, "Arg Resamp_f must be a strictly positive value !"
     if not Resamp_Method is None:
-        assert type(Resamp_Method) is str and Resamp_Method in ['interp','movavrg'], "Arg Resamp_Method must be in ['interp','movavrg'] !"
+        assert type(Resamp_Method) is str and Resamp_Method in ['interp','movavrg','polyphase'], "Arg Resamp_Method must be in ['interp','movavrg','polyphase'] !"
 
 
 
@@ -10,6 +10,7 @@ import matplotlib.pyplot as plt
 
 # ToFu-specific
 import tofu.defaults as tfd
+from . import _compute as _tft_c
 
 
 
@@ -23,30 +24,73 @@ import tofu.defaults as tfd
 
 
 
-def Plot_Signal(data, t, LNames, nMax=4, shot=None, a4=False):
-    data = data*1.e3    # (mW)
-    datatime = np.append(data,np.nan*np.ones((1,data.shape[1])),axis=0).T.flatten()
-    #dataprof = np.append(data,np.nan*np.ones((data.shape[0],1)),axis=1).flatten()
+def _LOD_Lines(LOD, t, ax, ind=None, Unit=1.):
+    """ Return the (x,y) of the lines of channels ind (all if None), separated by nan, at the level of detail matching the pixel width of ax (min/max envelope of each block) """
+    Step, tb, Min, Max, Mean = _tft_c._LOD_Get(LOD, t, ax.get_xlim(), ax.get_window_extent().width)
+    if not ind is None:
+        Min, Max = Min[:,ind], Max[:,ind]
+    NCh = Min.shape[1]
+    if Step==1:
+        x, y = tb[:-1], Min
+    else:
+        x, y = np.repeat(tb[:-1],2), np.empty((2*Min.shape[0],NCh))
+        y[0::2,:], y[1::2,:] = Min, Max
+    x = np.tile(np.append(x,np.nan),NCh)
+    y = np.append(y,np.nan*np.ones((1,NCh)),axis=0).T.flatten()*Unit
+    return x, y
+
+
+def _LOD_plot(ax, LOD, t, ind=None, Unit=1., **kwdargs):
+    """ Plot the lines of channels ind (all if None) of LOD (see :meth:`~tofu.treat._compute.MinMaxPyramid()`), at the level of detail matching the pixel width of ax, updated when the time limits of ax change """
+    ll = ax.plot(*_LOD_Lines(LOD, t, ax, ind=ind, Unit=Unit), **kwdargs)[0]
+    def update(ax):
+        ll.set_data(*_LOD_Lines(LOD, t, ax, ind=ind, Unit=Unit))
+    ax.callbacks.connect('xlim_changed', update)
+    return ll
+
+
+def _LOD_imshow(ax, LOD, t, ylim, Key='Mean', Unit=1., **kwdargs):
+    """ Plot the (time,y) map of LOD (see :meth:`~tofu.treat._compute.MinMaxPyramid()`) with imshow, at the level of detail matching the pixel width of ax, updated when the time limits of ax change """
+    ax.set_xlim(t.min(),t.max())
+    ax.set_ylim(ylim[0],ylim[1])
+    im = ax.imshow(np.zeros((1,1)), origin='lower', aspect='auto', extent=(t.min(),t.max(),ylim[0],ylim[1]), **kwdargs)
+    Lock = [False]
+    def update(ax):
+        if not Lock[0]:
+            Lock[0] = True
+            Step, tb, Min, Max, Mean = _tft_c._LOD_Get(LOD, t, ax.get_xlim(), ax.get_window_extent().width)
+            im.set_data({'Min':Min,'Max':Max,'Mean':Mean}[Key].T*Unit)
+            im.set_extent((tb[0],tb[-1],ylim[0],ylim[1]))
+            Lock[0] = False
+    update(ax)
+    ax.callbacks.connect('xlim_changed', update)
+    return im
+
+
+def Plot_Signal(data, t, LNames, nMax=4, shot=None, a4=False, LOD=None):
+    """ Plot the signal in an interactive window, the long signals being drawn at the resolution of the screen from the min/max pyramid LOD (computed if not provided, see :meth:`~tofu.treat._compute.MinMaxPyramid()`) """
+    Unit = 1.e3    # (mW)
+    if LOD is None:
+        LOD = _tft_c.MinMaxPyramid(data)
+    NCh = data.shape[1]
+    DMin, DMax = np.nanmin(LOD[-1]['Min'],axis=0)*Unit, np.nanmax(LOD[-1]['Max'],axis=0)*Unit
 
     ax3D, axtime, axprof, LaxTxtChan, LaxTxtTime = tfd.Plot_TreatSig_Def(a4=a4, nMax=nMax)
     ax3D.figure.canvas.set_window_title(r"TFT.PreData - "+str(shot)+r" t = {0:06.6f} s".format(np.mean(t)))
     ax3D.set_title(str(shot), fontsize=14, fontweight='bold')
-    X = np.tile(np.arange(0,data.shape[1]),(t.size,1))
-    ax3D.scatter(np.tile(t,(data.shape[1],1)).T, X, c=data, edgecolor='none', lw=0., cmap=plt.cm.YlOrBr)
+    _LOD_imshow(ax3D, LOD, t, [0,NCh], Key='Mean', Unit=Unit, cmap=plt.cm.YlOrBr, interpolation='nearest', vmin=np.nanmin(DMin), vmax=np.nanmax(DMax))
 
     #axtime.plot(t, data, label=LNames)
     #axtime.fill_between(t, np.nanmin(data,axis=1), np.nanmax(data,axis=1), facecolor=(0.8,0.8,0.8,0.5), lw=0.)
-    axtime.plot(np.tile(np.append(t,np.nan),(data.shape[1],1)).flatten(), datatime, ls='-', lw=1., c=(0.8,0.8,0.8,0.5))
+    axtime.set_xlim(t.min(),t.max())
+    _LOD_plot(axtime, LOD, t, Unit=Unit, ls='-', lw=1., c=(0.8,0.8,0.8,0.5))
 
     #axprof.plot(np.arange(1,data.shape[1]+1), data.T)
-    axprof.fill_between(np.arange(0,data.shape[1]), np.nanmin(data,axis=0), np.nanmax(data,axis=0), facecolor=(0.8,0.8,0.8,0.5), lw=0.)
+    axprof.fill_between(np.arange(0,NCh), DMin, DMax, facecolor=(0.8,0.8,0.8,0.5), lw=0.)
     #axprof.plot(np.tile(np.append(np.arange(1,data.shape[1]+1),np.nan),(t.size,1)).flatten(), dataprof, ls='-', lw=1., c=(0.8,0.8,0.8,0.5))
 
-    ax3D.set_xlim(t.min(),t.max())
-    ax3D.set_ylim(0,data.shape[1])
-    axtime.set_xlim(t.min(),t.max())
-    axprof.set_xlim(0,data.shape[1]-1)
-    axprof.set_ylim(np.nanmin(data),np.nanmax(data))
+    axprof.set_xlim(0,NCh-1)
+    axprof.set_ylim(np.nanmin(DMin),np.nanmax(DMax))
     axp2 = axprof.twiny()
     axp2.set_xlim(0,data.shape[1]-1)
     axp2.set_xticks(np.arange(0,data.shape[1]))
@@ -63,6 +107,7 @@ def Plot_Signal(data, t, LNames, nMax=4, shot=None, a4=False):
         def __init__(self, t, data, LNames, axtime, axprof, ax3D, LaxTxtChan, LaxTxtTime, Bcktime, Bckprof, LBckTxtChan, LBckTxtTime, can, indt=[0], indNames=[0], Max=nMax, colchan=['m','c','y','w'], colt=['k','r','b','g']):
             self.t = t
             self.data = data
+            self.LOD, self.Unit = LOD, Unit
             self.LNames = LNames
             self.indt, self.indNames = indt, indNames
             self.can = can
@@ -88,7 +133,7 @@ def Plot_Signal(data, t, LNames, nMax=4, shot=None, a4=False):
             self.lp, self.lp2, self.LTxtChan = [], [], []
             for ii in range(0,self.Max):
                 self.lp.append(axprof.axvline(np.nan,0,1,ls='--',lw=1., c=self.colt[ii]))
-                self.lp2.append(axtime.plot(self.t, self.nant, ls='-', lw=2.,c=self.colt[ii])[0])
+                self.lp2.append(axtime.plot([np.nan], [np.nan], ls='-', lw=2.,c=self.colt[ii])[0])
                 self.LTxtChan.append(self.LaxTxtChan[ii].text(0.5,0.5, r"", color=self.colt[ii], size=14, fontweight='bold', va='center', ha='center'))
                 self.axprof.draw_artist(self.lp[ii])
                 self.axtime.draw_artist(self.lp2[ii])
@@ -105,7 +150,7 @@ def Plot_Signal(data, t, LNames, nMax=4, shot=None, a4=False):
                 self.can.restore_region(self.LBckTxtTime[ii])
             for ii in range(0,len(self.indt)):
                 self.lt[ii].set_xdata([self.t[self.indt[ii]],self.t[self.indt[ii]]])
-                self.lt2[ii].set_ydata(self.data[self.indt[ii],:])
+                self.lt2[ii].set_ydata(self.data[self.indt[ii],:]*self.Unit)
                 self.axtime.draw_artist(self.lt[ii])
                 self.axprof.draw_artist(self.lt2[ii])
                 self.LTxtTime[ii].set_text(r"t = {0:09.6f} s".format(self.t[self.indt[ii]]))
@@ -121,7 +166,7 @@ def Plot_Signal(data, t, LNames, nMax=4, shot=None, a4=False):
                 self.can.blit(self.LaxTxtTime[ii].bbox)
             for ii in range(0,len(self.indNames)):
                 self.lp[ii].set_xdata([self.indNames[ii],self.indNames[ii]])
-                self.lp2[ii].set_ydata(self.data[:,self.indNames[ii]])
+                self.lp2[ii].set_data(*_LOD_Lines(self.LOD, self.t, self.axtime, ind=[self.indNames[ii]], Unit=self.Unit))
                 self.axprof.draw_artist(self.lp[ii])
                 self.axtime.draw_artist(self.lp2[ii])
                 self.LTxtChan[ii].set_text(self.LNames[self.indNames[ii]])
@@ -129,7 +174,7 @@ def Plot_Signal(data, t, LNames, nMax=4, shot=None, a4=False):
                 self.can.blit(self.LaxTxtChan[ii].bbox)
             for ii in range(len(self.indNames),self.Max):
                 self.lp[ii].set_xdata([np.nan,np.nan])
-                self.lp2[ii].set_ydata(self.nant)
+                self.lp2[ii].set_data([np.nan], [np.nan])
                 self.axprof.draw_artist(self.lp[ii])
                 self.axtime.draw_artist(self.lp2[ii])
                 self.LTxtChan[ii].set_text(r"")
@@ -199,7 +244,13 @@ def Plot_Signal(data, t, LNames, nMax=4, shot=None, a4=False):
                     self.indNames = [int(round(event.xdata))]
                 self.update()
 
+        def xlim_changed(self, ax):
+            # Pick the level of detail matching the new time interval, the figure being re-drawn afterwards
+            for ii in range(0,len(self.indNames)):
+                self.lp2[ii].set_data(*_LOD_Lines(self.LOD, self.t, self.axtime, ind=[self.indNames[ii]], Unit=self.Unit))
+
     Keyhandler = _keyhandler(t,data, LNames, axtime, axprof, ax3D, LaxTxtChan, LaxTxtTime, Bcktime, Bckprof, LBckTxtChan, LBckTxtTime, can)
+    axtime.callbacks.connect('xlim_changed', Keyhandler.xlim_changed)
     def on_press(event):
         Keyhandler.onkeypress(event)
     def on_clic(event):
@@ -264,7 +315,7 @@ def Plot_fft(t, Pow, Freq, SpectNorm, ax=None, ylim=[None,None], cmap=plt.cm.gra
         Pow = Pow/np.nanmax(Pow)
     if ax is None:
         ax = tfd.Plot_FFTChan_Def(a4=a4)
-    ax.imshow(Pow.T, cmap=cmap, interpolation='bilinear', origin='lower', aspect='auto', vmin=0., vmax=1., extent=(t.min(),t.max(),Freq.min()*1.e-3,Freq.max()*1.e-3), norm=None, alpha=None)
+    _LOD_imshow(ax, _tft_c.MinMaxPyramid(Pow), t, [Freq.min()*1.e-3,Freq.max()*1.e-3], Key='Max', cmap=cmap, interpolation='bilinear', vmin=0., vmax=1.)
     if not ylim[0] is None:
         ax.set_ylim(bottom=ylim[0])
     if not ylim[1] is None:
@@ -281,9 +332,12 @@ def _Plot_fft_inter(t, Pow, Freq, tselect=None, Fselect=None, ylim=[None,None],
     EnvF = [np.nanmin(Pow,axis=0), np.nanmax(Pow,axis=0)]
 
     ax21, ax22, axt, axF = tfd.Plot_FFTInter_Def(a4=a4)
-    ax21.imshow(Pow.T, cmap=cmap, interpolation='bilinear', origin='lower', aspect='auto', vmin=0., vmax=1., extent=(t.min(),t.max(),Freq.min()*1.e-3,Freq.max()*1.e-3), norm=None, alpha=None)
-    ax22.imshow(PowInst.T, cmap=cmap, interpolation='bilinear', origin='lower', aspect='auto', vmin=0., vmax=1., extent=(t.min(),t.max(),Freq.min()*1.e-3,Freq.max()*1.e-3), norm=None, alpha=None)
-    axt.fill_between(t, Envt[0],Envt[1], color=(0.8,0.8,0.8,0.8))
+    LOD = _tft_c.MinMaxPyramid(Pow)
+    _LOD_imshow(ax21, LOD, t, [Freq.min()*1.e-3,Freq.max()*1.e-3], Key='Max', cmap=cmap, interpolation='bilinear', vmin=0., vmax=1.)
+    _LOD_imshow(ax22, _tft_c.MinMaxPyramid(PowInst), t, [Freq.min()*1.e-3,Freq.max()*1.e-3], Key='Max', cmap=cmap, interpolation='bilinear', vmin=0., vmax=1.)
+    axt.set_xlim(t.min(),t.max())
+    Step, tb, Min, Max, Mean = _tft_c._LOD_Get(_tft_c.MinMaxPyramid(np.array(Envt).T), t, axt.get_xlim(), axt.get_window_extent().width)
+    axt.fill_between(tb[:-1], Min[:,0], Max[:,1], color=(0.8,0.8,0.8,0.8))
     axF.fill_between(Freq*1.e-3, EnvF[0],EnvF[1], color=(0.8,0.8,0.8,0.8))
 
     Colt = ['k','b','r']
@@ -305,7 +359,7 @@ def _Plot_fft_inter(t, Pow, Freq, tselect=None, Fselect=None, ylim=[None,None],
             ax21.axhline(Fselect[ii]*1.e-3, ls='--', lw=1., c=ColF[ii])
             ax22.axhline(Fselect[ii]*1.e-3, ls='--', lw=1., c=ColF[ii])
             axF.axvline(Fselect[ii]*1.e-3, ls='--', lw=1., c=ColF[ii])
-            axt.plot(t, Pow[:,indF], lw=1., ls='-', c=ColF[ii])
+            _LOD_plot(axt, LOD, t, ind=[indF], lw=1., ls='-', c=ColF[ii])
 
     if not ylim[0] is None:
         ax21.set_ylim(bottom=ylim[0])
@@ -352,7 +406,7 @@ def SVDNoisePlot(data, t=None, Modes=8, shot=None, NRef=None, a4=False, Test=Tru
         NRef = int(np.ceil(Modes/2.))
     NRef = float(NRef) # ?
 
-    u,s,v = np.linalg.svd(data, full_matrices=1, compute_uv=1)
+    u,s,v = np.linalg.svd(data, full_matrices=0, compute_uv=1)
 
     axCol = 'w'
     fgs = (11.69,8.27) if a4 else (10,6)